@@ -0,0 +1,70 @@
+"""Measure ActuatorDispatcher publish throughput in messages per second.
+
+Runs against the in-process fake broker by default, or a real broker with --host:
+
+    python benchmarks/dispatcher_throughput.py --messages 100000 --topics 1000 --qos 1
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.actuator_dispatcher import ActuatorDispatcher  # noqa: E402
+from fake_mqtt_broker import FakeMQTTBroker  # noqa: E402
+
+
+def run(host, port, messages: int, topics: int, qos: int, max_pending: int) -> dict:
+    broker = None
+    if host is None:
+        broker = FakeMQTTBroker().start()
+        host, port = "127.0.0.1", broker.port
+    dispatcher = ActuatorDispatcher.connect(host, port, qos=qos, max_pending=max_pending)
+    try:
+        deadline = time.monotonic() + 5
+        while not dispatcher.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        start = time.perf_counter()
+        for i in range(messages):
+            dispatcher.dispatch({"temperature_delta": i * 0.01}, topic=f"bench/{i % topics}")
+        enqueued = time.perf_counter() - start
+        dispatcher.flush()
+        elapsed = time.perf_counter() - start
+    finally:
+        dispatcher.close()
+        if broker is not None:
+            broker.close()
+    return {
+        "messages": messages,
+        "topics": topics,
+        "qos": qos,
+        "published": dispatcher.published,
+        "coalesced": dispatcher.coalesced,
+        "dropped": dispatcher.dropped,
+        "enqueue_per_sec": messages / enqueued,
+        "published_per_sec": dispatcher.published / elapsed,
+        "seconds": elapsed,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", help="MQTT broker host (default: in-process fake broker)")
+    parser.add_argument("--port", type=int, default=1883)
+    parser.add_argument("--messages", type=int, default=50_000)
+    parser.add_argument("--topics", type=int, default=50_000, help="distinct topics (coalescing)")
+    parser.add_argument("--qos", type=int, choices=(0, 1, 2), default=1)
+    parser.add_argument("--max-pending", type=int, default=100_000)
+    args = parser.parse_args(argv)
+    result = run(args.host, args.port, args.messages, args.topics, args.qos, args.max_pending)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,156 @@
+"""Minimal in-process MQTT 3.1.1 broker for tests and benchmarks.
+
+Implements just enough of the protocol for a publishing client: CONNECT, PUBLISH
+at QoS 0/1/2 (with the matching acknowledgements), PINGREQ and DISCONNECT.
+Received messages are recorded instead of being routed to subscribers.
+"""
+
+from __future__ import annotations
+
+import socket
+import socketserver
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+
+Message = Tuple[str, bytes, int]  # topic, payload, qos
+
+
+def _read_exact(sock: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+
+def _read_packet(sock: socket.socket) -> Tuple[int, bytes]:
+    header = _read_exact(sock, 1)[0]
+    length, shift = 0, 0
+    while True:
+        byte = _read_exact(sock, 1)[0]
+        length |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            break
+        shift += 7
+    return header, _read_exact(sock, length)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    server: "_Server"
+
+    def handle(self) -> None:
+        broker = self.server.broker
+        sock = self.request
+        broker._register(sock)
+        try:
+            while True:
+                header, body = _read_packet(sock)
+                kind = header >> 4
+                if kind == 1:  # CONNECT
+                    sock.sendall(b"\x20\x02\x00\x00")
+                elif kind == 3:  # PUBLISH
+                    qos = (header >> 1) & 3
+                    (topic_len,) = struct.unpack_from("!H", body)
+                    topic = body[2 : 2 + topic_len].decode()
+                    pos = 2 + topic_len
+                    if qos:
+                        packet_id = body[pos : pos + 2]
+                        pos += 2
+                    broker._record((topic, bytes(body[pos:]), qos))
+                    if qos == 1:
+                        sock.sendall(b"\x40\x02" + packet_id)
+                    elif qos == 2:
+                        sock.sendall(b"\x50\x02" + packet_id)
+                elif kind == 6:  # PUBREL
+                    sock.sendall(b"\x70\x02" + body[:2])
+                elif kind == 12:  # PINGREQ
+                    sock.sendall(b"\xd0\x00")
+                elif kind == 14:  # DISCONNECT
+                    return
+        except (ConnectionError, OSError):
+            return
+        finally:
+            broker._unregister(sock)
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+    broker: "FakeMQTTBroker"
+
+
+class FakeMQTTBroker:
+    """Record-only MQTT broker listening on ``127.0.0.1``.
+
+    The port is bound on construction, so clients may connect before :meth:`start`;
+    they will not receive CONNACK until the broker is serving. Use as a context
+    manager or call :meth:`start` and :meth:`close` explicitly.
+    """
+
+    def __init__(self, port: int = 0) -> None:
+        self._server = _Server(("127.0.0.1", port), _Handler)
+        self._server.broker = self
+        self.messages: List[Message] = []
+        self._cond = threading.Condition()
+        self._clients: List[socket.socket] = []
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def port(self) -> int:
+        return self._server.server_address[1]
+
+    def start(self) -> "FakeMQTTBroker":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def close(self) -> None:
+        self.disconnect_clients()
+        if self._thread is not None:
+            self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "FakeMQTTBroker":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def disconnect_clients(self) -> None:
+        """Drop every client connection, as a broker restart or network blip would."""
+        with self._cond:
+            clients, self._clients = self._clients, []
+        for sock in clients:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def wait_for(self, count: int, timeout: float = 5.0) -> bool:
+        """Block until at least ``count`` messages arrived; ``False`` on timeout."""
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self.messages) < count:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _register(self, sock: socket.socket) -> None:
+        with self._cond:
+            self._clients.append(sock)
+
+    def _unregister(self, sock: socket.socket) -> None:
+        with self._cond:
+            if sock in self._clients:
+                self._clients.remove(sock)
+
+    def _record(self, message: Message) -> None:
+        with self._cond:
+            self.messages.append(message)
+            self._cond.notify_all()
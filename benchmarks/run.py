@@ -0,0 +1,420 @@
+"""Offline benchmark suite for the NessHash hot paths.
+
+One command runs every benchmark, writes JSON and compares it with a stored baseline:
+
+    python benchmarks/run.py --out bench.json --baseline benchmarks/baseline.json
+
+Each benchmark runs in its own interpreter, so the ``peak_rss_mb`` it reports is
+its own. Metrics ending in ``_per_sec`` are better when higher. Metrics ending in
+``_us``, ``_ms``, ``_seconds`` or ``_mb`` are better when lower. A change beyond
+``--tolerance`` in the wrong direction is reported as a regression, and with
+``--fail-on-regression`` the exit status becomes 1.
+
+Benchmarks:
+
+* ``rate_limiter`` - ``RedisRateLimiter``/``HybridRateLimiter.hit`` per strategy, and
+  the overlay ``rate_limiter`` middleware end to end, against fakeredis and (if one
+  answers at ``--redis-url``) a local Redis.
+* ``ics_add_event`` - ``ICSCalendarBackend.add_event`` on calendars of 1k/10k/100k
+  events, in rewrite and journal modes.
+* ``schedule_from_note`` - ``TerraVoiceAgent`` note parsing and scheduling.
+* ``breath_service`` - ``BreathService`` ingest, predict and dispatch, per packet and
+  per columnar batch, with and without the anomaly detector.
+* ``dispatcher`` - MQTT publish throughput (see ``dispatcher_throughput.py``).
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path[:0] = [str(ROOT / "src"), str(ROOT / "benchmarks")]
+
+import numpy as np  # noqa: E402
+
+Metrics = Dict[str, float]
+HIGHER_IS_BETTER = ("_per_sec",)
+LOWER_IS_BETTER = ("_us", "_ms", "_seconds", "_mb")
+
+
+def _latency_stats(samples: List[float], unit: float = 1e6, suffix: str = "us") -> Metrics:
+    values = np.asarray(samples) * unit
+    return {
+        f"p50_{suffix}": float(np.percentile(values, 50)),
+        f"p99_{suffix}": float(np.percentile(values, 99)),
+    }
+
+
+def _timed_calls(fn: Callable[[int], None], n: int) -> Metrics:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        fn(i)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {"calls_per_sec": n / elapsed, **_latency_stats(latencies)}
+
+
+async def _atimed_calls(fn, n: int) -> Metrics:
+    latencies = []
+    start = time.perf_counter()
+    for i in range(n):
+        t = time.perf_counter()
+        await fn(i)
+        latencies.append(time.perf_counter() - t)
+    elapsed = time.perf_counter() - start
+    return {"calls_per_sec": n / elapsed, **_latency_stats(latencies)}
+
+
+# --- rate limiter -------------------------------------------------------------------
+
+
+async def _redis_backends(redis_url: str) -> Dict[str, Callable[[], object]]:
+    import fakeredis.aioredis
+    import redis.asyncio as redis
+
+    backends: Dict[str, Callable[[], object]] = {
+        "fakeredis": lambda: fakeredis.aioredis.FakeRedis(decode_responses=True)
+    }
+    probe = redis.from_url(redis_url, socket_connect_timeout=0.5)
+    try:
+        await probe.ping()
+    except (redis.ConnectionError, OSError):
+        print(f"rate_limiter: no Redis at {redis_url}, local Redis skipped", file=sys.stderr)
+    else:
+        backends["redis"] = lambda: redis.from_url(redis_url, decode_responses=True)
+    finally:
+        await probe.aclose()
+    return backends
+
+
+async def _limiter_cases(redis_url: str, hits: int) -> Dict[str, Metrics]:
+    from rate_limiting import HybridRateLimiter, RedisRateLimiter
+
+    cases: Dict[str, Metrics] = {}
+    for backend, make_client in (await _redis_backends(redis_url)).items():
+        for strategy in ("fixed_window", "sliding_window", "sliding_log", "token_bucket"):
+            client = make_client()
+            await client.flushdb()
+            limiter = RedisRateLimiter(client, prefix="bench")
+            cases[f"{backend}/redis/{strategy}"] = await _atimed_calls(
+                lambda i: limiter.hit(f"ip-{i % 64}", 10**9, strategy=strategy), hits
+            )
+            await client.aclose()
+        client = make_client()
+        hybrid = HybridRateLimiter(client, prefix="bench")
+        await hybrid.start()
+        cases[f"{backend}/hybrid/fixed_window"] = await _atimed_calls(
+            lambda i: hybrid.hit(f"ip-{i % 64}", 10**9), hits
+        )
+        await hybrid.aclose()
+        cases[f"{backend}/middleware/fixed_window"] = await _middleware_case(
+            make_client(), hits // 4
+        )
+    return cases
+
+
+async def _middleware_case(client, requests: int) -> Metrics:
+    """GET /overlay through the ASGI app, so the ``rate_limiter`` middleware runs."""
+    import httpx
+
+    os.environ.setdefault("OVERLAY_CONFIG_PATH", str(Path(tempfile.mkdtemp()) / "overlay.json"))
+    import overlay_server
+    from rate_limiting import RedisRateLimiter
+
+    overlay_server.limiter = RedisRateLimiter(client, prefix="bench")
+    overlay_server.config.rate_limit_per_minute = 10**9
+    overlay_server.config.conditional_bypass_rate_limit = False
+    transport = httpx.ASGITransport(app=overlay_server.app, client=("10.0.0.1", 1234))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as http:
+        result = await _atimed_calls(lambda i: http.get("/overlay"), requests)
+    await client.aclose()
+    return result
+
+
+def bench_rate_limiter(args) -> Dict[str, Metrics]:
+    return asyncio.run(_limiter_cases(args.redis_url, args.limiter_hits))
+
+
+# --- calendar -----------------------------------------------------------------------
+
+
+def _events(n: int, offset: int = 0):
+    from ics import Event
+
+    start = datetime(2030, 1, 1)
+    return [
+        Event(name=f"Ritual {i}", begin=start + timedelta(minutes=i))
+        for i in range(offset, offset + n)
+    ]
+
+
+def bench_ics_add_event(args) -> Dict[str, Metrics]:
+    from ai.calendar_backends import ICSCalendarBackend
+
+    cases: Dict[str, Metrics] = {}
+    for size in args.ics_sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "schedule.ics"
+            backend = ICSCalendarBackend(path)
+            start = time.perf_counter()
+            backend.add_events(_events(size))
+            bulk = time.perf_counter() - start
+
+            extra = _events(args.ics_rewrites, offset=size)
+            rewrite = _timed_calls(lambda i: backend.add_event(extra[i]), len(extra))
+
+            journal = ICSCalendarBackend(path, journal=True, fsync_every=64)
+            extra = _events(args.ics_appends, offset=size + args.ics_rewrites)
+            appended = _timed_calls(lambda i: journal.add_event(extra[i]), len(extra))
+            journal.close()
+        cases[f"bulk/{size}"] = {"events_per_sec": size / bulk, "seconds": bulk}
+        cases[f"rewrite/{size}"] = rewrite
+        cases[f"journal/{size}"] = appended
+    return cases
+
+
+def bench_schedule_from_note(args) -> Dict[str, Metrics]:
+    from ai.calendar_backends import ICSCalendarBackend
+    from ai.terra_voice_agent import TerraVoiceAgent
+
+    templates = [
+        "Convene solar council tomorrow at {h:02d}:{m:02d}",
+        "Water the moss gardens on {d} March at {h}pm",
+        "Tune the aurora array next friday at {h:02d}:{m:02d}",
+        "Breathe with the northern grove in {d} days",
+    ]
+    notes = [
+        templates[i % len(templates)].format(h=1 + i % 11, m=i % 60, d=1 + i % 27)
+        for i in range(args.notes)
+    ]
+    cases: Dict[str, Metrics] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        agent = TerraVoiceAgent(ICSCalendarBackend(Path(tmp) / "notes.ics", journal=True))
+        agent.parse_note(notes[0])  # compiles the extractor's patterns outside the timing
+        cases["parse_note"] = _timed_calls(lambda i: agent.parse_note(notes[i]), len(notes))
+        cases["schedule_from_note"] = _timed_calls(
+            lambda i: agent.schedule_from_note(notes[i]), len(notes)
+        )
+        agent.close()
+    return cases
+
+
+# --- breath pipeline ----------------------------------------------------------------
+
+
+def bench_breath_service(args) -> Dict[str, Metrics]:
+    from ai.anomaly_detector import AnomalyDetector
+    from ai.breath_service import BreathService
+    from ai.sensor_batch import SensorBatch
+
+    n = args.packets
+    service = BreathService()
+    raw = [{"temp": 20.0 + (i % 50) * 0.1, "humidity": 0.4} for i in range(n)]
+    start = time.perf_counter()
+    for packet in raw:
+        service.receive_breath(packet)
+        service.process()
+    per_packet = time.perf_counter() - start
+
+    size = min(args.batch_size, n)
+    wire = SensorBatch.from_packets(
+        [{**p, "ts": 1000.0 + i, "zone": f"zone-{i % 100}"} for i, p in enumerate(raw[:size])]
+    ).tobytes()
+    batches = max(1, n // size)
+
+    def batch_case(service: BreathService) -> Metrics:
+        start = time.perf_counter()
+        for _ in range(batches):
+            service.receive_packets(SensorBatch.from_buffer(wire))  # decoded from bytes each time
+            service.process()
+        batched = time.perf_counter() - start
+        return {
+            "packets_per_sec": batches * size / batched,
+            "batch_ms": batched / batches * 1e3,
+        }
+
+    return {
+        "per_packet": {"packets_per_sec": n / per_packet},
+        "batch": batch_case(BreathService()),
+        # the opt-in anomaly detector, 100 zones still warming up their sketches
+        "batch_anomaly": batch_case(BreathService(detector=AnomalyDetector())),
+    }
+
+
+def bench_dispatcher(args) -> Dict[str, Metrics]:
+    from dispatcher_throughput import run
+
+    result = run(None, 1883, args.messages, args.messages, 1, args.messages)
+    return {
+        "qos1": {
+            "enqueue_per_sec": result["enqueue_per_sec"],
+            "published_per_sec": result["published_per_sec"],
+        }
+    }
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "rate_limiter": bench_rate_limiter,
+    "ics_add_event": bench_ics_add_event,
+    "schedule_from_note": bench_schedule_from_note,
+    "breath_service": bench_breath_service,
+    "dispatcher": bench_dispatcher,
+}
+
+
+# --- driver -------------------------------------------------------------------------
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1 << 20) if sys.platform == "darwin" else peak / 1024  # bytes vs KiB
+
+
+def _run_child(name: str, argv: List[str]) -> dict:
+    """Run one benchmark in a fresh interpreter and return its JSON result."""
+    proc = subprocess.run(
+        [sys.executable, __file__, "--child", name, *argv],
+        capture_output=True,
+        text=True,
+    )
+    sys.stderr.write(proc.stderr)
+    if proc.returncode != 0:
+        return {"error": proc.stderr.strip().splitlines()[-1] if proc.stderr else "failed"}
+    return json.loads(proc.stdout)
+
+
+def _direction(metric: str) -> int:
+    if metric.endswith(HIGHER_IS_BETTER):
+        return 1
+    if metric.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> List[str]:
+    """Describe metrics that moved beyond ``tolerance`` in the wrong direction."""
+    regressions = []
+
+    def check(label: str, metric: str, new: float, old: Optional[float]) -> None:
+        sign = _direction(metric)
+        if not sign or not old:
+            return
+        change = (new - old) / old
+        if sign * change < -tolerance:
+            regressions.append(f"{label} {metric}: {old:.4g} -> {new:.4g} ({change:+.1%})")
+
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base or "error" in result or "error" in base:
+            continue
+        check(name, "peak_rss_mb", result["peak_rss_mb"], base.get("peak_rss_mb"))
+        for case, metrics in result["cases"].items():
+            old_metrics = base.get("cases", {}).get(case, {})
+            for metric, value in metrics.items():
+                check(f"{name}/{case}", metric, value, old_metrics.get(metric))
+    return regressions
+
+
+def _parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=sorted(BENCHMARKS), help="subset to run")
+    parser.add_argument("--out", type=Path, help="write results JSON here (default: stdout)")
+    parser.add_argument("--baseline", type=Path, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="overwrite --baseline")
+    parser.add_argument("--tolerance", type=float, default=0.15, help="allowed slowdown")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    parser.add_argument("--quick", action="store_true", help="small sizes for a smoke run")
+    parser.add_argument("--redis-url", default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    parser.add_argument("--limiter-hits", type=int, default=5000)
+    parser.add_argument("--ics-sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--ics-rewrites", type=int, default=3)
+    parser.add_argument("--ics-appends", type=int, default=1000)
+    parser.add_argument("--notes", type=int, default=2000)
+    parser.add_argument("--packets", type=int, default=20_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--messages", type=int, default=20_000)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    return parser
+
+
+QUICK = {
+    "limiter_hits": 500,
+    "ics_sizes": [100, 1000],
+    "ics_rewrites": 2,
+    "ics_appends": 100,
+    "notes": 200,
+    "packets": 2000,
+    "batch_size": 500,
+    "messages": 2000,
+}
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    args = _parser().parse_args(argv)
+    if args.quick:
+        for key, value in QUICK.items():
+            setattr(args, key, value)
+
+    if args.child:
+        warnings.simplefilter("ignore")  # ics deprecation chatter would drown the output
+        cases = BENCHMARKS[args.child](args)
+        print(json.dumps({"peak_rss_mb": _peak_rss_mb(), "cases": cases}))
+        return 0
+
+    passthrough = [a for a in argv if a != "--fail-on-regression"]
+    results = {}
+    for name in args.only or BENCHMARKS:
+        print(f"running {name} ...", file=sys.stderr)
+        results[name] = _run_child(name, passthrough)
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "created": datetime.now().isoformat(timespec="seconds"),
+            "quick": args.quick,
+        },
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        args.out.write_text(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline is None:
+        return 0
+    if args.save_baseline or not args.baseline.exists():
+        args.baseline.write_text(text + "\n")
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
+        return 0
+    baseline = json.loads(args.baseline.read_text())
+    if baseline["meta"].get("quick") != args.quick:
+        print("baseline was recorded with different --quick sizes; not comparing", file=sys.stderr)
+        return 0
+    regressions = compare(results, baseline["results"], args.tolerance)
+    for line in regressions:
+        print(f"REGRESSION {line}", file=sys.stderr)
+    if not regressions:
+        print(f"no regressions beyond {args.tolerance:.0%} of baseline", file=sys.stderr)
+    return 1 if regressions and args.fail_on_regression else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
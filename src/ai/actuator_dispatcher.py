@@ -1,33 +1,406 @@
 """Dispatch directives to terraforming actuators.
 
-This module centralizes the interface to downstream hardware. It currently
-logs payloads but is designed to extend toward secure MQTT or Redis channels.
+This module centralizes the interface to downstream hardware. Without an MQTT
+client it only logs payloads; with one (see :meth:`ActuatorDispatcher.connect`) it
+publishes them from a background thread so the prediction loop never waits on the
+network.
+
+Outbound messages sit in a bounded buffer keyed by topic. A directive replaces any
+unsent directive for the same topic (last value wins), and when the buffer is full
+the oldest topic's directive is dropped: actuators only care about the newest
+command, so under backpressure stale directives are the cheapest thing to lose.
+
+Directives travel in priority lanes. The sender always drains ``emergency`` first,
+then ``high``, then ``routine``; emergency traffic also ignores the inflight window
+and is never evicted by the buffer bound, so an isolation command cannot queue
+behind a backlog of temperature deltas. A directive may carry a deadline after which
+it is discarded rather than sent late, and queueing latency is recorded per lane.
+
+With a :class:`~command_journal.CommandJournal` attached, directives produced while
+the broker is unreachable are written to disk instead, with their lane and deadline,
+and replayed once the connection is back: compacted per topic, emergencies first,
+and without the ones whose deadline passed during the outage.
 """
 
 from __future__ import annotations
 
 import json
 import logging
-from typing import Dict
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Literal, NamedTuple, Optional, Tuple
+
+from . import instrumentation
+from .command_journal import Command, CommandJournal
+from .instrumentation import LatencyHistogram
 
 logger = logging.getLogger(__name__)
+_log_directive = instrumentation.LogSampler(logger)
+_DISPATCH = instrumentation.stage("dispatch")
+_OUTCOMES = {
+    outcome: instrumentation.counter(
+        "ness_directives_total", "Actuator directives by outcome", outcome=outcome
+    )
+    for outcome in ("dispatched", "coalesced", "dropped", "expired", "journaled", "published")
+}
+
+Priority = Literal["emergency", "high", "routine"]
+PRIORITIES: Tuple[Priority, ...] = ("emergency", "high", "routine")  # highest first
+QUEUE_LATENCY_BOUNDS = (1e-4, 5e-4, 1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0)
+
+
+class _Queued(NamedTuple):
+    payload: bytes
+    enqueued: float  # time.monotonic() at dispatch
+    deadline: Optional[float]  # monotonic expiry, if any
 
 
 class ActuatorDispatcher:
-    """Publish commands to actuators with room for protocol upgrades."""
+    """Publish commands to actuators with room for protocol upgrades.
 
-    def __init__(self, topic: str = "terraform/commands") -> None:
-        # Storing topic for future MQTT integration
+    Args:
+        topic: Base topic; per-zone directives go to ``<topic>/<zone>``.
+        client: Connected (or connecting) ``paho.mqtt.client.Client`` with its network
+            loop running. ``None`` keeps the log-only behaviour.
+        qos: MQTT quality of service for every publish.
+        retain: Ask the broker to retain the last directive per topic.
+        max_pending: Distinct topics buffered (across lanes) before the oldest
+            lower-priority directive is dropped.
+        max_inflight: Publishes handed to the client but not yet acknowledged.
+        journal: Durable queue for directives produced while disconnected.
+    """
+
+    def __init__(
+        self,
+        topic: str = "terraform/commands",
+        client: Any = None,
+        qos: int = 1,
+        retain: bool = False,
+        max_pending: int = 1024,
+        max_inflight: int = 64,
+        journal: Optional[CommandJournal] = None,
+    ) -> None:
         self.topic = topic
-        # TODO: Initialize authenticated MQTT client or Redis publisher here
+        self.client = client
+        self.qos = qos
+        self.retain = retain
+        self.max_pending = max_pending
+        self.max_inflight = max_inflight
+        self.journal = journal
+        self.published = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.expired = 0
+        self.queue_latency = {name: LatencyHistogram(QUEUE_LATENCY_BOUNDS) for name in PRIORITIES}
+        self._lanes: Dict[str, "OrderedDict[str, _Queued]"] = {
+            name: OrderedDict() for name in PRIORITIES
+        }
+        self._inflight = 0
+        self._cond = threading.Condition()
+        self._closed = False
+        self._owns_client = False
+        self._connected = False
+        self._sender: Optional[threading.Thread] = None
+        # journal records being replayed and the segments they came from
+        self._backlog: Deque[Command] = deque()
+        self._replaying: List[Path] = []
+        if client is not None:
+            client.on_connect = self._on_connect
+            client.on_disconnect = self._on_disconnect
+            client.on_publish = self._on_publish
+            self._connected = client.is_connected()
+            self._sender = threading.Thread(
+                target=self._run, name="actuator-dispatcher", daemon=True
+            )
+            self._sender.start()
+
+    @classmethod
+    def connect(
+        cls,
+        host: str = "localhost",
+        port: int = 1883,
+        topic: str = "terraform/commands",
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        tls: bool = False,
+        keepalive: int = 60,
+        client_id: str = "",
+        **kwargs: Any,
+    ) -> "ActuatorDispatcher":
+        """Open a persistent MQTT connection and return a dispatcher publishing on it.
 
-    def dispatch(self, directives: Dict[str, float]) -> None:
+        The connection is established asynchronously by paho's network thread and
+        re-established after drops; directives buffer (and coalesce) meanwhile.
+        """
+        import paho.mqtt.client as mqtt
+
+        api = getattr(mqtt, "CallbackAPIVersion", None)
+        client = mqtt.Client(api.VERSION2, client_id=client_id) if api else mqtt.Client(client_id)
+        if username is not None:
+            client.username_pw_set(username, password)
+        if tls:
+            client.tls_set()
+        client.reconnect_delay_set(min_delay=1, max_delay=30)
+        dispatcher = cls(topic, client=client, **kwargs)
+        dispatcher._owns_client = True
+        client.connect_async(host, port, keepalive)
+        client.loop_start()
+        return dispatcher
+
+    @property
+    def connected(self) -> bool:
+        """Whether the broker has acknowledged the current connection."""
+        return self._connected
+
+    @property
+    def pending(self) -> int:
+        """Directives buffered, journaled or awaiting broker acknowledgement."""
+        with self._cond:
+            journaled = len(self.journal) if self.journal is not None else 0
+            return self._buffered() + self._inflight + journaled
+
+    def dispatch(
+        self,
+        directives: Dict[str, float],
+        topic: Optional[str] = None,
+        priority: Priority = "routine",
+        deadline: Optional[float] = None,
+    ) -> None:
         """Send a directive set to the hardware layer.
 
+        Never blocks on the network: the payload is buffered for the sender thread.
+
         Args:
             directives: Mapping of control parameters such as temperature or
                 humidity deltas. Values should be pre-sanitized by the caller.
+            topic: Override for :attr:`topic`.
+            priority: Lane to queue in; ``emergency`` preempts everything else.
+            deadline: Seconds from now after which the directive is dropped unsent.
         """
-        payload = json.dumps(directives)
-        logger.info("Dispatching to %s: %s", self.topic, payload)
-        # TODO: Replace with actual publish call (e.g., mqtt_client.publish)
+        if priority not in self._lanes:
+            raise ValueError(f"Unknown priority {priority!r}")
+        _OUTCOMES["dispatched"].inc()
+        with _DISPATCH.time():
+            topic = topic or self.topic
+            payload = json.dumps(directives)
+            if _log_directive():
+                logger.debug("Dispatching to %s: %s", topic, payload)
+            if self.client is not None:
+                self._enqueue(topic, payload.encode(), priority, deadline)
+
+    async def dispatch_async(
+        self,
+        directives: Dict[str, float],
+        topic: Optional[str] = None,
+        priority: Priority = "routine",
+        deadline: Optional[float] = None,
+    ) -> None:
+        """Coroutine form of :meth:`dispatch` for asyncio callers; it does not await I/O."""
+        self.dispatch(directives, topic, priority, deadline)
+
+    def dispatch_zones(
+        self, directives, priority: Priority = "routine", deadline: Optional[float] = None
+    ) -> None:
+        """Send per-zone directives produced by ``ClimateBrain.predict_zones``.
+
+        Args:
+            directives: Structured array with a ``zone`` field and one float field
+                per control parameter.
+            priority: Lane for every zone's directive.
+            deadline: Seconds from now after which unsent directives are dropped.
+        """
+        fields = [name for name in directives.dtype.names if name != "zone"]
+        for row in directives:
+            zone = str(row["zone"])
+            payload = {"zone": zone, **{f: float(row[f]) for f in fields}}
+            self.dispatch(payload, f"{self.topic}/{zone}", priority, deadline)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every buffered directive is acknowledged; ``False`` on timeout."""
+        if self.client is None:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._buffered() or self._inflight or self._journaled():
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = 5.0) -> bool:
+        """Flush, stop the sender thread and disconnect a client we created."""
+        drained = self.flush(timeout)
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._sender is not None:
+            self._sender.join(timeout)
+        if self._owns_client:
+            self.client.disconnect()
+            self.client.loop_stop()
+        if self.journal is not None:
+            self.journal.close()
+        return drained
+
+    def _journaled(self) -> bool:
+        return self.journal is not None and len(self.journal) > 0
+
+    def _buffered(self) -> int:
+        return sum(len(lane) for lane in self._lanes.values())
+
+    def _enqueue(
+        self, topic: str, payload: bytes, priority: Priority, deadline: Optional[float]
+    ) -> None:
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("ActuatorDispatcher is closed")
+            replay_pending = self._journaled() and priority != "emergency"
+            if self.journal is not None and (not self._connected or replay_pending):
+                # offline, or a replay is pending: keep order by appending behind it
+                expires = None if deadline is None else time.time() + deadline
+                self.journal.append(topic, payload, priority=priority, deadline=expires)
+                _OUTCOMES["journaled"].inc()
+                self._cond.notify_all()
+                return
+            lane = self._lanes[priority]
+            if topic in lane:
+                self.coalesced += 1
+                _OUTCOMES["coalesced"].inc()
+            elif self._buffered() >= self.max_pending and not self._evict(priority):
+                self.dropped += 1  # everything buffered outranks this directive
+                _OUTCOMES["dropped"].inc()
+                return
+            now = time.monotonic()
+            lane[topic] = _Queued(payload, now, None if deadline is None else now + deadline)
+            self._cond.notify_all()
+
+    def _evict(self, priority: Priority) -> bool:
+        """Drop the oldest directive from the lowest lane not above ``priority``."""
+        rank = PRIORITIES.index(priority)
+        for name in reversed(PRIORITIES[1:]):
+            lane = self._lanes[name]
+            if lane and PRIORITIES.index(name) >= rank:
+                stale, _ = lane.popitem(last=False)
+                self.dropped += 1
+                _OUTCOMES["dropped"].inc()
+                logger.debug("Dropping stale %s directive for %s", name, stale)
+                return True
+        return priority == "emergency"  # emergencies may exceed the bound
+
+    def _ready(self) -> bool:
+        if not self._connected:
+            return False
+        if self._lanes["emergency"]:
+            return True  # strict priority: not held back by the inflight window
+        if self._buffered() or self._backlog:
+            return self._inflight < self.max_inflight
+        if self._replaying:
+            # the journal still counts these segments; release them only once every
+            # directive taken from them has been acknowledged
+            return not self._inflight
+        return self._journaled()
+
+    def _pop(self) -> Optional[Tuple[str, bytes, str]]:
+        """Next live directive by strict priority, skipping expired ones."""
+        now = time.monotonic()
+        for name in PRIORITIES:
+            if name != "emergency" and self._inflight >= self.max_inflight:
+                break
+            lane = self._lanes[name]
+            while lane:
+                topic, queued = lane.popitem(last=False)
+                if queued.deadline is not None and now > queued.deadline:
+                    self.expired += 1
+                    _OUTCOMES["expired"].inc()
+                    continue
+                self.queue_latency[name].observe(now - queued.enqueued)
+                return topic, queued.payload, name
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed and not self._ready():
+                    self._cond.wait()
+                if self._closed:
+                    return
+                popped = self._pop()
+                if popped is not None:
+                    # in-memory lanes predate anything still waiting in the journal
+                    topic, payload, priority = popped
+                elif self._buffered():
+                    continue  # only expired directives were left
+                elif self._backlog:
+                    command = self._backlog.popleft()
+                    if command.expired():
+                        self.expired += 1
+                        _OUTCOMES["expired"].inc()
+                        continue
+                    topic, payload, priority = command.topic, command.payload, command.priority
+                else:
+                    self._advance_replay()
+                    continue
+                self._inflight += 1
+            info = self.client.publish(topic, payload, qos=self.qos, retain=self.retain)
+            if info.rc != 0 and self.qos == 0:
+                # QoS 0 publishes are discarded by paho while offline; keep ours
+                with self._cond:
+                    self._inflight -= 1
+                    queued = _Queued(payload, time.monotonic(), None)
+                    self._lanes[priority].setdefault(topic, queued)
+                    self._connected = False
+
+    def _advance_replay(self) -> None:
+        """Release acknowledged journal segments, then load the next batch if any."""
+        if self._inflight:
+            return  # a replayed directive may still be unacknowledged
+        if self._replaying:
+            self.journal.release(self._replaying)
+            self._replaying = []
+        if self._journaled():
+            self._replaying, commands = self.journal.take()
+            now, clock = time.time(), time.monotonic()
+            backlog: List[Command] = []
+            for command in commands:
+                if command.expired(now):
+                    self.expired += 1
+                    _OUTCOMES["expired"].inc()
+                elif command.priority == "emergency":
+                    # back into the emergency lane so it keeps strict priority
+                    deadline = None if command.deadline is None else clock + command.deadline - now
+                    queued = _Queued(command.payload, clock, deadline)
+                    self._lanes["emergency"][command.topic] = queued
+                else:
+                    backlog.append(command)
+            backlog.sort(key=lambda c: PRIORITIES.index(c.priority))  # stable: keeps order
+            self._backlog.extend(backlog)
+            self._cond.notify_all()
+
+    def _on_connect(self, client, userdata, flags, reason_code, *args) -> None:
+        with self._cond:
+            failed = getattr(reason_code, "is_failure", reason_code != 0)
+            self._connected = not failed
+            self._cond.notify_all()
+
+    def _on_disconnect(self, client, userdata, *args) -> None:
+        with self._cond:
+            self._connected = False
+            if self.journal is not None:
+                # persist what was buffered in memory ahead of later offline directives
+                offset = time.time() - time.monotonic()
+                for name, lane in self._lanes.items():
+                    for topic, queued in lane.items():
+                        expires = None if queued.deadline is None else queued.deadline + offset
+                        self.journal.append(topic, queued.payload, priority=name, deadline=expires)
+                        _OUTCOMES["journaled"].inc()
+                    lane.clear()
+
+    def _on_publish(self, client, userdata, mid, *args) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self.published += 1
+            _OUTCOMES["published"].inc()
+            self._cond.notify_all()
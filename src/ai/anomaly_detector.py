@@ -0,0 +1,408 @@
+"""Streaming anomaly detection over sensor channels.
+
+Every ``(zone, channel)`` pair keeps a :class:`ChannelStats` of fixed size, updated
+as readings arrive, so flagging a reading never looks back over history:
+
+* **Welford** running mean and variance. A bulk update merges the batch's
+  moments with Chan's formula.
+* **EWMA** of recent readings. A sensor *drifts* when the EWMA settles more than
+  ``drift_limit`` robust standard deviations from the median. Measuring against the
+  whole distribution rather than the EWMA's own standard error keeps autocorrelated
+  signals, such as a diurnal cycle, from tripping it. An outlier is clipped to the
+  outlier limit before it enters the EWMA, so one spike does not count as drift.
+* **P² quantile sketches** for the quartiles. Five markers each give a median and
+  IQR that a burst of outliers cannot drag the way it drags the mean.
+* **Run length** of identical consecutive readings, which flags a stuck sensor.
+
+A reading is an *outlier* when it lies more than ``threshold`` robust standard
+deviations (IQR / 1.349) from the median. P² markers move one position per
+sample, so until the sketches have seen ``MIN_SKETCHED`` readings (and whenever
+the IQR is zero) the exact mean and standard deviation stand in. Scoring starts
+once a channel has ``min_samples`` readings.
+
+Bulk updates (:meth:`AnomalyDetector.observe_many`) are vectorized. They score the
+whole batch against the statistics from before the batch, then fold it in. P²
+updates are inherently sequential, so the quartile sketches see at most
+``sketch_sample`` readings per batch. Zones still warming up take that budget first,
+one reading each and a rotating subset of them when there are more than fit; the
+rest is an evenly strided sample of the batch. For the same reason, single readings
+feed the sketches one in ``sketch_every`` once warm.
+
+Non-finite readings (``NaN`` marks an absent channel in a :class:`SensorBatch`) are
+skipped and counted in :attr:`AnomalyDetector.skipped`; a single one would otherwise
+turn the running mean and variance into ``NaN`` for good.
+
+Detection is opt-in: pass a detector to :class:`ClimateBrain` or
+:class:`BreathService`. Anomalies queue until :meth:`AnomalyDetector.drain`;
+:class:`BreathService` drains them before each prediction and sends them on the
+dispatcher's ``emergency`` lane.
+"""
+
+from __future__ import annotations
+
+import bisect
+import math
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Deque, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from . import instrumentation
+
+_ANOMALIES = {
+    kind: instrumentation.counter(
+        "ness_anomalies_total", "Sensor anomalies flagged by the streaming detector", kind=kind
+    )
+    for kind in ("outlier", "stuck", "drift")
+}
+# IQR of a normal distribution in standard deviations
+_IQR_SIGMA = 1.349
+# sketch samples needed before the quartiles replace mean and standard deviation
+MIN_SKETCHED = 64
+
+
+class P2Quantile:
+    """P² estimate of one quantile (Jain & Chlamtac, 1985) in constant memory."""
+
+    __slots__ = ("p", "heights", "positions", "desired", "steps")
+
+    def __init__(self, p: float) -> None:
+        self.p = p
+        self.heights: List[float] = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [2 * p, 4 * p, 2 + 2 * p]  # middle markers only; the ends are exact
+        self.steps = (p / 2, p, (1 + p) / 2)
+
+    def add(self, x: float) -> None:
+        q = self.heights
+        if len(q) < 5:
+            bisect.insort(q, x)
+            return
+        n = self.positions
+        if x < q[0]:
+            q[0] = x
+            k = 1
+        elif x >= q[4]:
+            q[4] = x
+            k = 4
+        else:
+            k = bisect.bisect_right(q, x, 1, 4)
+        for i in range(k, 5):
+            n[i] += 1
+        desired, steps = self.desired, self.steps
+        for i in (1, 2, 3):
+            desired[i - 1] += steps[i - 1]
+            d = desired[i - 1] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                h = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < h < q[i + 1]:
+                    h = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = h
+                n[i] += d
+
+    @property
+    def value(self) -> float:
+        """Current estimate; exact while fewer than five values have been added."""
+        q = self.heights
+        if len(q) == 5:
+            return q[2]
+        if not q:
+            return math.nan
+        return q[min(len(q) - 1, int(round(self.p * (len(q) - 1))))]
+
+
+class ChannelStats:
+    """Constant-size running statistics for one sensor channel.
+
+    Args:
+        alpha: EWMA smoothing factor.
+    """
+
+    __slots__ = (
+        "alpha", "n", "mean", "m2", "ewma", "last", "run", "drifting", "quartiles", "sketched"
+    )
+
+    def __init__(self, alpha: float = 0.05) -> None:
+        self.alpha = alpha
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.ewma = math.nan
+        self.last = math.nan
+        self.run = 0
+        self.drifting = False
+        self.quartiles = (P2Quantile(0.25), P2Quantile(0.5), P2Quantile(0.75))
+        self.sketched = 0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else 0.0
+
+    @property
+    def center(self) -> float:
+        """Median once the sketches are warm, the mean before."""
+        return self.quartiles[1].value if self.sketched >= MIN_SKETCHED else self.mean
+
+    @property
+    def scale(self) -> float:
+        """Robust standard deviation from the IQR, or the plain one as a fallback."""
+        if self.sketched >= MIN_SKETCHED:
+            iqr = self.quartiles[2].value - self.quartiles[0].value
+            if iqr > 0:
+                return iqr / _IQR_SIGMA
+        return self.std
+
+    def sketch(self, x: float) -> None:
+        self.sketched += 1
+        for quartile in self.quartiles:
+            quartile.add(x)
+
+    def update(self, x: float, sketch: bool = True, level: Optional[float] = None) -> None:
+        """Fold in one reading.
+
+        Args:
+            x: The reading.
+            sketch: Whether the quartile sketches see it.
+            level: Value the EWMA moves towards instead of ``x``, e.g. an outlier
+                clipped to the outlier limit.
+        """
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        level = x if level is None else level
+        self.ewma = level if self.n == 1 else self.ewma + self.alpha * (level - self.ewma)
+        self.run = self.run + 1 if x == self.last else 1
+        self.last = x
+        if sketch:
+            self.sketch(x)
+
+
+@dataclass(slots=True)
+class Anomaly:
+    """One flagged reading.
+
+    ``kind`` is ``outlier`` (``score`` in robust standard deviations from the
+    median), ``stuck`` (``score`` is the run of identical readings) or ``drift``
+    (``value`` is the EWMA, ``score`` its distance in robust standard deviations).
+    """
+
+    kind: str
+    channel: str
+    value: float
+    score: float
+    timestamp: float
+    zone: Optional[str] = None
+
+    def directive(self) -> Dict[str, object]:
+        """Payload for the dispatcher's emergency lane."""
+        return {"anomaly": self.kind, **{k: v for k, v in asdict(self).items() if k != "kind"}}
+
+
+class AnomalyDetector:
+    """Flag outliers, stuck sensors and drift as readings stream in.
+
+    Args:
+        threshold: Outlier limit in robust standard deviations from the median.
+        stuck_after: Identical consecutive readings before a sensor counts as stuck.
+        drift_limit: Distance of the EWMA from the median, in robust standard
+            deviations, that counts as drift.
+        min_samples: Readings per channel before outliers and drift are scored.
+        alpha: EWMA smoothing factor.
+        sketch_every: After warm-up, single readings feed the quartile sketches one
+            in this many.
+        sketch_sample: Most readings per bulk update fed to the quartile sketches.
+        max_pending: Undrained anomalies kept; the oldest are dropped beyond this.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 6.0,
+        stuck_after: int = 60,
+        drift_limit: float = 3.0,
+        min_samples: int = 100,
+        alpha: float = 0.05,
+        sketch_every: int = 4,
+        sketch_sample: int = 32,
+        max_pending: int = 1024,
+    ) -> None:
+        self.threshold = threshold
+        self.stuck_after = stuck_after
+        self.drift_limit = drift_limit
+        self.min_samples = min_samples
+        self.alpha = alpha
+        self.sketch_every = sketch_every
+        self.sketch_sample = sketch_sample
+        self.stats: Dict[Tuple[Optional[str], str], ChannelStats] = {}
+        self.skipped = 0  # non-finite readings kept out of the statistics
+        self._cold_cursor = 0  # rotates the sketch budget over warming zones
+        self.pending: Deque[Anomaly] = deque(maxlen=max_pending)
+
+    def channel(self, channel: str, zone: Optional[str] = None) -> ChannelStats:
+        """Statistics for ``channel`` in ``zone`` (``None`` is the implicit zone)."""
+        stats = self.stats.get((zone, channel))
+        if stats is None:
+            stats = self.stats[(zone, channel)] = ChannelStats(self.alpha)
+        return stats
+
+    def _ready(self, stats: ChannelStats) -> bool:
+        return stats.n >= self.min_samples
+
+    def _flag(self, kind, channel, value, score, timestamp, zone) -> None:
+        _ANOMALIES[kind].inc()
+        self.pending.append(Anomaly(kind, channel, value, score, timestamp, zone))
+
+    def _check_drift(self, stats: ChannelStats, channel, timestamp, zone, center, scale) -> None:
+        """Flag the EWMA moving ``drift_limit`` robust deviations away from ``center``."""
+        score = abs(stats.ewma - center) / scale if scale > 0 else 0.0
+        drifting = score > self.drift_limit
+        if drifting and not stats.drifting:
+            self._flag("drift", channel, stats.ewma, score, timestamp, zone)
+        stats.drifting = drifting
+
+    def observe(
+        self, channel: str, value: float, timestamp: float, zone: Optional[str] = None
+    ) -> None:
+        """Score one reading against the channel's statistics, then fold it in."""
+        if not math.isfinite(value):
+            self.skipped += 1
+            return
+        stats = self.channel(channel, zone)
+        level = value
+        ready = self._ready(stats)
+        if ready:
+            center, scale = stats.center, stats.scale
+            if scale > 0:
+                score = abs(value - center) / scale
+                if score > self.threshold:
+                    self._flag("outlier", channel, value, score, timestamp, zone)
+                    level = center + math.copysign(self.threshold * scale, value - center)
+        sketch = stats.n < self.min_samples or not stats.n % self.sketch_every
+        stats.update(value, sketch, level)
+        if stats.run == self.stuck_after:
+            self._flag("stuck", channel, value, stats.run, timestamp, zone)
+        if ready:
+            self._check_drift(stats, channel, timestamp, zone, center, scale)
+
+    def observe_many(
+        self, channel: str, timestamps: np.ndarray, values: np.ndarray, zone: Optional[str] = None
+    ) -> None:
+        """Vectorized :meth:`observe` for one channel's readings in arrival order."""
+        values = np.asarray(values, dtype="f8")
+        index = np.zeros(len(values), dtype=np.intp)
+        self.observe_zones(channel, [zone], index, timestamps, values)
+
+    def observe_zones(
+        self,
+        channel: str,
+        zones: Sequence[Optional[str]],
+        index: np.ndarray,
+        timestamps: np.ndarray,
+        values: np.ndarray,
+    ) -> None:
+        """Bulk update of one channel across zones, vectorized over all of them at once.
+
+        Args:
+            channel: Channel name.
+            zones: Zone names; ``None`` is the implicit zone.
+            index: Per reading, its position in ``zones``.
+            timestamps: Per reading timestamps.
+            values: Readings in arrival order.
+        """
+        values = np.asarray(values, dtype="f8")
+        timestamps = np.broadcast_to(np.asarray(timestamps, dtype="f8"), values.shape)
+        finite = np.isfinite(values)
+        if not finite.all():
+            self.skipped += len(values) - int(finite.sum())
+            index = np.broadcast_to(index, values.shape)[finite]
+            values, timestamps = values[finite], timestamps[finite]
+        if not len(values):
+            return
+        if len(zones) > 1:  # group readings by zone, keeping arrival order within each
+            order = np.argsort(index, kind="stable")
+            index, values, timestamps = index[order], values[order], timestamps[order]
+        at = np.arange(len(values))
+        first = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+        counts = np.diff(np.r_[first, len(values)])
+        group = np.repeat(np.arange(len(first)), counts)
+        names = [zones[i] for i in index[first].tolist()]
+        stats = [self.channel(channel, zone) for zone in names]
+        n0 = np.array([s.n for s in stats], dtype="f8")
+
+        # score against the statistics from before this batch
+        ready = [self._ready(s) for s in stats]
+        levels = values
+        if any(ready):
+            center = np.array([s.center if r else 0.0 for s, r in zip(stats, ready)])
+            scale = np.array([s.scale if r else 0.0 for s, r in zip(stats, ready)])
+            scale[scale <= 0] = math.inf  # not scored yet
+            scores = np.abs(values - center[group]) / scale[group]
+            for i in np.flatnonzero(scores > self.threshold).tolist():
+                value, score, ts = float(values[i]), float(scores[i]), float(timestamps[i])
+                self._flag("outlier", channel, value, score, ts, names[group[i]])
+            limit = self.threshold * scale
+            levels = np.clip(values, (center - limit)[group], (center + limit)[group])
+
+        # Welford state merged with each group's moments (Chan et al.)
+        mean_b = np.add.reduceat(values, first) / counts
+        m2_b = np.add.reduceat((values - mean_b[group]) ** 2, first)
+        n = n0 + counts
+        mean0 = np.array([s.mean for s in stats])
+        delta = mean_b - mean0
+        mean = mean0 + delta * counts / n
+        m2 = np.array([s.m2 for s in stats]) + m2_b + delta * delta * n0 * counts / n
+
+        # EWMA after each group: every reading weighted by its distance from the end
+        last = first + counts - 1
+        decay = 1 - self.alpha
+        weights = decay ** (last[group] - at).astype("f8")
+        ewma0 = np.array([s.ewma for s in stats])
+        ewma0 = np.where(n0 == 0, levels[first], ewma0)
+        ewma = ewma0 * decay**counts + self.alpha * np.add.reduceat(weights * levels, first)
+
+        # run length per reading, continuing the previous batch's run
+        breaks = np.r_[True, values[1:] != values[:-1]]
+        breaks[first] = True
+        run_start = np.maximum.accumulate(np.where(breaks, at, 0))
+        runs = at - run_start + 1
+        continued = values[first] == np.array([s.last for s in stats])
+        carried = np.array([s.run for s in stats]) * continued
+        runs += np.where(run_start == first[group], carried[group], 0)
+        for i in np.flatnonzero(runs == self.stuck_after).tolist():
+            value, ts = float(values[i]), float(timestamps[i])
+            self._flag("stuck", channel, value, self.stuck_after, ts, names[group[i]])
+
+        # quartile sketches take at most sketch_sample readings: the last one of each
+        # warming zone (a rotating subset when they do not all fit), then a stride
+        budget = self.sketch_sample
+        sampled = at[:0]
+        cold = np.flatnonzero([s.sketched < MIN_SKETCHED for s in stats])
+        if len(cold):
+            take = min(len(cold), budget)
+            start = self._cold_cursor % len(cold)
+            self._cold_cursor = start + take
+            sampled = last[np.roll(cold, -start)[:take]]
+            budget -= take
+        if budget:
+            strided = at[:: max(1, -(-len(values) // budget))]
+            sampled = np.union1d(strided, sampled) if len(sampled) else strided
+        for i in sampled.tolist():
+            stats[group[i]].sketch(float(values[i]))
+
+        end_ts = timestamps[last].tolist()
+        for g, s in enumerate(stats):
+            s.n, s.mean, s.m2, s.ewma = int(n[g]), float(mean[g]), float(m2[g]), float(ewma[g])
+            s.last, s.run = float(values[last[g]]), int(runs[last[g]])
+            if ready[g]:
+                self._check_drift(s, channel, end_ts[g], names[g], center[g], scale[g])
+
+    def drain(self) -> List[Anomaly]:
+        """Return and clear the anomalies flagged since the last call."""
+        anomalies = list(self.pending)
+        self.pending.clear()
+        return anomalies
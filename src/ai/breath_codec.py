@@ -0,0 +1,92 @@
+"""Wire formats for bulk breath-packet uploads.
+
+Gateways batch thousands of readings per request. Two encodings are accepted:
+
+* **NDJSON** (``application/x-ndjson``) - one JSON object per line with numeric
+  readings plus optional ``ts`` (epoch seconds) and ``zone``. The lines are joined
+  into a single JSON array so the whole body is parsed by one ``json.loads`` call.
+* **Binary** (``application/vnd.ness.breath``) - the :mod:`sensor_batch` wire
+  layout, decoded into a :class:`SensorBatch` that views the body without copying.
+
+Both decoders validate the whole body up front and raise :class:`ValueError` with the
+offending packet index, so callers can reject the upload as a whole. Readings must
+be finite: ``NaN`` and ``Infinity`` (which Python's JSON parser accepts) are refused.
+In the binary layout ``NaN`` marks an absent channel or timestamp, so only infinities
+are refused there.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .divine_climate_brain import SensorPacket
+from .sensor_batch import SensorBatch
+
+NDJSON_MEDIA_TYPES = ("application/x-ndjson", "application/jsonl", "application/json-seq")
+BINARY_MEDIA_TYPE = "application/vnd.ness.breath"
+
+
+def _packet(index: int, item: Any) -> SensorPacket:
+    if not isinstance(item, dict):
+        raise ValueError(f"packet {index}: expected an object")
+    data: Dict[str, float] = {}
+    timestamp = zone = None
+    for key, value in item.items():
+        if key == "zone":
+            if not isinstance(value, str):
+                raise ValueError(f"packet {index}: zone must be a string")
+            zone = value
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            if not math.isfinite(value):
+                raise ValueError(f"packet {index}: {key!r} must be finite")
+            if key == "ts":
+                timestamp = float(value)
+            else:
+                data[key] = value
+        else:
+            raise ValueError(f"packet {index}: {key!r} must be a number")
+    return SensorPacket(data=data, timestamp=timestamp, zone=zone)
+
+
+def _reject_constant(name: str) -> Any:
+    raise ValueError(f"invalid NDJSON: {name} is not a valid reading")
+
+
+def decode_ndjson(body: bytes) -> List[SensorPacket]:
+    """Decode newline-delimited JSON packets in one parser pass."""
+    lines = [line for line in body.split(b"\n") if line.strip()]
+    try:
+        items = json.loads(b"[" + b",".join(lines) + b"]", parse_constant=_reject_constant)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"invalid NDJSON: {exc.msg}") from None
+    return [_packet(i, item) for i, item in enumerate(items)]
+
+
+def decode_objects(items: Sequence[Any]) -> List[SensorPacket]:
+    """Validate already-parsed packet objects (e.g. from msgpack)."""
+    return [_packet(i, item) for i, item in enumerate(items)]
+
+
+def decode_binary(body) -> SensorBatch:
+    """Wrap a binary body as a batch; the records stay a view over ``body``.
+
+    Raises:
+        ValueError: If the body is malformed or a reading or timestamp is infinite.
+    """
+    batch = SensorBatch.from_buffer(body)
+    for name in ("ts", *batch.channels):
+        bad = np.isinf(batch.records[name])
+        if bad.any():
+            raise ValueError(f"packet {int(np.argmax(bad))}: {name!r} must be finite")
+    return batch
+
+
+def encode_binary(
+    packets: Sequence[Mapping[str, Any]], channels: Optional[Sequence[str]] = None
+) -> bytes:
+    """Encode packet dicts (readings plus optional ``ts``/``zone``) as a binary batch."""
+    return SensorBatch.from_packets(packets, channels).tobytes()
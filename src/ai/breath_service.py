@@ -8,25 +8,51 @@ commands to actuators.
 from __future__ import annotations
 
 import logging
-import sys
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, Optional, Union
 
-# Ensure local imports work when running this file directly
-sys.path.append(str(Path(__file__).resolve().parent))
-
-from actuator_dispatcher import ActuatorDispatcher
-from divine_climate_brain import ClimateBrain, SensorPacket
+from . import instrumentation
+from . import warmth_predictor
+from .actuator_dispatcher import ActuatorDispatcher
+from .anomaly_detector import AnomalyDetector
+from .divine_climate_brain import ClimateBrain, SensorPacket
+from .model_runtime import ModelRegistry
+from .sensor_batch import SensorBatch
 
 logger = logging.getLogger(__name__)
+_log_packet = instrumentation.LogSampler(logger)
+_PROCESS = instrumentation.stage("process")
 
 
 class BreathService:
     """Service orchestration for breath-driven terraforming."""
 
-    def __init__(self) -> None:
-        self.brain = ClimateBrain()
+    def __init__(
+        self,
+        model_dir: Optional[Path] = None,
+        model_version: Optional[str] = None,
+        recorder: Optional[Any] = None,
+        detector: Optional[AnomalyDetector] = None,
+    ) -> None:
+        """Create the brain and dispatcher and warm the warmth predictor.
+
+        Args:
+            model_dir: Model registry root; when set the warmth model is loaded from it.
+            model_version: Registry version to load, defaulting to the latest.
+            recorder: Optional :class:`breath_trace.TraceRecorder` that every received
+                packet is also written to, for later replay.
+            detector: Optional :class:`AnomalyDetector`; when set, every ingested
+                reading is scored and flagged ones are escalated by :meth:`process`.
+        """
+        self.brain = ClimateBrain(detector=detector)
+        self.recorder = recorder
         self.dispatcher = ActuatorDispatcher()
+        runtime = warmth_predictor.runtime
+        if model_dir is not None:
+            runtime.registry = ModelRegistry(model_dir)
+            runtime.load(model_version)  # load() warms the model before activating it
+        else:
+            runtime.warmup()
 
     def receive_breath(self, raw: Dict[str, Any]) -> None:
         """Normalize and ingest breath sensor data.
@@ -36,17 +62,53 @@ class BreathService:
         """
         # TODO: Apply validation and normalization of raw packet values
         packet = SensorPacket(data=raw)
-        logger.info("Received breath packet: %s", packet)
+        if self.recorder is not None:
+            self.recorder.record(raw)
+        if _log_packet():
+            logger.debug("Received breath packet: %s", packet)
         self.brain.ingest_sensor_data(packet)
 
+    def receive_packets(self, packets: Union[Iterable[SensorPacket], SensorBatch]) -> int:
+        """Ingest already-decoded packets in bulk, e.g. a batch read from a stream.
+
+        Args:
+            packets: Sensor packets, optionally carrying timestamps and zones, or a
+                columnar :class:`SensorBatch`.
+
+        Returns:
+            Number of packets ingested.
+        """
+        if self.recorder is not None:
+            if isinstance(packets, SensorBatch):
+                self.recorder.record_batch(packets)
+            else:
+                packets = list(packets)
+                for packet in packets:
+                    self.recorder.record(packet.data, packet.timestamp, packet.zone)
+        return self.brain.ingest_many(packets)
+
     def process(self) -> None:
-        """Run prediction and dispatch actuator directives."""
-        directives = self.brain.predict()
-        self.dispatcher.dispatch(directives)
+        """Escalate flagged anomalies, then run prediction and dispatch directives.
+
+        With a detector configured, anomalies go out on the ``emergency`` lane to
+        ``<topic>/anomaly`` before prediction runs, so they reach actuators ahead of
+        routine directives.
+        """
+        with _PROCESS.time():
+            detector = self.brain.detector
+            anomalies = detector.drain() if detector is not None else []
+            if anomalies:
+                logger.warning("Escalating %d sensor anomalies", len(anomalies))
+            for anomaly in anomalies:
+                self.dispatcher.dispatch(
+                    anomaly.directive(), f"{self.dispatcher.topic}/anomaly", priority="emergency"
+                )
+            directives = self.brain.predict()
+            self.dispatcher.dispatch(directives)
 
 
 if __name__ == "__main__":
-    logging.basicConfig(level=logging.INFO)
+    logging.basicConfig(level=logging.DEBUG)
     service = BreathService()
     # Example payload representing breath-derived metrics
     service.receive_breath({"temp": 21.5, "humidity": 0.44})
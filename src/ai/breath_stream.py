@@ -0,0 +1,301 @@
+"""Redis Streams ingestion pipeline for :class:`BreathService`.
+
+Edge devices ``XADD`` breath packets to a stream; any number of service processes
+join one consumer group and split the traffic. Each consumer runs three asyncio
+stages connected by bounded buffers:
+
+* **read** - ``XREADGROUP`` in batches of ``batch_size`` entries, parking each batch
+  on a queue of at most ``max_batches`` so a slow brain pushes back on Redis reads
+  instead of growing memory;
+* **ingest** - decode a batch into :class:`SensorPacket` objects and hand it to
+  :meth:`BreathService.receive_packets` in one call;
+* **tick** - every ``tick_interval`` seconds run prediction and dispatch once if new
+  data arrived, then ``XACK`` everything ingested since the previous tick.
+
+Entries are acknowledged only after a tick has acted on them, so a crashed consumer
+leaves them pending: on restart it re-reads its own pending entries first, and
+live consumers periodically ``XAUTOCLAIM`` entries that another consumer left idle.
+A failure in any stage is logged and retried on the next round rather than ending
+the stage's task; entries the brain could not ingest stay pending until reclaimed.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+import redis.asyncio as redis
+from redis.exceptions import ResponseError
+
+from .breath_service import BreathService
+from .divine_climate_brain import SensorPacket
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()  # sentinel telling the ingest stage to exit
+ACK_CHUNK = 1000
+_TRANSIENT = (redis.ConnectionError, redis.TimeoutError)
+
+
+def encode_packet(
+    raw: Mapping[str, Any], timestamp: Optional[float] = None, zone: Optional[str] = None
+) -> Dict[str, Union[str, float]]:
+    """Stream fields for one packet: readings plus optional ``ts`` and ``zone``."""
+    fields: Dict[str, Union[str, float]] = dict(raw)
+    if timestamp is not None:
+        fields["ts"] = timestamp
+    if zone is not None:
+        fields["zone"] = zone
+    return fields
+
+
+def decode_entry(fields: Mapping[Any, Any]) -> SensorPacket:
+    """Build a packet from stream fields; numeric strings become floats.
+
+    Raises:
+        ValueError: If ``ts`` is present but not a number.
+    """
+    data: Dict[str, Any] = {}
+    timestamp = zone = None
+    for key, value in fields.items():
+        key = key.decode() if isinstance(key, bytes) else key
+        value = value.decode() if isinstance(value, bytes) else value
+        if key == "ts":
+            timestamp = float(value)
+        elif key == "zone":
+            zone = value
+        else:
+            try:
+                data[key] = float(value)
+            except ValueError:
+                data[key] = value
+    return SensorPacket(data=data, timestamp=timestamp, zone=zone)
+
+
+class BreathStreamConsumer:
+    """Consume a breath packet stream into a :class:`BreathService`.
+
+    Args:
+        service: Service whose brain is fed and whose ``process`` runs each tick.
+        client: Async Redis client.
+        stream: Stream key producers write to.
+        group: Consumer group shared by every service process.
+        consumer: Unique name of this process in the group; defaults to host-pid.
+        batch_size: Maximum entries per ``XREADGROUP``.
+        block_ms: How long a read waits for new entries.
+        tick_interval: Seconds between prediction/acknowledgement ticks.
+        max_batches: Read batches buffered ahead of ingestion.
+        claim_idle_ms: Reclaim entries other consumers left pending this long.
+        start_id: Where a newly created group starts reading (``"0"`` or ``"$"``).
+    """
+
+    def __init__(
+        self,
+        service: BreathService,
+        client: redis.Redis,
+        stream: str = "breath:packets",
+        group: str = "breath-service",
+        consumer: Optional[str] = None,
+        batch_size: int = 256,
+        block_ms: int = 100,
+        tick_interval: float = 0.1,
+        max_batches: int = 8,
+        claim_idle_ms: int = 60_000,
+        start_id: str = "0",
+    ) -> None:
+        self.service = service
+        self.client = client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.batch_size = batch_size
+        self.block_ms = block_ms
+        self.tick_interval = tick_interval
+        self.claim_idle_ms = claim_idle_ms
+        self.start_id = start_id
+        self.received = 0
+        self.invalid = 0
+        self.acked = 0
+        self.ticks = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_batches)
+        self._unacked: List[Any] = []
+        self._dirty = False
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def ensure_group(self) -> None:
+        """Create the consumer group (and stream) unless it already exists."""
+        try:
+            await self.client.xgroup_create(
+                self.stream, self.group, id=self.start_id, mkstream=True
+            )
+        except ResponseError as exc:
+            if "BUSYGROUP" not in str(exc):
+                raise
+
+    def start(self) -> None:
+        """Launch the read, ingest and tick stages on the running loop."""
+        self._stopping = False
+        self._tasks = [
+            asyncio.create_task(self._read_loop()),
+            asyncio.create_task(self._ingest_loop()),
+            asyncio.create_task(self._tick_loop()),
+        ]
+
+    async def aclose(self) -> None:
+        """Stop reading, ingest what was already read, then run a final tick."""
+        if not self._tasks:
+            return
+        reader, ingester, ticker = self._tasks
+        self._tasks = []
+        # let a blocked XREADGROUP time out rather than cancelling it mid-command
+        self._stopping = True
+        await asyncio.gather(reader, ticker)
+        await self._queue.put(_STOP)
+        await ingester
+        await self.tick()
+
+    async def _read_loop(self) -> None:
+        recovered = False
+        next_claim = 0.0
+        while not self._stopping:
+            try:
+                if not recovered:
+                    await self.ensure_group()
+                    # our own entries left unacknowledged by a previous run come first
+                    await self._read_from("0")
+                    recovered = True
+                if time.monotonic() >= next_claim:
+                    await self._claim_idle()
+                    next_claim = time.monotonic() + self.claim_idle_ms / 1000
+                await self._read_once()
+            except _TRANSIENT as exc:
+                logger.warning("Breath stream read failed: %s", exc)
+                await asyncio.sleep(self.tick_interval)
+            except Exception:
+                logger.exception("Breath stream read failed")
+                await asyncio.sleep(self.tick_interval)
+
+    async def _read_once(self) -> None:
+        response = await self.client.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=self.batch_size,
+            block=self.block_ms,
+        )
+        for _, entries in response or []:
+            if entries:
+                await self._queue.put(entries)
+
+    async def _read_from(self, last_id: str) -> None:
+        """Drain this consumer's pending list, which re-delivers from ``last_id``."""
+        while True:
+            response = await self.client.xreadgroup(
+                self.group, self.consumer, {self.stream: last_id}, count=self.batch_size
+            )
+            entries = response[0][1] if response else []
+            if not entries:
+                return
+            await self._queue.put(entries)
+            last_id = entries[-1][0]
+
+    async def _claim_idle(self) -> None:
+        start = "0-0"
+        while True:
+            result = await self.client.xautoclaim(
+                self.stream,
+                self.group,
+                self.consumer,
+                self.claim_idle_ms,
+                start_id=start,
+                count=self.batch_size,
+            )
+            start, claimed = result[0], result[1]
+            entries = []
+            for entry_id, fields in claimed:
+                if fields is None:
+                    self._unacked.append(entry_id)  # deleted from the stream; just ack it
+                else:
+                    entries.append((entry_id, fields))
+            if entries:
+                logger.info("Claimed %d idle breath packets", len(entries))
+                await self._queue.put(entries)
+            if start in (b"0-0", "0-0") or not claimed:
+                return
+
+    async def _ingest_loop(self) -> None:
+        while True:
+            entries = await self._queue.get()
+            if entries is _STOP:
+                return
+            packets: List[SensorPacket] = []
+            for entry_id, fields in entries:
+                try:
+                    packets.append(decode_entry(fields))
+                except Exception as exc:
+                    self.invalid += 1
+                    logger.warning("Dropping malformed breath packet %s: %s", entry_id, exc)
+            try:
+                self.received += self.service.receive_packets(packets)
+            except Exception:
+                # left unacknowledged, so XAUTOCLAIM offers the batch again later
+                logger.exception("Failed to ingest %d breath packets", len(packets))
+                continue
+            self._unacked.extend(entry_id for entry_id, _ in entries)  # malformed ones too
+            self._dirty = self._dirty or bool(packets)
+
+    async def _tick_loop(self) -> None:
+        while not self._stopping:
+            await asyncio.sleep(self.tick_interval)
+            try:
+                await self.tick()
+            except _TRANSIENT as exc:
+                logger.warning("Breath stream acknowledgement failed: %s", exc)
+            except Exception:
+                logger.exception("Breath stream tick failed")
+
+    async def tick(self) -> None:
+        """Predict and dispatch once for new data, then acknowledge it."""
+        ids, self._unacked = self._unacked, []
+        try:
+            if self._dirty:
+                self._dirty = False
+                self.service.process()
+                self.ticks += 1
+            for i in range(0, len(ids), ACK_CHUNK):
+                await self.client.xack(self.stream, self.group, *ids[i : i + ACK_CHUNK])
+        except Exception:
+            self._unacked[:0] = ids  # retry on the next tick
+            raise
+        self.acked += len(ids)
+
+
+async def _main() -> None:
+    client = redis.from_url(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    recorder = None
+    if os.getenv("BREATH_TRACE_PATH"):
+        from .breath_trace import TraceRecorder
+
+        recorder = TraceRecorder(os.environ["BREATH_TRACE_PATH"])
+    consumer = BreathStreamConsumer(BreathService(recorder=recorder), client)
+    consumer.start()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await consumer.aclose()
+        await client.aclose()
+        if recorder is not None:
+            recorder.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_main())
+    except KeyboardInterrupt:
+        pass
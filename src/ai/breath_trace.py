@@ -0,0 +1,359 @@
+"""Record breath packet streams to disk and replay them as load against BreathService.
+
+A trace file is ``b"BRT1"`` followed by length-prefixed chunks, and each chunk is a
+:class:`SensorBatch` in its wire layout. So a trace costs 10 bytes plus 8 per
+channel for each packet, and reading one maps the file and views every chunk without
+copying. Only numeric readings are kept.
+
+Traces come from three places:
+
+* :class:`TraceRecorder` attached to a live :class:`BreathService` (``recorder=``),
+  e.g. the Redis stream consumer with ``BREATH_TRACE_PATH`` set.
+* :func:`simulate_fleet`, which synthesizes ``N`` sensors with per-sensor offsets, a
+  diurnal cycle, AR(1) noise, send jitter and dropouts.
+* Any list of packets passed to :func:`write_trace`.
+
+:func:`replay` feeds a trace through ``receive_breath``/``process`` at a speed
+multiplier, or as fast as possible with ``speed=None``. Each packet's latency runs
+from its scheduled arrival to the end of its ``process`` call, so time spent waiting
+behind earlier packets counts once the service falls behind. :func:`sweep` raises
+the speed until the service stops keeping up, which gives the saturation point.
+
+    PYTHONPATH=src python -m ai.breath_trace simulate --sensors 500 --duration 60 --out fleet.brt
+    PYTHONPATH=src python -m ai.breath_trace replay fleet.brt --speed 10
+    PYTHONPATH=src python -m ai.breath_trace sweep fleet.brt --speeds 1 10 100 max
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import mmap
+import struct
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .divine_climate_brain import SensorPacket
+from .sensor_batch import SensorBatch, record_dtype
+
+MAGIC = b"BRT1"
+_LENGTH = struct.Struct("<I")
+# sustained throughput below this share of the offered rate counts as saturated
+SATURATION_RATIO = 0.95
+
+
+class TraceRecorder:
+    """Append packets to a trace file in chunks of ``chunk_packets``.
+
+    Args:
+        path: Trace file; appended to if it already exists.
+        chunk_packets: Packets buffered in memory before a chunk is written.
+    """
+
+    def __init__(self, path: Path, chunk_packets: int = 4096) -> None:
+        self.path = Path(path)
+        self.chunk_packets = chunk_packets
+        self.recorded = 0
+        self._pending: List[Dict[str, Any]] = []
+        self._fh = self.path.open("ab")
+        if self._fh.tell() == 0:
+            self._fh.write(MAGIC)
+
+    def record(
+        self,
+        raw: Mapping[str, Any],
+        timestamp: Optional[float] = None,
+        zone: Optional[str] = None,
+    ) -> None:
+        """Buffer one packet, stamped with the current time unless ``timestamp`` is set."""
+        packet = {k: v for k, v in raw.items() if isinstance(v, (int, float))}
+        packet["ts"] = time.time() if timestamp is None else timestamp
+        if zone is not None:
+            packet["zone"] = zone
+        self._pending.append(packet)
+        self.recorded += 1
+        if len(self._pending) >= self.chunk_packets:
+            self.flush()
+
+    def record_batch(self, batch: SensorBatch) -> None:
+        """Write a columnar batch as its own chunk; rows without a timestamp get now."""
+        self.flush()
+        records = batch.records
+        if np.isnan(records["ts"]).any():
+            records = records.copy()
+            records["ts"][np.isnan(records["ts"])] = time.time()
+            batch = SensorBatch(batch.channels, batch.zones, records)
+        self._write(batch)
+        self.recorded += len(batch)
+
+    def flush(self) -> None:
+        """Write buffered packets as a chunk."""
+        if self._pending:
+            self._write(SensorBatch.from_packets(self._pending))
+            self._pending = []
+        self._fh.flush()
+
+    def _write(self, batch: SensorBatch) -> None:
+        data = batch.tobytes()
+        self._fh.write(_LENGTH.pack(len(data)) + data)
+
+    def close(self) -> None:
+        self.flush()
+        self._fh.close()
+
+    def __enter__(self) -> "TraceRecorder":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+
+def write_trace(path: Path, packets: Sequence[Mapping[str, Any]]) -> None:
+    """Write packet dicts (readings plus ``ts`` and optional ``zone``) as a trace."""
+    with TraceRecorder(path, chunk_packets=max(1, len(packets))) as recorder:
+        for packet in packets:
+            readings = {k: v for k, v in packet.items() if k not in ("ts", "zone")}
+            recorder.record(readings, packet.get("ts"), packet.get("zone"))
+
+
+def read_trace(path: Path) -> Iterator[SensorBatch]:
+    """Yield the chunks of a trace as batches viewing a read-only map of the file.
+
+    A chunk cut short by a crash while recording ends the trace.
+
+    Raises:
+        ValueError: If the file is not a trace.
+    """
+    with Path(path).open("rb") as fh:
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not a breath trace")
+        size = fh.seek(0, 2)
+        if size == len(MAGIC):
+            return
+        view = memoryview(mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ))
+    pos = len(MAGIC)
+    while pos + _LENGTH.size <= len(view):
+        (length,) = _LENGTH.unpack_from(view, pos)
+        pos += _LENGTH.size
+        if pos + length > len(view):
+            return
+        yield SensorBatch.from_buffer(view[pos : pos + length])
+        pos += length
+
+
+def simulate_fleet(
+    sensors: int,
+    duration: float,
+    interval: float = 1.0,
+    zones: int = 0,
+    dropout: float = 0.01,
+    seed: int = 0,
+    start: float = 0.0,
+) -> SensorBatch:
+    """Synthesize readings from a fleet of sensors, ordered by timestamp.
+
+    Each sensor reports every ``interval`` seconds with uniform jitter of +/-10%. Its
+    temperature is a per-sensor offset around 21 C, plus a 24 h sinusoid with a
+    random phase, plus AR(1) noise. Humidity is drawn from a beta distribution
+    around 45%. A ``dropout`` share of reports is lost.
+
+    Args:
+        sensors: Fleet size.
+        duration: Seconds of traffic to generate.
+        interval: Mean seconds between reports of one sensor.
+        zones: Spread sensors over this many zones (``sensor i`` in ``zone i % zones``);
+            ``0`` sends everything to the implicit zone.
+        dropout: Probability that a report is lost.
+        seed: Random seed; the same arguments always produce the same fleet.
+        start: Timestamp of the first report window.
+    """
+    rng = np.random.default_rng(seed)
+    steps = max(1, int(duration / interval))
+    base = rng.normal(21.0, 2.0, sensors)
+    amplitude = rng.uniform(0.5, 3.0, sensors)
+    phase = rng.uniform(0, 2 * np.pi, sensors)
+    ts = start + (np.arange(steps)[:, None] + rng.uniform(-0.1, 0.1, (steps, sensors)))
+    ts = np.maximum(ts * interval, start)
+    noise = np.empty((steps, sensors))
+    noise[0] = rng.normal(0, 0.3, sensors)
+    shocks = rng.normal(0, 0.1, (steps, sensors))
+    for i in range(1, steps):
+        noise[i] = 0.9 * noise[i - 1] + shocks[i]
+    temp = base + amplitude * np.sin(2 * np.pi * ts / 86_400 + phase) + noise
+    humidity = rng.beta(9, 11, (steps, sensors))
+    keep = rng.random((steps, sensors)) >= dropout
+    order = np.argsort(ts[keep], kind="stable")
+
+    names = [f"zone-{z}" for z in range(zones)]
+    records = np.zeros(int(keep.sum()), dtype=record_dtype(["temp", "humidity"]))
+    records["ts"] = ts[keep][order]
+    records["temp"] = temp[keep][order]
+    records["humidity"] = humidity[keep][order]
+    sensor_ids = np.broadcast_to(np.arange(sensors), (steps, sensors))[keep][order]
+    records["zone"] = sensor_ids % zones if zones else -1
+    return SensorBatch(["temp", "humidity"], names, records)
+
+
+@dataclass
+class ReplayReport:
+    """Outcome of one :func:`replay` run; latencies are in milliseconds."""
+
+    speed: Optional[float]
+    packets: int
+    seconds: float
+    offered_per_sec: Optional[float]
+    achieved_per_sec: float
+    p50_ms: float
+    p90_ms: float
+    p99_ms: float
+    max_ms: float
+
+    @property
+    def saturated(self) -> bool:
+        """Whether the service fell short of the offered rate."""
+        if self.offered_per_sec is None:
+            return True  # max speed is saturated by definition
+        return self.achieved_per_sec < SATURATION_RATIO * self.offered_per_sec
+
+
+def replay(
+    service,
+    batches: Sequence[SensorBatch],
+    speed: Optional[float] = 1.0,
+    process_every: int = 1,
+    limit: Optional[int] = None,
+) -> ReplayReport:
+    """Drive ``service`` with a trace and measure per-packet latency.
+
+    Args:
+        service: A :class:`BreathService` (or anything with the same methods).
+        batches: Trace chunks, e.g. ``list(read_trace(path))``.
+        speed: Time compression; ``10`` plays ten seconds of trace per second and
+            ``None`` sends packets back to back.
+        process_every: Call ``process`` once per this many packets.
+        limit: Stop after this many packets.
+    """
+    latencies: List[float] = []
+    first_ts: Optional[float] = None
+    last_ts = 0.0
+    started = time.perf_counter()
+    sent = 0
+    for batch in batches:
+        for ts, zone, data in batch.rows():
+            if limit is not None and sent >= limit:
+                break
+            ts = last_ts if ts is None else ts
+            if first_ts is None:
+                first_ts = ts
+            last_ts = ts
+            if speed is not None:
+                due = started + (ts - first_ts) / speed
+                ahead = due - time.perf_counter()
+                if ahead > 0.001:
+                    time.sleep(ahead)
+            else:
+                due = time.perf_counter()
+            if zone is None:
+                service.receive_breath(data)
+            else:
+                service.receive_packets([SensorPacket(data=data, timestamp=ts, zone=zone)])
+            sent += 1
+            if sent % process_every == 0:
+                service.process()
+            latencies.append(time.perf_counter() - due)
+    elapsed = time.perf_counter() - started
+    ms = np.asarray(latencies or [0.0]) * 1e3
+    span = (last_ts - first_ts) if first_ts is not None else 0.0
+    offered = sent / (span / speed) if speed is not None and span > 0 else None
+    return ReplayReport(
+        speed=speed,
+        packets=sent,
+        seconds=elapsed,
+        offered_per_sec=offered,
+        achieved_per_sec=sent / elapsed if elapsed > 0 else math.inf,
+        p50_ms=float(np.percentile(ms, 50)),
+        p90_ms=float(np.percentile(ms, 90)),
+        p99_ms=float(np.percentile(ms, 99)),
+        max_ms=float(ms.max()),
+    )
+
+
+def sweep(
+    make_service: Callable[[], Any],
+    batches: Sequence[SensorBatch],
+    speeds: Sequence[Optional[float]] = (1, 10, 100, None),
+    **kwargs: Any,
+) -> Dict[str, Any]:
+    """Replay at increasing speeds with a fresh service each time.
+
+    Returns:
+        ``{"runs": [report, ...], "saturation_per_sec": rate}``. The rate is the
+        highest offered rate that was sustained, or the back-to-back throughput
+        if every tested speed was sustained.
+    """
+    runs: List[ReplayReport] = []
+    saturation = None
+    for speed in speeds:
+        report = replay(make_service(), batches, speed, **kwargs)
+        runs.append(report)
+        if report.saturated:
+            saturation = report.achieved_per_sec if speed is None else saturation
+            break
+        saturation = report.offered_per_sec
+    return {"runs": [asdict(r) for r in runs], "saturation_per_sec": saturation}
+
+
+def _speed(value: str) -> Optional[float]:
+    return None if value == "max" else float(value)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record and replay breath packet traces")
+    commands = parser.add_subparsers(dest="command", required=True)
+    sim = commands.add_parser("simulate", help="write a synthetic fleet trace")
+    sim.add_argument("--sensors", type=int, default=100)
+    sim.add_argument("--duration", type=float, default=60.0)
+    sim.add_argument("--interval", type=float, default=1.0)
+    sim.add_argument("--zones", type=int, default=0)
+    sim.add_argument("--seed", type=int, default=0)
+    sim.add_argument("--out", type=Path, required=True)
+    for name in ("replay", "sweep"):
+        sub = commands.add_parser(name, help=f"{name} a trace through BreathService")
+        sub.add_argument("trace", type=Path)
+        sub.add_argument("--process-every", type=int, default=1)
+        sub.add_argument("--limit", type=int)
+    commands.choices["replay"].add_argument("--speed", type=_speed, default=1.0)
+    commands.choices["sweep"].add_argument(
+        "--speeds", type=_speed, nargs="+", default=[1.0, 10.0, 100.0, None]
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == "simulate":
+        args.out.unlink(missing_ok=True)
+        fleet = simulate_fleet(
+            args.sensors, args.duration, args.interval, args.zones, seed=args.seed
+        )
+        with TraceRecorder(args.out) as recorder:
+            recorder.record_batch(fleet)
+        print(json.dumps({"packets": len(fleet), "bytes": args.out.stat().st_size}))
+        return 0
+
+    from .breath_service import BreathService
+
+    batches = list(read_trace(args.trace))
+    options = {"process_every": args.process_every, "limit": args.limit}
+    if args.command == "replay":
+        result: Any = asdict(replay(BreathService(), batches, args.speed, **options))
+    else:
+        result = sweep(BreathService, batches, args.speeds, **options)
+    print(json.dumps(result, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -3,19 +3,79 @@
 The voice agent defaults to an ICS file-based backend for offline operation but can
 optionally integrate with external calendar systems such as Google Calendar, CalDAV or
 Microsoft Graph. Backends share an ``add_event`` interface to keep the agent decoupled
-from storage specifics.
+from storage specifics, plus ``add_events`` for bulk imports that backends implement
+with their native batching primitives.
 """
 
 from __future__ import annotations
 
+import contextlib
+import email.utils
+import functools
+import os
 from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timezone
 from pathlib import Path
 import time
-
-from ics import Calendar, Event
+from typing import IO, TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from . import instrumentation
+from .interval_index import (
+    BlockRef,
+    IntervalIndex,
+    load_sidecar,
+    save_sidecar,
+    scan_vevents,
+    scanned_length,
+    timestamp,
+)
+
+if TYPE_CHECKING:
+    from ics import Calendar, Event
 
 # Third‑party client libraries are imported lazily inside each backend so deployments
-# that only require local `.ics` support do not need them installed.
+# that only require local `.ics` support do not need them installed. ``ics`` itself is
+# imported on first parse as well: it dominates import time, and streaming an indexed
+# calendar never needs it for the events themselves.
+
+CALENDAR_LATENCY_BOUNDS = (1e-3, 5e-3, 1e-2, 5e-2, 0.1, 0.5, 1.0, 5.0, 30.0)
+
+
+def _metered(add_events):
+    """Time ``add_events`` and count its results per backend class."""
+
+    @functools.wraps(add_events)
+    def wrapper(self, events: Iterable[Event]) -> List[EventResult]:
+        start = time.perf_counter()
+        results = add_events(self, events)
+        backend = type(self).__name__
+        instrumentation.histogram(
+            "ness_calendar_add_seconds",
+            "Wall time of CalendarBackend.add_events calls",
+            bounds=CALENDAR_LATENCY_BOUNDS,
+            backend=backend,
+        ).observe(time.perf_counter() - start)
+        ok = sum(1 for result in results if result.ok)
+        for outcome, n in (("ok", ok), ("error", len(results) - ok)):
+            instrumentation.counter(
+                "ness_calendar_events_total",
+                "Events persisted by calendar backends",
+                backend=backend,
+                result=outcome,
+            ).inc(n)
+        return results
+
+    return wrapper
+
+
+@dataclass
+class EventResult:
+    """Outcome of persisting one event via :meth:`CalendarBackend.add_events`."""
+
+    event: Event
+    ok: bool
+    error: Optional[BaseException] = None
 
 
 class CalendarBackend(ABC):
@@ -25,33 +85,352 @@ class CalendarBackend(ABC):
     def add_event(self, event: Event) -> None:  # pragma: no cover - interface
         """Persist a newly created event."""
 
+    @_metered
+    def add_events(self, events: Iterable[Event]) -> List[EventResult]:
+        """Persist many events, returning one result per event in input order.
+
+        The default implementation loops over :meth:`add_event`; backends override it
+        with a native bulk path.
+        """
+        results = []
+        for event in events:
+            try:
+                self.add_event(event)
+            except Exception as exc:  # report per event instead of aborting the import
+                results.append(EventResult(event, False, exc))
+            else:
+                results.append(EventResult(event, True))
+        return results
+
     @abstractmethod
     def serialize(self) -> str:  # pragma: no cover - interface
         """Return a serialized representation of the calendar."""
 
+    def iter_serialize(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """Yield the serialized calendar in chunks, optionally limited to a time range."""
+        if start is not None or end is not None:
+            raise NotImplementedError(f"{type(self).__name__} does not support range queries")
+        yield self.serialize()
+
+    def events_between(self, start: datetime, end: datetime) -> List[Event]:
+        """Return events overlapping ``[start, end)``, ordered by start."""
+        raise NotImplementedError(f"{type(self).__name__} does not support range queries")
+
+    def free_busy(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Return merged busy periods within ``[start, end)``."""
+        raise NotImplementedError(f"{type(self).__name__} does not support range queries")
+
+    def conflicts_with(self, event: Event) -> List[Event]:
+        """Return stored events overlapping ``event``."""
+        raise NotImplementedError(f"{type(self).__name__} does not support range queries")
+
+
+@functools.lru_cache(maxsize=None)
+def _calendar_frame() -> Tuple[str, str]:
+    """Text before and after the events of an empty serialized ``VCALENDAR``."""
+    from ics import Calendar
+
+    head, _, footer = str(Calendar()).rpartition("END:VCALENDAR")
+    return head, "END:VCALENDAR" + footer
+
+
+def _scan_rows(data: bytes, source: str, base_offset: int = 0) -> List[list]:
+    """Sidecar rows ``[source, offset, length, uid, start, end]`` for ``data``."""
+    return [
+        [ref.source, ref.offset, ref.length, ref.uid, start, end]
+        for start, end, ref in scan_vevents(data, source, base_offset)
+    ]
+
 
 class ICSCalendarBackend(CalendarBackend):
-    """Store events in a local `.ics` file for simple deployments."""
+    """Store events in a local `.ics` file for simple deployments.
 
-    def __init__(self, path: Path) -> None:
+    By default every ``add_event`` rewrites the whole file. With ``journal=True`` new
+    events are appended as ``VEVENT`` blocks to a sibling ``.journal`` file instead,
+    flushed per event and fsynced every ``fsync_every`` appends; :meth:`compact`
+    folds the journal back into a canonical `.ics` (automatically once
+    ``compact_every`` events are journaled, if set). In both modes the calendar is
+    parsed lazily on first read, so construction does not scale with history.
+
+    Range queries go through an :class:`IntervalIndex` that is updated on every add.
+    If the calendar has not been parsed yet, the index is built from a lightweight
+    scan of the files, cached in a ``.idx`` sidecar, and only matching events are
+    parsed.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        journal: bool = False,
+        fsync_every: int = 64,
+        compact_every: Optional[int] = None,
+    ) -> None:
         self.path = path
-        if path.exists():
-            self.calendar = Calendar(path.read_text())
-        else:
-            self.calendar = Calendar()
+        self.journal = journal
+        self.journal_path = path.with_name(path.name + ".journal")
+        self.fsync_every = fsync_every
+        self.compact_every = compact_every
+        self._calendar: Optional[Calendar] = None
+        self._journal_file: Optional[IO[str]] = None
+        self._unsynced = 0
+        self._journaled = 0
+        self.index_path = path.with_name(path.name + ".idx")
+        self._index: Optional[IntervalIndex] = None
+        self._index_has_refs = False  # entries point at file offsets, not parsed events
+
+    @property
+    def calendar(self) -> Calendar:
+        """Parsed calendar including journaled events, loaded on first access."""
+        if self._calendar is None:
+            self._calendar = self._load()
+        return self._calendar
+
+    def _load(self) -> Calendar:
+        from ics import Calendar
+
+        base = self.path.read_text() if self.path.exists() else ""
+        pending = self._read_journal()
+        if not pending:
+            return Calendar(base) if base else Calendar()
+        # splice journaled VEVENT blocks in front of the closing VCALENDAR line
+        text = base or str(Calendar())
+        head, _, _ = text.rstrip().rpartition("END:VCALENDAR")
+        return Calendar(f"{head.rstrip()}\n{pending}\nEND:VCALENDAR")
+
+    def _read_journal(self) -> str:
+        if not self.journal_path.exists():
+            return ""
+        text = self.journal_path.read_text()
+        # ignore a partially written trailing block left by a crash mid-append
+        end = text.rfind("END:VEVENT")
+        if end == -1:
+            return ""
+        self._journaled = text.count("BEGIN:VEVENT", 0, end)
+        return text[: end + len("END:VEVENT")]
 
     def add_event(self, event: Event) -> None:
-        self.calendar.events.add(event)
+        self.add_events([event])
+
+    @_metered
+    def add_events(self, events: Iterable[Event]) -> List[EventResult]:
+        """Add all events with a single file rewrite or journal append."""
+        events = list(events)
+        if self._index is not None:
+            for event in events:
+                self._index.add(*self._span(event), event)
+        if not self.journal:
+            self.calendar.events.update(events)
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.path.write_text(str(self.calendar))
+            # events from a previous journaled session are now part of the file
+            self.journal_path.unlink(missing_ok=True)
+            self._invalidate_file_refs()
+            return [EventResult(event, True) for event in events]
+
+        if self._calendar is not None:
+            self._calendar.events.update(events)
+        if self._journal_file is None:
+            self._open_journal()
+        self._journal_file.write("".join(str(event) + "\n" for event in events))
+        self._journal_file.flush()
+        self._unsynced += len(events)
+        self._journaled += len(events)
+        if self._unsynced >= self.fsync_every:
+            self.sync()
+        if self.compact_every is not None and self._journaled >= self.compact_every:
+            self.compact()
+        return [EventResult(event, True) for event in events]
+
+    def _open_journal(self) -> None:
+        """Open the journal for appending, first cutting off a block torn by a crash.
+
+        Appending onto a partial ``VEVENT`` would make every later read of the
+        calendar fail, so the file is truncated to its last complete block (and that
+        block's line ending). The count of journaled events is taken from the same
+        scan, so ``compact_every`` holds in a process that writes before it reads.
+        """
+        self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.journal_path.open("a+b") as fh:
+            fh.seek(0)
+            data = fh.read()
+            end = scanned_length(data)
+            while end < len(data) and data[end : end + 1] in (b"\r", b"\n"):
+                end += 1
+            if end < len(data):
+                fh.truncate(end)
+                os.fsync(fh.fileno())
+        self._journaled = data.count(b"BEGIN:VEVENT", 0, end)
+        self._journal_file = self.journal_path.open("a")
+
+    def sync(self) -> None:
+        """Force journaled events to stable storage."""
+        if self._journal_file is not None and self._unsynced:
+            os.fsync(self._journal_file.fileno())
+        self._unsynced = 0
+
+    def compact(self) -> None:
+        """Rewrite the `.ics` file with all journaled events and clear the journal."""
+        calendar = self.calendar
+        self.close()
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        self.path.write_text(str(self.calendar))
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w") as fh:
+            fh.write(str(calendar))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, self.path)
+        self.journal_path.unlink(missing_ok=True)
+        self._journaled = 0
+        self._invalidate_file_refs()
+
+    def close(self) -> None:
+        """Sync and close the journal file handle, if open."""
+        if self._journal_file is not None:
+            self.sync()
+            self._journal_file.close()
+            self._journal_file = None
 
     def serialize(self) -> str:
         return str(self.calendar)
 
+    def iter_serialize(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """Yield a ``VCALENDAR`` one event at a time, ordered by start.
+
+        Memory stays bounded by the index rather than the serialized calendar: events
+        not yet parsed are copied as raw ``VEVENT`` blocks straight from disk. Only
+        events are exported; other components in the file are skipped.
+        """
+        lo = timestamp(start) if start is not None else float("-inf")
+        hi = timestamp(end) if end is not None else float("inf")
+        head, footer = _calendar_frame()
+        yield head
+        with contextlib.ExitStack() as stack:
+            handles: Dict[str, IO[bytes]] = {}
+            for _, _, item in self.index.overlapping(lo, hi):
+                if not isinstance(item, BlockRef):
+                    yield str(item) + "\r\n"  # an already parsed Event
+                    continue
+                if item.source not in handles:
+                    path = self.path if item.source == "base" else self.journal_path
+                    handles[item.source] = stack.enter_context(path.open("rb"))
+                fh = handles[item.source]
+                fh.seek(item.offset)
+                yield fh.read(item.length).decode("utf-8") + "\r\n"
+        yield footer
+
+    @staticmethod
+    def _span(event: Event) -> Tuple[float, float]:
+        return timestamp(event.begin), timestamp(event.end or event.begin)
+
+    @property
+    def index(self) -> IntervalIndex:
+        """Interval index over all stored events, built on first use."""
+        if self._index is None:
+            if self._calendar is not None:
+                self._index = IntervalIndex()
+                for event in self._calendar.events:
+                    self._index.add(*self._span(event), event)
+                self._index_has_refs = False
+            else:
+                self._index = self._scan_index()
+                self._index_has_refs = True
+        return self._index
+
+    def _invalidate_file_refs(self) -> None:
+        # rewritten files move every block, so offsets recorded by a scan are stale
+        self.index_path.unlink(missing_ok=True)
+        if self._index_has_refs:
+            self._index = None
+
+    def _scan_index(self) -> IntervalIndex:
+        base_stat = self.path.stat() if self.path.exists() else None
+        journal_stat = self.journal_path.stat() if self.journal_path.exists() else None
+        base_key = [base_stat.st_size, base_stat.st_mtime_ns] if base_stat else None
+        journal_ino = journal_stat.st_ino if journal_stat else None
+
+        entries: List[list] = []
+        journal_from = 0
+        cached = load_sidecar(self.index_path)
+        if cached is not None and cached["base"] == base_key:
+            entries = [e for e in cached["entries"] if e[0] == "base"]
+            if journal_stat and cached["journal_ino"] == journal_ino:
+                # the journal is append-only: keep its scanned prefix, scan the tail
+                if journal_stat.st_size >= cached["journal_length"]:
+                    entries = cached["entries"]
+                    journal_from = cached["journal_length"]
+        else:
+            entries = _scan_rows(self.path.read_bytes() if base_stat else b"", "base")
+
+        journal_length = 0
+        if journal_stat:
+            with self.journal_path.open("rb") as fh:
+                fh.seek(journal_from)
+                tail = fh.read()
+            entries += _scan_rows(tail, "journal", journal_from)
+            journal_length = journal_from + scanned_length(tail)
+
+        if base_stat or journal_stat:
+            save_sidecar(
+                self.index_path,
+                {
+                    "base": base_key,
+                    "journal_ino": journal_ino,
+                    "journal_length": journal_length,
+                    "entries": entries,
+                },
+            )
+        index: IntervalIndex = IntervalIndex()
+        for source, offset, length, uid, start, end in entries:
+            index.add(start, end, BlockRef(source, offset, length, uid))
+        return index
+
+    def _materialize(self, item) -> Event:
+        if not isinstance(item, BlockRef):
+            return item
+        from ics import Calendar
+
+        path = self.path if item.source == "base" else self.journal_path
+        with path.open("rb") as fh:
+            fh.seek(item.offset)
+            block = fh.read(item.length).decode("utf-8")
+        head, _ = _calendar_frame()
+        return next(iter(Calendar(f"{head}{block}\r\nEND:VCALENDAR").events))
+
+    def events_between(self, start: datetime, end: datetime) -> List[Event]:
+        hits = self.index.overlapping(timestamp(start), timestamp(end))
+        return [self._materialize(item) for _, _, item in hits]
+
+    def free_busy(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        lo, hi = timestamp(start), timestamp(end)
+        busy: List[List[float]] = []
+        for s, e, _ in self.index.overlapping(lo, hi):
+            s, e = max(s, lo), min(e, hi)
+            if e <= s:
+                continue  # instants do not block time
+            if busy and s <= busy[-1][1]:
+                busy[-1][1] = max(busy[-1][1], e)
+            else:
+                busy.append([s, e])
+        return [
+            (datetime.fromtimestamp(s, tz=timezone.utc), datetime.fromtimestamp(e, tz=timezone.utc))
+            for s, e in busy
+        ]
+
+    def conflicts_with(self, event: Event) -> List[Event]:
+        hits = self.index.overlapping(*self._span(event))
+        found = [self._materialize(item) for _, _, item in hits]
+        return [other for other in found if other.uid != event.uid]
+
 
 class GoogleCalendarBackend(CalendarBackend):
     """Push events to a Google Calendar via OAuth2 service account credentials."""
 
+    BATCH_SIZE = 50  # Calendar API guidance for requests per batch
+
     def __init__(self, credentials_file: Path, calendar_id: str) -> None:
         # Import lazily to keep optional dependency light for non-Google deployments
         from google.oauth2 import service_account
@@ -87,13 +466,77 @@ class GoogleCalendarBackend(CalendarBackend):
                     raise
                 time.sleep(0.1 * (2**attempt))
 
-    def add_event(self, event: Event) -> None:
-        body = {
+    @staticmethod
+    def _event_body(event: Event) -> dict:
+        return {
             "summary": event.name,
             "start": {"dateTime": event.begin.isoformat()},
             "end": {"dateTime": (event.end or event.begin).isoformat()},
         }
-        self._insert_with_retry(body)
+
+    def add_event(self, event: Event) -> None:
+        self._insert_with_retry(self._event_body(event))
+
+    @_metered
+    def add_events(self, events: Iterable[Event]) -> List[EventResult]:
+        """Insert events through batch HTTP requests, retrying failed entries."""
+        from googleapiclient.errors import HttpError
+        from google.auth.transport.requests import Request
+
+        events = list(events)
+        results: Dict[int, EventResult] = {}
+        pending = list(range(len(events)))
+        for attempt in range(3):
+            retry: List[int] = []
+            refresh = False
+
+            def callback(
+                request_id: str,
+                response: object,
+                exception: Exception,
+                retry: List[int] = retry,
+                final: bool = attempt == 2,
+            ) -> None:
+                nonlocal refresh
+                idx = int(request_id)
+                if exception is None:
+                    results[idx] = EventResult(events[idx], True)
+                elif isinstance(exception, HttpError) and not final:
+                    refresh = refresh or exception.resp.status in {401, 403}
+                    retry.append(idx)
+                else:
+                    results[idx] = EventResult(events[idx], False, exception)
+
+            for start in range(0, len(pending), self.BATCH_SIZE):
+                chunk = pending[start : start + self.BATCH_SIZE]
+                batch = self.service.new_batch_http_request(callback=callback)
+                for idx in chunk:
+                    request = self.service.events().insert(
+                        calendarId=self.calendar_id, body=self._event_body(events[idx])
+                    )
+                    batch.add(request, request_id=str(idx))
+                try:
+                    batch.execute()
+                except (HttpError, OSError) as exc:
+                    # The batch itself failed in transit; entries it never answered
+                    # are retried like failed ones, or reported once out of attempts.
+                    answered = set(retry)
+                    for idx in chunk:
+                        if idx in results or idx in answered:
+                            continue
+                        if attempt < 2:
+                            retry.append(idx)
+                        else:
+                            results[idx] = EventResult(events[idx], False, exc)
+            if not retry:
+                break
+            if refresh:
+                # Refresh token and rebuild service on auth errors
+                self._creds.refresh(Request())
+                self.service = self._builder()
+            time.sleep(0.1 * (2**attempt))
+            pending = sorted(retry)
+        return [results[idx] for idx in range(len(events))]
 
     def serialize(self) -> str:
         # Events live externally; return a sentinel string for diagnostics.
@@ -103,61 +546,193 @@ class GoogleCalendarBackend(CalendarBackend):
 class CalDAVBackend(CalendarBackend):
     """Store events on a CalDAV server."""
 
-    def __init__(self, url: str, username: str, password: str) -> None:
+    def __init__(self, url: str, username: str, password: str, max_concurrency: int = 8) -> None:
         import caldav  # lazy import to keep optional
 
         client = caldav.DAVClient(url, username=username, password=password)
         self.calendar = client.principal().calendars()[0]
+        self.max_concurrency = max_concurrency
 
     def add_event(self, event: Event) -> None:
         self.calendar.add_event(str(event))
 
+    def _put_with_retry(self, event: Event) -> EventResult:
+        error: Optional[BaseException] = None
+        for attempt in range(3):
+            try:
+                self.add_event(event)
+            except Exception as exc:  # caldav surfaces both DAV and transport errors
+                error = exc
+                if attempt < 2:
+                    time.sleep(0.1 * (2**attempt))
+            else:
+                return EventResult(event, True)
+        return EventResult(event, False, error)
+
+    @_metered
+    def add_events(self, events: Iterable[Event]) -> List[EventResult]:
+        """Issue PUTs concurrently over the client's pooled connections."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as pool:
+            return list(pool.map(self._put_with_retry, events))
+
     def serialize(self) -> str:
         return "caldav"
 
 
+def _retry_after_seconds(value: str) -> float:
+    """Parse a ``Retry-After`` header given either as seconds or as an HTTP-date."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return 0.0  # unparseable; fall back to the regular backoff
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
 class MicrosoftGraphBackend(CalendarBackend):
     """Push events to Microsoft 365 calendars via Microsoft Graph."""
 
+    BATCH_SIZE = 20  # Graph caps JSON batches at 20 requests
+    RETRYABLE = {401, 429, 500, 502, 503, 504}
+
     def __init__(
         self,
         tenant_id: str,
         client_id: str,
         client_secret: str,
         calendar_id: str = "primary",
+        graph_url: str = "https://graph.microsoft.com/v1.0",
     ) -> None:
         import msal  # lazy import
 
         self._calendar_id = calendar_id
+        self._graph_url = graph_url.rstrip("/")
         authority = f"https://login.microsoftonline.com/{tenant_id}"
         self._app = msal.ConfidentialClientApplication(
             client_id, authority=authority, client_credential=client_secret
         )
         self._scope = ["https://graph.microsoft.com/.default"]
+        self._session = None
+        self._access_token: Optional[str] = None
+        self._token_expires = 0.0
 
     def _token(self) -> str:
+        # Reuse the token until shortly before expiry to skip MSAL cache lookups
+        if self._access_token and time.time() < self._token_expires:
+            return self._access_token
         result = self._app.acquire_token_silent(self._scope, account=None)
         if not result:
             result = self._app.acquire_token_for_client(scopes=self._scope)
         if "access_token" not in result:
             raise RuntimeError(result.get("error_description", "Token acquisition failed"))
+        self._access_token = result["access_token"]
+        self._token_expires = time.time() + int(result.get("expires_in", 3600)) - 60
         return result["access_token"]
 
-    def add_event(self, event: Event) -> None:
-        import requests  # lazy import for optional dependency
+    def _http(self):
+        """Return a persistent session so requests reuse pooled connections."""
+        if self._session is None:
+            import requests  # lazy import for optional dependency
 
-        token = self._token()
-        url = (
-            f"https://graph.microsoft.com/v1.0/me/calendars/{self._calendar_id}/events"
-        )
-        body = {
+            self._session = requests.Session()
+        return self._session
+
+    def _headers(self) -> dict:
+        return {"Authorization": f"Bearer {self._token()}", "Content-Type": "application/json"}
+
+    @staticmethod
+    def _event_body(event: Event) -> dict:
+        return {
             "subject": event.name,
             "start": {"dateTime": event.begin.isoformat(), "timeZone": "UTC"},
             "end": {"dateTime": (event.end or event.begin).isoformat(), "timeZone": "UTC"},
         }
-        headers = {"Authorization": f"Bearer {token}", "Content-Type": "application/json"}
-        requests.post(url, json=body, headers=headers, timeout=10)
+
+    def add_event(self, event: Event) -> None:
+        url = f"{self._graph_url}/me/calendars/{self._calendar_id}/events"
+        self._http().post(url, json=self._event_body(event), headers=self._headers(), timeout=10)
+
+    @_metered
+    def add_events(self, events: Iterable[Event]) -> List[EventResult]:
+        """Create events through ``$batch`` calls, retrying throttled or failed entries."""
+        import requests  # lazy import for optional dependency
+
+        events = list(events)
+        results: Dict[int, EventResult] = {}
+        pending = list(range(len(events)))
+        path = f"/me/calendars/{self._calendar_id}/events"
+        for attempt in range(3):
+            retry: List[int] = []
+            delay = 0.1 * (2**attempt)
+            for start in range(0, len(pending), self.BATCH_SIZE):
+                chunk = pending[start : start + self.BATCH_SIZE]
+                payload = {
+                    "requests": [
+                        {
+                            "id": str(idx),
+                            "method": "POST",
+                            "url": path,
+                            "body": self._event_body(events[idx]),
+                            "headers": {"Content-Type": "application/json"},
+                        }
+                        for idx in chunk
+                    ]
+                }
+                try:
+                    resp = self._http().post(
+                        f"{self._graph_url}/$batch",
+                        json=payload,
+                        headers=self._headers(),
+                        timeout=30,
+                    )
+                    if resp.status_code == 401:
+                        self._access_token = None  # force re-acquisition next attempt
+                    resp.raise_for_status()
+                    replies = resp.json()["responses"]
+                except (requests.RequestException, ValueError, KeyError, TypeError) as exc:
+                    # transport failure or a reply that is not a $batch response
+                    for idx in chunk:
+                        if attempt < 2:
+                            retry.append(idx)
+                        else:
+                            results[idx] = EventResult(events[idx], False, exc)
+                    continue
+                unanswered = set(chunk)
+                for reply in replies:
+                    idx, status = int(reply["id"]), int(reply["status"])
+                    if idx not in unanswered:
+                        continue  # not a request from this chunk, or a duplicate reply
+                    unanswered.discard(idx)
+                    if status == 401:
+                        self._access_token = None  # the token expired mid-batch
+                    if status < 300:
+                        results[idx] = EventResult(events[idx], True)
+                    elif status in self.RETRYABLE and attempt < 2:
+                        retry.append(idx)
+                        retry_after = (reply.get("headers") or {}).get("Retry-After")
+                        if retry_after:
+                            delay = max(delay, _retry_after_seconds(retry_after))
+                    else:
+                        error = RuntimeError(f"Graph returned {status}: {reply.get('body')}")
+                        results[idx] = EventResult(events[idx], False, error)
+                for idx in sorted(unanswered):
+                    if attempt < 2:
+                        retry.append(idx)
+                    else:
+                        error = RuntimeError("Graph batch response omitted this request")
+                        results[idx] = EventResult(events[idx], False, error)
+            if not retry:
+                break
+            time.sleep(delay)
+            pending = sorted(retry)
+        return [results[idx] for idx in range(len(events))]
 
     def serialize(self) -> str:
         return "microsoft-graph"
-
@@ -0,0 +1,328 @@
+"""Durable on-disk queue for actuator directives produced while offline.
+
+:class:`CommandJournal` is an append-only log split into fixed-size segment files.
+The active segment is preallocated and memory-mapped, so an append is a slice copy
+into the map plus a ``crc32`` with no system call; a background thread
+group-commits dirty pages with ``msync`` every ``fsync_interval`` seconds. A full
+segment is only swapped for a fresh one under the append lock; trimming, ``fsync``
+and retention of the old one happen later on that same background thread. Each
+record is ``<length, crc32>`` followed by ``<timestamp, deadline, topic length,
+priority length>``, the priority, the topic and the payload; a zero length marks the
+end of a segment and a bad checksum a torn write. Deadlines are wall-clock times
+(``NaN`` for none) so they still mean something after a restart.
+
+On reconnect the dispatcher calls :meth:`CommandJournal.take`, which seals the active
+segment and returns its records in order with superseded directives removed (only
+the newest directive per topic and lane matters to an actuator). Once those are published
+:meth:`CommandJournal.release` deletes the segments. Retention limits bound disk use
+during long outages by compacting sealed segments and then dropping the oldest.
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct("<II")  # body length, crc32(body)
+_META = struct.Struct("<ddHB")  # timestamp, deadline, topic length, priority length
+_SUFFIX = ".seg"
+
+
+@dataclass(frozen=True)
+class Command:
+    """One journaled directive."""
+
+    timestamp: float
+    topic: str
+    payload: bytes
+    priority: str = "routine"
+    deadline: Optional[float] = None  # time.time() after which it must not be sent
+
+    def expired(self, now: Optional[float] = None) -> bool:
+        """Whether the directive's deadline has passed."""
+        if self.deadline is None:
+            return False
+        return (time.time() if now is None else now) > self.deadline
+
+
+def _read_records(data: bytes) -> Iterator[Command]:
+    pos = 0
+    while pos + _HEADER.size <= len(data):
+        length, crc = _HEADER.unpack_from(data, pos)
+        body = data[pos + _HEADER.size : pos + _HEADER.size + length]
+        if length == 0 or len(body) < length or zlib.crc32(body) != crc:
+            return  # end of segment or torn tail
+        timestamp, deadline, topic_len, priority_len = _META.unpack_from(body)
+        topic_start = _META.size + priority_len
+        topic_end = topic_start + topic_len
+        yield Command(
+            timestamp,
+            body[topic_start:topic_end].decode(),
+            bytes(body[topic_end:]),
+            body[_META.size : topic_start].decode(),
+            None if math.isnan(deadline) else deadline,
+        )
+        pos += _HEADER.size + length
+
+
+def _encode(command: Command) -> bytes:
+    topic = command.topic.encode()
+    priority = command.priority.encode()
+    deadline = math.nan if command.deadline is None else command.deadline
+    meta = _META.pack(command.timestamp, deadline, len(topic), len(priority))
+    body = meta + priority + topic + command.payload
+    return _HEADER.pack(len(body), zlib.crc32(body)) + body
+
+
+def latest_per_topic(commands: List[Command]) -> List[Command]:
+    """Drop directives superseded by a later one for the same topic and lane, keeping order."""
+    last: Dict[Tuple[str, str], int] = {(c.priority, c.topic): i for i, c in enumerate(commands)}
+    return [c for i, c in enumerate(commands) if last[c.priority, c.topic] == i]
+
+
+class CommandJournal:
+    """Segmented, memory-mapped directive log.
+
+    Args:
+        directory: Where segment files live; created if missing.
+        segment_bytes: Size of each preallocated segment.
+        fsync_interval: Seconds between group commits; ``0`` syncs on every append.
+        max_bytes: Sealed bytes kept before compaction and then deletion kick in.
+        max_age: Directives older than this many seconds are not replayed.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        segment_bytes: int = 4 << 20,
+        fsync_interval: float = 0.05,
+        max_bytes: int = 256 << 20,
+        max_age: Optional[float] = None,
+    ) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes
+        self.fsync_interval = fsync_interval
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.dropped = 0
+        self._lock = threading.Lock()  # guards the active segment and _rotated
+        self._segments_lock = threading.Lock()  # guards _sealed; taken before _lock
+        self._dirty = False
+        self._closed = threading.Event()
+        self._sealed: List[Path] = []
+        self._rotated: List[Tuple[Path, mmap.mmap, int, int]] = []  # full, not yet sealed
+        self._count = 0  # records not yet released
+        self._mm: Optional[mmap.mmap] = None
+        self._fd = -1
+        self._pos = 0
+        self._recover()
+        self._flusher: Optional[threading.Thread] = None
+        if fsync_interval > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, name="command-journal-fsync", daemon=True
+            )
+            self._flusher.start()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _segment_path(self, number: int) -> Path:
+        return self.directory / f"{number:020d}{_SUFFIX}"
+
+    def _recover(self) -> None:
+        segments = sorted(self.directory.glob(f"*{_SUFFIX}"))
+        for path in segments:
+            self._count += sum(1 for _ in _read_records(path.read_bytes()))
+        if segments:
+            *self._sealed, active = segments
+            self._open(active)
+        else:
+            self._open(self._segment_path(0))
+
+    def _open(self, path: Path) -> None:
+        self._active = path
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        size = os.fstat(self._fd).st_size
+        if size < self.segment_bytes:
+            os.ftruncate(self._fd, self.segment_bytes)
+        self._mm = mmap.mmap(self._fd, max(size, self.segment_bytes))
+        self._pos = 0
+        for command in _read_records(self._mm):
+            self._pos += len(_encode(command))
+
+    def _rotate(self) -> None:
+        """Set the active segment aside for sealing and start a new one (holds ``_lock``)."""
+        self._rotated.append((self._active, self._mm, self._fd, self._pos))
+        self._open(self._segment_path(int(self._active.stem) + 1))
+        self._dirty = False
+
+    def _maintain(self) -> None:
+        """Seal rotated segments (trimmed to their records) and enforce retention.
+
+        Runs on the group-commit thread, or inline when there is none, without
+        holding the append lock across the ``fsync``.
+        """
+        with self._segments_lock:
+            with self._lock:
+                rotated, self._rotated = self._rotated, []
+            for path, mm, fd, pos in rotated:
+                mm.flush()
+                mm.close()
+                os.ftruncate(fd, pos)
+                os.fsync(fd)
+                os.close(fd)
+                self._sealed.append(path)
+            if rotated:
+                self._enforce_retention()
+
+    def append(
+        self,
+        topic: str,
+        payload: bytes,
+        timestamp: Optional[float] = None,
+        priority: str = "routine",
+        deadline: Optional[float] = None,
+    ) -> None:
+        """Journal one directive; durable after the next group commit.
+
+        Args:
+            topic: Destination topic.
+            payload: Encoded directive.
+            timestamp: Wall-clock creation time; defaults to now.
+            priority: Dispatcher lane to replay the directive in.
+            deadline: Wall-clock time after which the directive is not replayed.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        record = _encode(Command(timestamp, topic, payload, priority, deadline))
+        if len(record) > self.segment_bytes:
+            raise ValueError("directive larger than a journal segment")
+        with self._lock:
+            rotated = self._pos + len(record) + _HEADER.size > self.segment_bytes
+            if rotated:
+                self._rotate()
+            self._mm[self._pos : self._pos + len(record)] = record
+            self._pos += len(record)
+            self._count += 1
+            self._dirty = True
+            if self.fsync_interval <= 0:
+                self._mm.flush()
+        if rotated and self._flusher is None:
+            self._maintain()
+
+    def sync(self) -> None:
+        """Force dirty pages of the active segment to disk."""
+        with self._lock:
+            if self._dirty and self._mm is not None:
+                self._mm.flush()
+                self._dirty = False
+
+    def _flush_loop(self) -> None:
+        while not self._closed.wait(self.fsync_interval):
+            self.sync()
+            self._maintain()
+
+    def take(self) -> Tuple[List[Path], List[Command]]:
+        """Seal pending records and return ``(segments, commands)`` for replay.
+
+        Commands are in append order with superseded ones and those older than
+        ``max_age`` removed; per-directive deadlines are left for the caller to check.
+        Pass ``segments`` to :meth:`release` once the commands are safely published.
+        """
+        with self._lock:
+            if self._pos:
+                self._rotate()
+        self._maintain()
+        with self._segments_lock:
+            segments = list(self._sealed)
+            if not segments:
+                with self._lock:
+                    self._count = 0
+        commands: List[Command] = []
+        for path in segments:
+            commands.extend(_read_records(path.read_bytes()))
+        if self.max_age is not None:
+            cutoff = time.time() - self.max_age
+            commands = [c for c in commands if c.timestamp >= cutoff]
+        return segments, latest_per_topic(commands)
+
+    def release(self, segments: List[Path]) -> None:
+        """Delete replayed segments."""
+        with self._segments_lock:
+            for path in segments:
+                if path not in self._sealed:
+                    continue  # already folded into a compacted segment
+                released = sum(1 for _ in _read_records(path.read_bytes()))
+                path.unlink(missing_ok=True)
+                self._sealed.remove(path)
+                with self._lock:
+                    self._count -= released
+
+    def compact(self) -> None:
+        """Rewrite sealed segments keeping only the newest directive per topic."""
+        with self._segments_lock:
+            self._compact()
+
+    def _compact(self) -> None:
+        if not self._sealed:
+            return
+        commands: List[Command] = []
+        for path in self._sealed:
+            commands.extend(_read_records(path.read_bytes()))
+        kept = latest_per_topic(commands)
+        # reuse the newest sealed name so ordering relative to the active segment holds
+        target = self._sealed[-1]
+        tmp = target.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            fh.write(b"".join(_encode(c) for c in kept))
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, target)
+        for path in self._sealed[:-1]:
+            path.unlink(missing_ok=True)
+        self._sealed = [target]
+        with self._lock:
+            self._count -= len(commands) - len(kept)
+        self.dropped += len(commands) - len(kept)
+
+    def _sealed_bytes(self) -> int:
+        return sum(p.stat().st_size for p in self._sealed)
+
+    def _enforce_retention(self) -> None:
+        if self._sealed_bytes() <= self.max_bytes:
+            return
+        self._compact()
+        while self._sealed and self._sealed_bytes() > self.max_bytes:
+            oldest = self._sealed.pop(0)
+            lost = sum(1 for _ in _read_records(oldest.read_bytes()))
+            with self._lock:
+                self._count -= lost
+            self.dropped += lost
+            oldest.unlink(missing_ok=True)
+            logger.warning(
+                "Command journal over %d bytes; dropped %d directives", self.max_bytes, lost
+            )
+
+    def close(self) -> None:
+        """Stop the group-commit thread, seal full segments and sync the active one."""
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        self._maintain()
+        with self._lock:
+            if self._mm is not None:
+                self._mm.flush()
+                self._mm.close()
+                os.close(self._fd)
+                self._mm = None
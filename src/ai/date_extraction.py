@@ -0,0 +1,136 @@
+"""Date extraction for voice notes with a regex fast path.
+
+``dateparser.search.search_dates`` handles arbitrary phrasing but costs milliseconds
+per note and a noticeable import. Most notes use a handful of English forms
+("tomorrow at 09:00", "next Friday 3pm", "at 9am tomorrow", ISO dates), so
+:class:`DateExtractor` tries compiled patterns for those first and only falls back
+to dateparser, imported on first use, when none match. Fallback results are
+memoized in an LRU cache keyed on the normalized note and a reference-time bucket.
+"""
+
+from __future__ import annotations
+
+import re
+from datetime import date, datetime, time, timedelta
+from functools import lru_cache
+from typing import Dict, Optional, Tuple
+
+_WEEKDAYS = {
+    "monday": 0,
+    "tuesday": 1,
+    "wednesday": 2,
+    "thursday": 3,
+    "friday": 4,
+    "saturday": 5,
+    "sunday": 6,
+}
+_WEEKDAY = "|".join(_WEEKDAYS)
+# Times need minutes or an am/pm marker; a bare "at 9" is left to dateparser.
+_TIME = (
+    r"(?:at\s+)?(?:(?P<hour>\d{1,2}):(?P<minute>\d{2})(?:\s*(?P<ampm>[ap])\.?m\.?)?"
+    r"|(?P<hour12>\d{1,2})\s*(?P<ampm12>[ap])\.?m\.?)"
+)
+_DAY = rf"(?:(?P<relative>today|tomorrow)|(?:(?:on|this|next)\s+)?(?P<weekday>{_WEEKDAY}))"
+
+_PATTERNS = [
+    re.compile(
+        rf"\b(?:on\s+)?(?P<iso>\d{{4}}-\d{{2}}-\d{{2}})(?:(?:T|\s+){_TIME})?(?![\w:])",
+        re.IGNORECASE,
+    ),
+    re.compile(rf"\b{_DAY}(?:\s+{_TIME})?(?![\w:])", re.IGNORECASE),
+    re.compile(rf"\b{_TIME}\s+(?:on\s+)?{_DAY}\b", re.IGNORECASE),
+]
+# A trailing number right after a match means we only saw part of the expression.
+_DANGLING = re.compile(r"\s*(?:at\s+)?\d")
+
+Match = Tuple[str, datetime]
+
+
+def normalize(note: str) -> str:
+    """Collapse whitespace so equivalent notes share cache entries."""
+    return " ".join(note.split())
+
+
+def _clock(m: re.Match) -> Optional[time]:
+    """Return the time captured by ``_TIME`` groups, or ``None`` if absent/invalid."""
+    if m.group("hour") is not None:
+        hour, minute, ampm = int(m.group("hour")), int(m.group("minute")), m.group("ampm")
+    elif m.group("hour12") is not None:
+        hour, minute, ampm = int(m.group("hour12")), 0, m.group("ampm12")
+    else:
+        return None
+    if ampm:
+        if not 1 <= hour <= 12:
+            raise ValueError("12-hour clock out of range")
+        hour = hour % 12 + (12 if ampm.lower() == "p" else 0)
+    return time(hour, minute)
+
+
+def _resolve(m: re.Match, now: datetime) -> datetime:
+    clock = _clock(m)
+    groups = m.groupdict()
+    if groups.get("iso"):
+        day = date.fromisoformat(groups["iso"])
+        return datetime.combine(day, clock or time())
+    if groups.get("relative"):
+        day = now.date() + timedelta(days=groups["relative"].lower() == "tomorrow")
+        # like dateparser, a bare relative day keeps the current time of day
+        return datetime.combine(day, clock or now.time())
+    target = _WEEKDAYS[groups["weekday"].lower()]
+    ahead = (target - now.weekday()) % 7 or 7  # always a future occurrence
+    return datetime.combine(now.date() + timedelta(days=ahead), clock or time())
+
+
+def fast_extract(note: str, now: datetime) -> Optional[Match]:
+    """Match common English date forms; ``None`` means the slow path is needed."""
+    found = [m for m in (p.search(note) for p in _PATTERNS) if m]
+    if not found:
+        return None
+    m = min(found, key=lambda match: (match.start(), -match.end()))
+    if _DANGLING.match(note, m.end()):
+        return None
+    try:
+        return m.group(0), _resolve(m, now)
+    except ValueError:  # out-of-range clock or calendar date
+        return None
+
+
+class DateExtractor:
+    """Extract the first date phrase from a note, preferring future dates."""
+
+    def __init__(self, cache_size: int = 1024, bucket_seconds: int = 60) -> None:
+        self.bucket_seconds = bucket_seconds
+        self.fast_hits = 0
+        self._slow = lru_cache(maxsize=cache_size)(self._search)
+
+    def extract(self, note: str, now: Optional[datetime] = None) -> Optional[Match]:
+        """Return ``(phrase, datetime)`` for ``note`` or ``None`` if no date is found.
+
+        ``phrase`` is a substring of :func:`normalize` applied to ``note``.
+        """
+        note = normalize(note)
+        now = now or datetime.now()
+        result = fast_extract(note, now)
+        if result is not None:
+            self.fast_hits += 1
+            return result
+        return self._slow(note, int(now.timestamp() // self.bucket_seconds))
+
+    def _search(self, note: str, bucket: int) -> Optional[Match]:
+        from dateparser.search import search_dates  # heavy; only load on a fast-path miss
+
+        base = datetime.fromtimestamp(bucket * self.bucket_seconds)
+        result = search_dates(
+            note, settings={"PREFER_DATES_FROM": "future", "RELATIVE_BASE": base}
+        )
+        return result[0] if result else None
+
+    def stats(self) -> Dict[str, int]:
+        """Counters showing how often each extraction path ran."""
+        info = self._slow.cache_info()
+        return {
+            "fast_path_hits": self.fast_hits,
+            "cache_hits": info.hits,
+            "slow_path_calls": info.misses,
+            "cache_size": info.currsize,
+        }
@@ -6,31 +6,163 @@ This module contains stubs for ingesting sensor data, running predictions,
 """
 
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 import logging
+import time
 
+import numpy as np
+
+from . import instrumentation
+from .anomaly_detector import AnomalyDetector
 # Local heuristic predictors
-from warmth_predictor import predict as warmth_predict
+from .warmth_predictor import predict as warmth_predict
+from .sensor_batch import SensorBatch
+from .sensor_history import SensorHistory
+from .zone_state import ZoneState, directive_array
 
-# Configure verbose logging for debugging and auditing
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# per-packet lines are opt-in (DEBUG) and sampled; see instrumentation.LogSampler
+_log_packet = instrumentation.LogSampler(logger)
+_PACKETS = instrumentation.counter(
+    "ness_packets_ingested_total", "Sensor packets stored by ClimateBrain"
+)
+_INGEST = instrumentation.stage("ingest")
+_INGEST_BATCH = instrumentation.stage("ingest_batch")
+_PREDICT = instrumentation.stage("predict")
+_PREDICT_ZONES = instrumentation.stage("predict_zones")
 
-@dataclass
+@dataclass(slots=True)
 class SensorPacket:
-    """Normalized sensor reading."""
+    """Normalized sensor reading; use :class:`SensorBatch` for bulk columnar data.
+
+    Slots only drop the instance ``__dict__``: the readings themselves stay in a
+    per-packet dict because channels are open-ended (any numeric key a gateway
+    sends is tracked), so per-packet memory is still dominated by ``data``.
+    """
     data: Dict[str, Any]
+    # Seconds since the epoch; ingestion time is used when omitted
+    timestamp: Optional[float] = None
+    # Zone the reading belongs to; None targets the single implicit zone
+    zone: Optional[str] = None
 
 @dataclass
 class ClimateBrain:
     """AI Decision Engine placeholder."""
 
     cache: Dict[str, Any] = field(default_factory=dict)
+    # Per-channel time series; pass SensorHistory(directory=...) to persist it
+    history: SensorHistory = field(default_factory=SensorHistory)
+    # Columnar readings for multi-zone deployments, fed by packets with a zone
+    zones: ZoneState = field(default_factory=ZoneState)
+    # Opt-in incremental per-channel statistics; flagged readings wait in detector.pending
+    detector: Optional[AnomalyDetector] = None
+
+    def ingest_sensor_data(self, packet: Union[SensorPacket, SensorBatch]) -> None:
+        """Validate and store incoming sensor data (one packet or a whole batch)."""
+        if isinstance(packet, SensorBatch):
+            self._ingest_batch(packet)
+            return
+        if _log_packet():
+            logger.debug("Ingesting sensor data: %s", packet)
+        _PACKETS.inc()
+        with _INGEST.time():
+            timestamp = packet.timestamp if packet.timestamp is not None else time.time()
+            if self.detector is not None:
+                for name, value in packet.data.items():
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        self.detector.observe(name, value, timestamp, packet.zone)
+            if packet.zone is not None:
+                self.zones.update(packet.zone, packet.data)
+                return
+            self.cache.update(packet.data)
+            self.history.append(timestamp, packet.data)
+
+    def ingest_many(self, packets: Union[Iterable[SensorPacket], SensorBatch]) -> int:
+        """Store a batch of packets, extending history once per channel.
+
+        Returns:
+            Number of packets ingested.
+        """
+        if isinstance(packets, SensorBatch):
+            return self._ingest_batch(packets)
+        with _INGEST_BATCH.time():
+            count = self._ingest_packets(packets)
+        _PACKETS.inc(count)
+        return count
+
+    def _ingest_packets(self, packets: Iterable[SensorPacket]) -> int:
+        detector = self.detector
+        now = time.time()
+        series: Dict[str, Tuple[List[float], List[float]]] = {}
+        count = 0
+        for packet in packets:
+            count += 1
+            timestamp = packet.timestamp if packet.timestamp is not None else now
+            if packet.zone is not None:
+                self.zones.update(packet.zone, packet.data)
+                if detector is not None:
+                    for name, value in packet.data.items():
+                        if isinstance(value, (int, float)) and not isinstance(value, bool):
+                            detector.observe(name, value, timestamp, packet.zone)
+                continue
+            self.cache.update(packet.data)
+            for name, value in packet.data.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    ts, vs = series.setdefault(name, ([], []))
+                    ts.append(timestamp)
+                    vs.append(value)
+        for name, (ts, vs) in series.items():
+            self.history.extend(name, ts, vs)
+            if detector is not None:
+                detector.observe_many(name, ts, vs)
+        logger.debug("Ingested %d packets", count)
+        return count
+
+    def _ingest_batch(self, batch: SensorBatch) -> int:
+        """Columnar ingest: history, cache and zone state are updated per channel."""
+        records = batch.records
+        if not len(records):
+            return 0
+        with _INGEST_BATCH.time():
+            self._ingest_columns(batch)
+        _PACKETS.inc(len(records))
+        return len(records)
 
-    def ingest_sensor_data(self, packet: SensorPacket) -> None:
-        """Validate and store incoming sensor data."""
-        logger.info("Ingesting sensor data: %s", packet)
-        self.cache.update(packet.data)
+    def _ingest_columns(self, batch: SensorBatch) -> None:
+        detector = self.detector
+        records = batch.records
+        ts = records["ts"]
+        missing = np.isnan(ts)
+        if missing.any():
+            ts = np.where(missing, time.time(), ts)
+        zone = records["zone"]
+        implicit = zone < 0
+        slots = None
+        if not implicit.all():
+            slots = np.array([self.zones.slot(z) for z in batch.zones], dtype=np.intp)
+        for name in batch.channels:
+            values = records[name]
+            present = ~np.isnan(values)
+            local = present & implicit
+            if local.all():
+                self.history.extend(name, ts, values)
+                if detector is not None:
+                    detector.observe_many(name, ts, values)
+                self.cache[name] = float(values[-1])
+            elif local.any():
+                self.history.extend(name, ts[local], values[local])
+                if detector is not None:
+                    detector.observe_many(name, ts[local], values[local])
+                self.cache[name] = float(values[local][-1])
+            if slots is not None:
+                zoned = present & ~implicit
+                if zoned.any():
+                    self.zones.assign(slots[zone[zoned]], name, values[zoned])
+                    if detector is not None:
+                        detector.observe_zones(
+                            name, batch.zones, zone[zoned], ts[zoned], values[zoned]
+                        )
+        logger.debug("Ingested batch of %d packets", len(records))
 
     def predict(self) -> Dict[str, float]:
         """Return predictive metrics for climate actions.
@@ -40,18 +172,32 @@ class ClimateBrain:
         temperature adjustments while leaving room for humidity and other
         environmental factors.
         """
-        logger.info("Running prediction on current cache")
-        temp_input = self.cache.get("temp", 0.0)
-        temp_delta = warmth_predict(temp_input)
+        logger.debug("Running prediction on current cache")
+        with _PREDICT.time():
+            temp_input = self.cache.get("temp", 0.0)
+            temp_delta = warmth_predict(temp_input)
         # TODO: integrate ML models and reinforcement learning
         return {"temperature_delta": temp_delta, "humidity_delta": 0.0}
 
+    def predict_zones(self) -> np.ndarray:
+        """Return directives for every known zone from one vectorized predictor call.
+
+        The result is a structured array with a ``zone`` field plus one float field
+        per directive, suitable for :meth:`ActuatorDispatcher.dispatch_zones`.
+        """
+        with _PREDICT_ZONES.time():
+            temps = np.nan_to_num(self.zones.column("temp"), nan=0.0)
+            temp_delta = warmth_predict(temps)
+            return directive_array(self.zones.zone_ids, temperature_delta=temp_delta)
+
     def command_actuators(self, directives: Dict[str, float]) -> None:
         """Dispatch calculated directives to hardware layer."""
-        logger.info("Dispatching directives: %s", directives)
+        if _log_packet():
+            logger.debug("Dispatching directives: %s", directives)
         # TODO: publish to MQTT/Redis topics with secure envelopes
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.DEBUG)
     brain = ClimateBrain()
     brain.ingest_sensor_data(SensorPacket(data={"temp": 21.5}))
     actions = brain.predict()
@@ -0,0 +1,158 @@
+"""Background persistence of calendar events for :class:`TerraVoiceAgent`.
+
+Remote calendar backends can block for seconds in retries and backoff. The queue
+here moves those writes onto worker threads: callers enqueue an event and return
+immediately, workers drain the queue in batches through ``add_events``, and a bounded
+capacity applies backpressure instead of buffering without limit.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import queue
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, List, Optional
+
+from .calendar_backends import CalendarBackend
+
+if TYPE_CHECKING:
+    from ics import Event
+
+logger = logging.getLogger(__name__)
+
+ErrorCallback = Callable[["Event", BaseException], None]
+
+_STOP = object()  # sentinel telling a worker to exit
+
+
+class EventWriteQueue:
+    """Persist events to a backend on worker threads behind a bounded queue.
+
+    ``concurrency`` greater than one is only safe for backends whose ``add_events``
+    may be called from several threads at once (the remote backends); the local
+    ``ICSCalendarBackend`` should use a single worker.
+    """
+
+    def __init__(
+        self,
+        backend: CalendarBackend,
+        max_pending: int = 1000,
+        concurrency: int = 1,
+        batch_size: int = 50,
+        on_error: Optional[ErrorCallback] = None,
+    ) -> None:
+        self.backend = backend
+        self.batch_size = batch_size
+        self.on_error = on_error
+        self.written = 0
+        self.failed = 0
+        self._queue: queue.Queue = queue.Queue(maxsize=max_pending)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._run, name=f"event-writer-{i}", daemon=True)
+            for i in range(concurrency)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    @property
+    def pending(self) -> int:
+        """Number of events accepted but not yet persisted."""
+        return self._queue.unfinished_tasks
+
+    def submit(self, event: Event, timeout: Optional[float] = None) -> None:
+        """Enqueue ``event``, blocking while the queue is full.
+
+        Raises:
+            queue.Full: If ``timeout`` elapses before space becomes available.
+            RuntimeError: If the queue has been closed.
+        """
+        if self._closed:
+            raise RuntimeError("EventWriteQueue is closed")
+        self._queue.put(event, timeout=timeout)
+
+    async def submit_async(self, event: Event) -> None:
+        """Enqueue ``event`` without blocking the running event loop."""
+        try:
+            if self._closed:
+                raise RuntimeError("EventWriteQueue is closed")
+            self._queue.put_nowait(event)
+        except queue.Full:
+            # only hand off to a thread when we actually have to wait for capacity
+            await asyncio.to_thread(self.submit, event)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait until every submitted event is persisted; return ``False`` on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Drain outstanding writes and stop the workers within ``timeout`` overall."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+
+        def remaining() -> Optional[float]:
+            return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+        self._closed = True
+        drained = self.flush(timeout)
+        for _ in self._workers:
+            try:
+                self._queue.put(_STOP, timeout=remaining())
+            except queue.Full:
+                return False  # workers are still busy; they exit with the process
+        for worker in self._workers:
+            worker.join(remaining())
+        return drained
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            item = self._queue.get()
+            if item is _STOP:
+                self._queue.task_done()
+                return
+            batch: List[Event] = [item]
+            taken = 1
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                taken += 1
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            try:
+                self._write(batch)
+            finally:
+                for _ in range(taken):
+                    self._queue.task_done()
+
+    def _write(self, batch: List[Event]) -> None:
+        try:
+            results = self.backend.add_events(batch)
+        except Exception as exc:  # backend failed wholesale; report every event
+            failures = [(event, exc) for event in batch]
+        else:
+            failures = [(r.event, r.error) for r in results if not r.ok]
+        with self._lock:
+            self.written += len(batch) - len(failures)
+            self.failed += len(failures)
+        for event, error in failures:
+            if self.on_error is None:
+                logger.error("Failed to persist event %r: %s", event.name, error)
+                continue
+            try:
+                self.on_error(event, error)
+            except Exception:  # a faulty callback must not take the worker down
+                logger.exception("on_error callback failed for event %r", event.name)
@@ -0,0 +1,247 @@
+"""Low-overhead metrics for the ingest, prediction and dispatch hot paths.
+
+Recording a metric must cost far less than the work it measures, so nothing here
+takes a lock once a metric exists:
+
+* :class:`Counter` keeps one cell per thread. Each cell has a single writer and
+  :attr:`Counter.value` sums them, so increments are never lost.
+* :class:`LatencyHistogram` has fixed buckets. :meth:`LatencyHistogram.time` can
+  sample one call in ``sample_every``, so most calls skip the clock reads.
+* :class:`LogSampler` gates per-packet log lines. They are opt-in at ``DEBUG``
+  and throttled to one in ``NESS_PACKET_LOG_EVERY`` calls, so a packet repr is
+  only formatted when someone will read it.
+
+Metrics live in a :class:`Registry`; :data:`REGISTRY` is the process-wide one
+that the overlay server exposes on ``/metrics`` in the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import bisect
+import logging
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+STAGE_SAMPLE_EVERY = 16
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Counter:
+    """Monotonic counter; increments never take a lock."""
+
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells: Dict[int, float] = {}
+
+    def inc(self, amount: float = 1) -> None:
+        cells, key = self._cells, threading.get_ident()
+        cells[key] = cells.get(key, 0) + amount  # only this thread writes this cell
+
+    @property
+    def value(self) -> float:
+        return sum(list(self._cells.values()))
+
+
+class _Timer:
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram: "LatencyHistogram") -> None:
+        self._histogram = histogram
+
+    def __enter__(self) -> "_Timer":
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._histogram.observe(time.perf_counter() - self._start)
+
+
+class _Skip:
+    __slots__ = ()
+
+    def __enter__(self) -> "_Skip":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        return None
+
+
+_SKIP = _Skip()
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram (seconds), cheap enough for every call.
+
+    Args:
+        bounds: Upper bucket bounds in ascending order; an ``inf`` bucket is implied.
+        sample_every: :meth:`time` measures one call in this many.
+    """
+
+    DEFAULT_BOUNDS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 1e-2, 1e-1)
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BOUNDS, sample_every: int = 1) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.total = 0.0
+        self.sample_every = sample_every
+        self._calls = 0
+
+    def observe(self, seconds: float) -> None:
+        # list item increments are atomic enough under the GIL for monitoring purposes
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.total += seconds
+
+    def time(self):
+        """Context manager timing its block; skipped calls do not read the clock."""
+        if self.sample_every > 1:
+            self._calls += 1
+            if self._calls % self.sample_every:
+                return _SKIP
+        return _Timer(self)
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the ``q`` quantile (``inf`` if past the last)."""
+        target, running = q * self.count, 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            running += n
+            if running >= target and running:
+                return bound
+        return 0.0
+
+    def snapshot(self) -> Dict[str, object]:
+        """Cumulative bucket counts keyed by upper bound, Prometheus style."""
+        buckets, running = {}, 0
+        for bound, n in zip(self.bounds + (float("inf"),), self.counts):
+            running += n
+            buckets[str(bound)] = running
+        return {"buckets": buckets, "count": running, "sum": self.total}
+
+
+class LogSampler:
+    """Decide whether to emit a per-call log line.
+
+    Calling the sampler returns ``True`` for one call in ``every`` while ``logger``
+    is enabled for ``level``, and ``False`` otherwise without formatting anything.
+
+    Args:
+        logger: Logger the caller will write to.
+        every: Sampling period; defaults to ``NESS_PACKET_LOG_EVERY`` (1).
+        level: Level the caller logs at.
+    """
+
+    __slots__ = ("logger", "every", "level", "_calls")
+
+    def __init__(
+        self, logger: logging.Logger, every: Optional[int] = None, level: int = logging.DEBUG
+    ) -> None:
+        self.logger = logger
+        self.every = every or int(os.getenv("NESS_PACKET_LOG_EVERY", "1"))
+        self.level = level
+        self._calls = 0
+
+    def __call__(self) -> bool:
+        if not self.logger.isEnabledFor(self.level):
+            return False
+        self._calls += 1
+        if self._calls < self.every:
+            return False
+        self._calls = 0
+        return True
+
+
+def _format_labels(labels: Labels, extra: str = "") -> str:
+    parts = [f'{k}="{v}"' for k, v in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(bound)
+
+
+class Registry:
+    """Named metric families, each holding one metric per label set."""
+
+    def __init__(self) -> None:
+        self._families: Dict[str, Tuple[str, str, Dict[Labels, object]]] = {}
+        self._lock = threading.Lock()  # guards registration only, never updates
+
+    def _get(self, kind: str, name: str, help: str, labels: Dict[str, str], factory):
+        key: Labels = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        family = self._families.get(name)
+        if family is not None and key in family[2]:
+            return family[2][key]
+        with self._lock:
+            family = self._families.setdefault(name, (kind, help, {}))
+            if family[0] != kind:
+                raise ValueError(f"metric {name!r} is already registered as a {family[0]}")
+            return family[2].setdefault(key, factory())
+
+    def counter(self, name: str, help: str, **labels: str) -> Counter:
+        """Get or create the counter ``name`` with ``labels``."""
+        return self._get("counter", name, help, labels, Counter)
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        bounds: Sequence[float] = LatencyHistogram.DEFAULT_BOUNDS,
+        sample_every: int = 1,
+        **labels: str,
+    ) -> LatencyHistogram:
+        """Get or create the histogram ``name`` with ``labels``."""
+        return self._get(
+            "histogram", name, help, labels, lambda: LatencyHistogram(bounds, sample_every)
+        )
+
+    def register(
+        self, name: str, help: str, histogram: LatencyHistogram, **labels: str
+    ) -> LatencyHistogram:
+        """Expose an existing histogram, e.g. one owned by a model runtime."""
+        return self._get("histogram", name, help, labels, lambda: histogram)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for name, (kind, help, metrics) in sorted(self._families.items()):
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, metric in sorted(metrics.items()):
+                if kind == "counter":
+                    lines.append(f"{name}{_format_labels(labels)} {metric.value}")
+                    continue
+                running = 0
+                counts = list(metric.counts)
+                for bound, n in zip(metric.bounds + (float("inf"),), counts):
+                    running += n
+                    le = _format_labels(labels, f'le="{_format_bound(bound)}"')
+                    lines.append(f"{name}_bucket{le} {running}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {metric.total}")
+                lines.append(f"{name}_count{_format_labels(labels)} {running}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+register = REGISTRY.register
+
+
+def stage(name: str, **labels: str) -> LatencyHistogram:
+    """Sampled per-stage timer in the shared ``ness_stage_seconds`` family."""
+    return histogram(
+        "ness_stage_seconds",
+        f"Wall time per pipeline stage, sampled 1 in {STAGE_SAMPLE_EVERY} calls",
+        sample_every=STAGE_SAMPLE_EVERY,
+        stage=name,
+        **labels,
+    )
@@ -0,0 +1,231 @@
+"""Time-range index for calendar events.
+
+:class:`IntervalIndex` keeps event spans sorted by start so range, free/busy and
+conflict queries touch only the events near the requested window instead of
+scanning the whole calendar. Insertions are incremental.
+
+For `.ics` files the index can be built without running the full ``ics`` parser:
+:func:`scan_vevents` reads just the DTSTART/DTEND/DURATION/UID lines of each
+``VEVENT`` block and records its byte span, so matching events can be parsed on
+demand. The scan result is cached in a sidecar file (see :func:`load_sidecar`) and,
+because the journal is append-only, later loads only scan bytes added since.
+"""
+
+from __future__ import annotations
+
+import bisect
+import itertools
+import json
+import math
+import os
+import re
+import tempfile
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Generic, Iterator, List, Optional, Tuple, TypeVar
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+T = TypeVar("T")
+
+SIDECAR_VERSION = 1
+
+
+class IntervalIndex(Generic[T]):
+    """Index over ``[start, end)`` spans given as POSIX timestamps.
+
+    Spans up to ``long_span`` seconds live in a start-sorted list split into blocks
+    of at most ``2 * block_size`` entries, so an insert costs ``O(log n + block_size)``
+    rather than shifting the whole array. A query inspects only entries starting
+    within ``long_span`` before the window, so it costs ``O(log n + k)`` for ``k``
+    results plus the events that ended in that look-back. Longer spans (holidays,
+    multi-year reminders) are kept apart and checked on every query; they are few,
+    and mixing them in would stretch the look-back for every query. Zero-length
+    events are treated as instants.
+    """
+
+    def __init__(self, long_span: float = 86400.0, block_size: int = 512) -> None:
+        self.long_span = long_span
+        self.block_size = block_size
+        self._blocks: List[List[Tuple[float, float, int]]] = []
+        self._firsts: List[Tuple[float, float, int]] = []  # first entry of each block
+        self._long: List[Tuple[float, float, int]] = []
+        self._items: Dict[int, T] = {}
+        self._seq = itertools.count()
+        self._size = 0
+        self._max_span = 0.0  # longest span in the blocks, at most long_span
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, start: float, end: float, item: T) -> None:
+        """Insert ``item`` covering ``[start, end)``."""
+        end = max(start, end)
+        entry = (start, end, next(self._seq))
+        self._items[entry[2]] = item
+        self._size += 1
+        if end - start > self.long_span:
+            self._long.append(entry)
+            return
+        self._max_span = max(self._max_span, end - start)
+        if not self._blocks:
+            self._blocks.append([entry])
+            self._firsts.append(entry)
+            return
+        i = max(0, bisect.bisect_right(self._firsts, entry) - 1)
+        block = self._blocks[i]
+        bisect.insort(block, entry)
+        self._firsts[i] = block[0]
+        if len(block) > 2 * self.block_size:
+            half = len(block) // 2
+            self._blocks[i : i + 1] = [block[:half], block[half:]]
+            self._firsts[i : i + 1] = [block[0], block[half]]
+
+    def _between(self, lo: tuple, hi: tuple) -> Iterator[Tuple[float, float, int]]:
+        """Block entries with ``lo <= entry < hi`` in order."""
+        i = max(0, bisect.bisect_right(self._firsts, lo) - 1)
+        if i >= len(self._blocks):
+            return
+        j = bisect.bisect_left(self._blocks[i], lo)
+        for block in itertools.islice(self._blocks, i, None):
+            for entry in itertools.islice(block, j, None):
+                if entry >= hi:
+                    return
+                yield entry
+            j = 0
+
+    def overlapping(self, start: float, end: float) -> List[Tuple[float, float, T]]:
+        """Return ``(start, end, item)`` for entries overlapping the window, by start.
+
+        A zero-width window ``start == end`` matches entries covering that instant.
+        """
+        instant = start == end
+        hi = (end, math.inf) if instant else (end,)
+        hits = [
+            entry
+            for entry in self._between((start - self._max_span,), hi)
+            if entry[1] > start or (entry[0] == entry[1] and entry[0] >= start)
+        ]
+        if self._long:
+            hits.extend(e for e in self._long if e[1] > start and (e[0], e[1]) < hi)
+            hits.sort()
+        return [(s, e, self._items[seq]) for s, e, seq in hits]
+
+
+@dataclass(frozen=True)
+class BlockRef:
+    """Location of one ``VEVENT`` block inside a calendar or journal file."""
+
+    source: str  # "base" or "journal"
+    offset: int
+    length: int
+    uid: str
+
+
+def timestamp(value) -> float:
+    """POSIX timestamp for a datetime or Arrow; naive values are taken as UTC like ``ics``."""
+    value = getattr(value, "datetime", value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+_DURATION = re.compile(
+    r"(?P<sign>[+-])?P(?:(?P<weeks>\d+)W)?(?:(?P<days>\d+)D)?"
+    r"(?:T(?:(?P<hours>\d+)H)?(?:(?P<minutes>\d+)M)?(?:(?P<seconds>\d+)S)?)?$"
+)
+
+
+def _parse_duration(value: str) -> float:
+    m = _DURATION.match(value.strip())
+    if not m:
+        return 0.0
+    parts = {k: int(v) for k, v in m.groupdict().items() if v and k != "sign"}
+    seconds = timedelta(**parts).total_seconds()
+    return -seconds if m.group("sign") == "-" else seconds
+
+
+def _parse_datetime(params: str, value: str) -> Tuple[float, bool]:
+    """Return ``(timestamp, is_date)`` for an iCalendar DATE or DATE-TIME value."""
+    value = value.strip()
+    if "T" not in value:
+        day = datetime.strptime(value[:8], "%Y%m%d").replace(tzinfo=timezone.utc)
+        return day.timestamp(), True
+    dt = datetime.strptime(value.rstrip("Z")[:15], "%Y%m%dT%H%M%S")
+    tz = timezone.utc
+    tzid = re.search(r"TZID=([^;:]+)", params)
+    if tzid and not value.endswith("Z"):
+        try:
+            tz = ZoneInfo(tzid.group(1).strip('"'))
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    return dt.replace(tzinfo=tz).timestamp(), False
+
+
+def _block_span(block: str) -> Optional[Tuple[float, float, str]]:
+    props: Dict[str, Tuple[str, str]] = {}
+    unfolded = re.sub(r"\r?\n[ \t]", "", block)
+    for line in unfolded.splitlines():
+        name, sep, rest = line.partition(":")
+        key, _, params = name.partition(";")
+        key = key.upper()
+        if sep and key in {"DTSTART", "DTEND", "DURATION", "UID"} and key not in props:
+            props[key] = (params, rest)
+    if "DTSTART" not in props:
+        return None
+    start, is_date = _parse_datetime(*props["DTSTART"])
+    if "DTEND" in props:
+        end, _ = _parse_datetime(*props["DTEND"])
+    elif "DURATION" in props:
+        end = start + _parse_duration(props["DURATION"][1])
+    else:
+        end = start + (86400 if is_date else 0)
+    return start, end, props.get("UID", ("", ""))[1].strip()
+
+
+def scan_vevents(
+    data: bytes, source: str, base_offset: int = 0
+) -> Iterator[Tuple[float, float, BlockRef]]:
+    """Yield ``(start, end, ref)`` for each complete ``VEVENT`` block in ``data``."""
+    pos = 0
+    while (begin := data.find(b"BEGIN:VEVENT", pos)) != -1:
+        end = data.find(b"END:VEVENT", begin)
+        if end == -1:
+            break  # torn trailing block
+        stop = end + len(b"END:VEVENT")
+        span = _block_span(data[begin:stop].decode("utf-8", "replace"))
+        if span is not None:
+            ref = BlockRef(source, base_offset + begin, stop - begin, span[2])
+            yield span[0], span[1], ref
+        pos = stop
+
+
+def scanned_length(data: bytes) -> int:
+    """Length of the prefix of ``data`` ending at its last complete ``VEVENT``."""
+    end = data.rfind(b"END:VEVENT")
+    return 0 if end == -1 else end + len(b"END:VEVENT")
+
+
+def load_sidecar(path: Path) -> Optional[dict]:
+    """Read a cached scan, or ``None`` if missing, unreadable or from another version."""
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+    return state if state.get("version") == SIDECAR_VERSION else None
+
+
+def save_sidecar(path: Path, state: dict) -> None:
+    """Persist a scan so the next load can skip unchanged files.
+
+    The file is replaced atomically, so a concurrent reader sees either the old
+    sidecar or the new one, never a partial write.
+    """
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as fh:
+            fh.write(json.dumps({"version": SIDECAR_VERSION, **state}))
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,226 @@
+"""CPU inference runtime for the climate predictors.
+
+Models are small multilayer perceptrons evaluated with plain NumPy, so edge nodes
+need no ML framework. A :class:`ModelRegistry` stores each version as a directory of
+``.npy`` weight files plus a ``model.json`` manifest::
+
+    <root>/<name>/<version>/model.json
+    <root>/<name>/<version>/layer0.W.npy, layer0.b.npy, ...
+
+Weights are opened with ``mmap_mode="r"``: loading costs a few page-table entries
+rather than a copy, and every worker process on a host shares the same page cache.
+
+:class:`ModelRuntime` owns the active model. Predictions read the model reference
+once, so :meth:`ModelRuntime.swap` can install a new, already warmed version
+without locks and without stalling calls that are in flight on the old one.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .instrumentation import LatencyHistogram
+
+_ACTIVATIONS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "relu": lambda x: np.maximum(x, 0.0, out=x),
+    "tanh": lambda x: np.tanh(x, out=x),
+    "linear": lambda x: x,
+}
+
+
+class MLPModel:
+    """Dense feed-forward network with a linear output layer.
+
+    Args:
+        layers: ``(W, b)`` pairs; ``W`` has shape ``(inputs, outputs)``.
+        activation: Hidden-layer activation, one of ``relu``, ``tanh`` or ``linear``.
+        input_mean: Per-feature offset subtracted before the first layer.
+        input_scale: Per-feature divisor applied after the offset.
+        version: Registry version the weights were loaded from, if any.
+    """
+
+    def __init__(
+        self,
+        layers: Sequence[Tuple[np.ndarray, np.ndarray]],
+        activation: str = "relu",
+        input_mean=0.0,
+        input_scale=1.0,
+        version: Optional[str] = None,
+    ) -> None:
+        if activation not in _ACTIVATIONS:
+            raise ValueError(f"Unknown activation {activation!r}")
+        self.layers = list(layers)
+        self.activation = activation
+        self.input_mean = np.asarray(input_mean, dtype="f8")
+        self.input_scale = np.asarray(input_scale, dtype="f8")
+        self.version = version
+
+    @property
+    def n_inputs(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    def predict(self, x) -> np.ndarray:
+        """Run a batch of shape ``(n, n_inputs)`` (or ``(n,)`` for one input)."""
+        x = np.asarray(x, dtype="f8")
+        if x.ndim == 1:
+            x = x.reshape(-1, self.n_inputs)
+        h = (x - self.input_mean) / self.input_scale
+        act = _ACTIVATIONS[self.activation]
+        last = len(self.layers) - 1
+        for i, (w, b) in enumerate(self.layers):
+            h = h @ w + b
+            if i < last:
+                h = act(h)
+        return h[:, 0] if h.shape[1] == 1 else h
+
+
+def save_model(
+    directory: Path,
+    layers: Sequence[Tuple[np.ndarray, np.ndarray]],
+    activation: str = "relu",
+    input_mean=0.0,
+    input_scale=1.0,
+) -> None:
+    """Write weights and manifest in the layout :func:`load_model` expects."""
+    directory.mkdir(parents=True, exist_ok=True)
+    for i, (w, b) in enumerate(layers):
+        np.save(directory / f"layer{i}.W.npy", np.asarray(w, dtype="f8"))
+        np.save(directory / f"layer{i}.b.npy", np.asarray(b, dtype="f8"))
+    manifest = {
+        "layers": len(layers),
+        "activation": activation,
+        "input_mean": np.asarray(input_mean, dtype="f8").tolist(),
+        "input_scale": np.asarray(input_scale, dtype="f8").tolist(),
+    }
+    (directory / "model.json").write_text(json.dumps(manifest))
+
+
+def load_model(directory: Path) -> MLPModel:
+    """Open a saved model with memory-mapped weights."""
+    manifest = json.loads((directory / "model.json").read_text())
+    layers = [
+        (
+            np.load(directory / f"layer{i}.W.npy", mmap_mode="r"),
+            np.load(directory / f"layer{i}.b.npy", mmap_mode="r"),
+        )
+        for i in range(manifest["layers"])
+    ]
+    return MLPModel(
+        layers,
+        activation=manifest.get("activation", "relu"),
+        input_mean=manifest.get("input_mean", 0.0),
+        input_scale=manifest.get("input_scale", 1.0),
+        version=directory.name,
+    )
+
+
+class ModelRegistry:
+    """Versioned models on disk; versions sort lexically, so use zero-padded names."""
+
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def versions(self, name: str) -> List[str]:
+        base = self.root / name
+        if not base.is_dir():
+            return []
+        return sorted(p.name for p in base.iterdir() if (p / "model.json").exists())
+
+    def latest(self, name: str) -> Optional[str]:
+        versions = self.versions(name)
+        return versions[-1] if versions else None
+
+    def save(self, name: str, version: str, layers, **manifest) -> Path:
+        directory = self.root / name / version
+        save_model(directory, layers, **manifest)
+        return directory
+
+    def load(self, name: str, version: Optional[str] = None) -> MLPModel:
+        """Load ``version`` of ``name``, defaulting to the latest.
+
+        Raises:
+            LookupError: If no such model version exists.
+        """
+        version = version or self.latest(name)
+        if version is None or not (self.root / name / version / "model.json").exists():
+            raise LookupError(f"No model {name!r} version {version!r} in {self.root}")
+        return load_model(self.root / name / version)
+
+
+class ModelRuntime:
+    """Holds the active model and serves batched predictions.
+
+    Args:
+        model: Initial model; ``None`` means callers fall back to their heuristic.
+        registry: Source for :meth:`load` and :meth:`reload`.
+        name: Model name inside the registry.
+    """
+
+    def __init__(
+        self,
+        model: Optional[MLPModel] = None,
+        registry: Optional[ModelRegistry] = None,
+        name: str = "warmth",
+    ) -> None:
+        self.model = model
+        self.registry = registry
+        self.name = name
+        self.latency = LatencyHistogram()
+        self._swap_lock = threading.Lock()
+
+    @property
+    def version(self) -> Optional[str]:
+        model = self.model
+        return model.version if model is not None else None
+
+    def predict(self, x) -> np.ndarray:
+        """Run the active model on a batch.
+
+        Raises:
+            RuntimeError: If no model is loaded.
+        """
+        model = self.model  # single read: a concurrent swap cannot split this call
+        if model is None:
+            raise RuntimeError("No model loaded")
+        start = time.perf_counter()
+        result = model.predict(x)
+        self.latency.observe(time.perf_counter() - start)
+        return result
+
+    def warmup(self, batch_sizes: Sequence[int] = (1, 64), model=None) -> None:
+        """Fault in weight pages and BLAS paths before real traffic arrives."""
+        model = model or self.model
+        if model is None:
+            return
+        for n in batch_sizes:
+            model.predict(np.zeros((n, model.n_inputs)))
+
+    def swap(self, model: MLPModel) -> None:
+        """Warm ``model`` and make it active; in-flight calls finish on the old one."""
+        with self._swap_lock:
+            self.warmup(model=model)
+            self.model = model
+
+    def load(self, version: Optional[str] = None) -> MLPModel:
+        """Load a version from the registry and swap it in."""
+        if self.registry is None:
+            raise RuntimeError("ModelRuntime has no registry")
+        model = self.registry.load(self.name, version)
+        self.swap(model)
+        return model
+
+    def reload(self) -> bool:
+        """Swap to the registry's latest version if it differs; return whether it did."""
+        if self.registry is None:
+            return False
+        latest = self.registry.latest(self.name)
+        if latest is None or latest == self.version:
+            return False
+        self.load(latest)
+        return True
@@ -0,0 +1,135 @@
+"""Columnar, zero-copy batches of sensor readings.
+
+A :class:`SensorBatch` is a NumPy structured array with one ``f8`` field per channel,
+plus a timestamp and a zone index per row. It can be a view straight over the wire
+buffer of a bulk upload, so ingesting a million readings allocates no per-reading
+Python objects: :meth:`ClimateBrain.ingest_sensor_data` appends each channel column
+to history and zone state with array operations.
+
+Wire layout (little-endian)::
+
+    b"BRB1" | u16 channel count | (u8 len, utf-8 name) * channels
+            | u16 zone count    | (u8 len, utf-8 name) * zones
+            | records: f8 ts, i2 zone index (-1 = none), f8 * channels (NaN = absent)
+"""
+
+from __future__ import annotations
+
+import math
+import struct
+from typing import Any, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"BRB1"
+_COUNT = struct.Struct("<H")
+_RESERVED = ("ts", "zone")
+
+
+def record_dtype(channels: Sequence[str]) -> np.dtype:
+    """Packed record layout for a batch with ``channels``."""
+    return np.dtype([("ts", "<f8"), ("zone", "<i2")] + [(name, "<f8") for name in channels])
+
+
+def _read_names(view: memoryview, pos: int) -> Tuple[List[str], int]:
+    (count,) = _COUNT.unpack_from(view, pos)
+    pos += _COUNT.size
+    names = []
+    for _ in range(count):
+        length = view[pos]
+        names.append(bytes(view[pos + 1 : pos + 1 + length]).decode())
+        pos += 1 + length
+    return names, pos
+
+
+def _write_names(names: Sequence[str]) -> bytes:
+    out = bytearray(_COUNT.pack(len(names)))
+    for name in names:
+        raw = name.encode()
+        if len(raw) > 255:
+            raise ValueError(f"name too long for the wire format: {name!r}")
+        out += bytes([len(raw)]) + raw
+    return bytes(out)
+
+
+class SensorBatch:
+    """Fixed-schema readings for many packets, backed by one structured array.
+
+    Args:
+        channels: Reading names, in record field order.
+        zones: Zone names referenced by the ``zone`` field (``-1`` means none).
+        records: Structured array with dtype :func:`record_dtype` of ``channels``.
+    """
+
+    __slots__ = ("channels", "zones", "records")
+
+    def __init__(self, channels: Sequence[str], zones: Sequence[str], records: np.ndarray):
+        self.channels = list(channels)
+        self.zones = list(zones)
+        self.records = records
+
+    def __len__(self) -> int:
+        return len(self.records)
+
+    @classmethod
+    def from_buffer(cls, buffer) -> "SensorBatch":
+        """Wrap a wire buffer (``bytes``, ``bytearray``, ``memoryview``) without copying.
+
+        Raises:
+            ValueError: If the header is malformed, the records are truncated or a
+                zone index is out of range.
+        """
+        view = memoryview(buffer)
+        if bytes(view[:4]) != MAGIC:
+            raise ValueError("not a breath batch (bad magic)")
+        try:
+            channels, pos = _read_names(view, 4)
+            zones, pos = _read_names(view, pos)
+        except (IndexError, struct.error):
+            raise ValueError("truncated breath batch header") from None
+        if len(set(channels)) != len(channels) or set(_RESERVED) & set(channels):
+            raise ValueError("channel names must be unique and not 'ts' or 'zone'")
+        dtype = record_dtype(channels)
+        if (len(view) - pos) % dtype.itemsize:
+            raise ValueError("truncated breath batch record")
+        records = np.frombuffer(view, dtype=dtype, offset=pos)
+        bad = (records["zone"] < -1) | (records["zone"] >= len(zones))
+        if bad.any():
+            raise ValueError(f"packet {int(np.argmax(bad))}: zone index out of range")
+        return cls(channels, zones, records)
+
+    @classmethod
+    def from_packets(
+        cls, packets: Sequence[Mapping[str, Any]], channels: Optional[Sequence[str]] = None
+    ) -> "SensorBatch":
+        """Build a batch from dicts of readings with optional ``ts`` and ``zone`` keys."""
+        if channels is None:
+            channels = sorted({k for p in packets for k in p if k not in _RESERVED})
+        zones = sorted({p["zone"] for p in packets if p.get("zone") is not None})
+        zone_index = {zone: i for i, zone in enumerate(zones)}
+        records = np.zeros(len(packets), dtype=record_dtype(channels))
+        records["ts"] = [p.get("ts", math.nan) for p in packets]
+        records["zone"] = [zone_index.get(p.get("zone"), -1) for p in packets]
+        for name in channels:
+            records[name] = [p.get(name, math.nan) for p in packets]
+        return cls(channels, zones, records)
+
+    def tobytes(self) -> bytes:
+        """Serialize to the wire layout accepted by :meth:`from_buffer`."""
+        header = MAGIC + _write_names(self.channels) + _write_names(self.zones)
+        return header + self.records.tobytes()
+
+    def column(self, name: str) -> np.ndarray:
+        """View of one channel (or ``ts``/``zone``) across every packet."""
+        return self.records[name]
+
+    def rows(self) -> Iterator[Tuple[Optional[float], Optional[str], dict]]:
+        """Yield ``(timestamp, zone, readings)`` per packet; slow, for compatibility."""
+        columns = [(name, self.records[name].tolist()) for name in self.channels]
+        for i, (ts, zone) in enumerate(zip(self.records["ts"].tolist(), self.records["zone"])):
+            data = {name: values[i] for name, values in columns if not math.isnan(values[i])}
+            yield (
+                None if math.isnan(ts) else ts,
+                self.zones[zone] if zone >= 0 else None,
+                data,
+            )
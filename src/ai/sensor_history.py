@@ -0,0 +1,243 @@
+"""Fixed-capacity sensor history for :class:`ClimateBrain`.
+
+Each channel (``temp``, ``humidity``, ...) is a NumPy ring buffer of
+``(timestamp, value)`` samples. Alongside every sample the buffer stores running
+sums of ``v``, ``t``, ``t*v`` and ``t*t`` so the mean and least-squares slope over a
+trailing window cost O(1) once the window start is found by binary search. Running
+sums are rebased to the oldest retained sample once per lap around the buffer,
+keeping them small enough for float64 without an O(n) pass per query.
+
+Buffers can live in memory-mapped ``.npy`` files, so history survives restarts and
+is usable immediately on open without a reload pass.
+"""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+from urllib.parse import quote, unquote
+
+import numpy as np
+
+_DTYPE = np.dtype([(name, "f8") for name in ("t", "v", "st", "sv", "stv", "stt")])
+_SUMS = ("st", "sv", "stv", "stt")
+# meta layout: total samples, time epoch, then running sums up to the last evicted sample
+_COUNT, _EPOCH, _EVICTED = 0, 1, slice(2, 6)
+
+
+class RingBuffer:
+    """Timestamped samples for one channel with O(1) windowed mean and slope.
+
+    Timestamps must be non-decreasing; older samples are clamped to the latest one.
+    Windows are measured back from ``now``, which defaults to the newest sample.
+    """
+
+    def __init__(self, capacity: int = 4096, path: Optional[Path] = None) -> None:
+        self.path = path
+        if path is None:
+            self._data = np.zeros(capacity, dtype=_DTYPE)
+            self._meta = np.zeros(6)
+        else:
+            meta_path = path.with_name(path.name + ".meta")
+            if path.exists():
+                self._data = np.lib.format.open_memmap(path, mode="r+")
+                self._meta = np.lib.format.open_memmap(meta_path, mode="r+")
+            else:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                self._data = np.lib.format.open_memmap(
+                    path, mode="w+", dtype=_DTYPE, shape=(capacity,)
+                )
+                self._meta = np.lib.format.open_memmap(
+                    meta_path, mode="w+", dtype="f8", shape=(6,)
+                )
+        self.capacity = len(self._data)
+
+    @property
+    def count(self) -> int:
+        """Total samples ever appended (including evicted ones)."""
+        return int(self._meta[_COUNT])
+
+    def __len__(self) -> int:
+        return min(self.count, self.capacity)
+
+    def append(self, t: float, v: float) -> None:
+        """Append a single sample."""
+        self.extend(np.array([t], dtype="f8"), np.array([v], dtype="f8"))
+
+    def extend(self, ts, vs) -> None:
+        """Append samples in bulk; ``ts`` and ``vs`` are equal-length sequences."""
+        ts = np.asarray(ts, dtype="f8")
+        vs = np.asarray(vs, dtype="f8")
+        if ts.shape != vs.shape:
+            raise ValueError("timestamps and values must have the same length")
+        if not len(ts):
+            return
+        if len(self):
+            ts = np.maximum(ts, self._data["t"][(self.count - 1) % self.capacity])
+        ts = np.maximum.accumulate(ts)
+        start = 0
+        while start < len(ts):
+            slot = self.count % self.capacity
+            if slot == 0 and self.count:
+                self._rebase()
+            elif self.count == 0:
+                self._meta[_EPOCH] = ts[0]
+            n = min(len(ts) - start, self.capacity - slot)
+            self._write(slot, ts[start : start + n], vs[start : start + n])
+            start += n
+
+    def _write(self, slot: int, ts: np.ndarray, vs: np.ndarray) -> None:
+        n = len(ts)
+        data = self._data
+        if self.count >= self.capacity:
+            # the samples we overwrite become the new "before the window" baseline
+            last = data[slot + n - 1]
+            self._meta[_EVICTED] = [last[name] for name in _SUMS]
+        if self.count:
+            prev = data[(self.count - 1) % self.capacity]
+            base = [prev[name] for name in _SUMS]
+        else:
+            base = [0.0, 0.0, 0.0, 0.0]
+        rel = ts - self._meta[_EPOCH]
+        block = data[slot : slot + n]
+        block["t"] = ts
+        block["v"] = vs
+        block["st"] = base[0] + np.cumsum(rel)
+        block["sv"] = base[1] + np.cumsum(vs)
+        block["stv"] = base[2] + np.cumsum(rel * vs)
+        block["stt"] = base[3] + np.cumsum(rel * rel)
+        self._meta[_COUNT] += n
+
+    def _rebase(self) -> None:
+        """Restart running sums from the oldest retained sample (once per lap)."""
+        data = self._data  # buffer is full and slot 0 holds the oldest sample
+        epoch = data["t"][0]
+        rel = data["t"] - epoch
+        data["st"] = np.cumsum(rel)
+        data["sv"] = np.cumsum(data["v"])
+        data["stv"] = np.cumsum(rel * data["v"])
+        data["stt"] = np.cumsum(rel * rel)
+        self._meta[_EPOCH] = epoch
+        self._meta[_EVICTED] = 0.0
+
+    def _window_start(self, seconds: float, now: Optional[float]) -> Tuple[int, int]:
+        """Logical index range ``[first, last]`` of samples at or after ``now - seconds``."""
+        last = self.count - 1
+        oldest = self.count - len(self)
+        if now is None:
+            now = self._data["t"][last % self.capacity]
+        cutoff = now - seconds
+        head = self.count % self.capacity
+        ts = self._data["t"]
+        if self.count > self.capacity and head:
+            # two sorted segments: [head:] holds older samples, [:head] newer ones
+            older = ts[head:]
+            i = int(np.searchsorted(older, cutoff, side="left"))
+            if i == len(older):
+                i += int(np.searchsorted(ts[:head], cutoff, side="left"))
+        else:
+            i = int(np.searchsorted(ts[: len(self)], cutoff, side="left"))
+        return oldest + i, last
+
+    def _sums(self, first: int, last: int) -> Tuple[int, np.ndarray]:
+        end = self._data[last % self.capacity]
+        totals = np.array([end[name] for name in _SUMS])
+        if first > self.count - len(self):
+            before = self._data[(first - 1) % self.capacity]
+            totals -= np.array([before[name] for name in _SUMS])
+        else:
+            totals -= self._meta[_EVICTED]
+        return last - first + 1, totals
+
+    def window(
+        self, seconds: float, now: Optional[float] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """Copies of ``(timestamps, values)`` in the window, oldest first."""
+        if not len(self):
+            return np.empty(0), np.empty(0)
+        first, last = self._window_start(seconds, now)
+        slots = np.arange(first, last + 1) % self.capacity
+        return self._data["t"][slots].copy(), self._data["v"][slots].copy()
+
+    def mean(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Mean value over the trailing window, or ``None`` if it is empty."""
+        if not len(self):
+            return None
+        n, (_, sv, _, _) = self._sums(*self._window_start(seconds, now))
+        return float(sv / n) if n > 0 else None
+
+    def slope(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Least-squares rate of change (units per second) over the trailing window."""
+        if not len(self):
+            return None
+        n, (st, sv, stv, stt) = self._sums(*self._window_start(seconds, now))
+        denom = n * stt - st * st
+        if n < 2 or denom <= 1e-12:
+            return None
+        return float((n * stv - st * sv) / denom)
+
+    def min(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Minimum value over the trailing window."""
+        _, values = self.window(seconds, now)
+        return float(values.min()) if len(values) else None
+
+    def max(self, seconds: float, now: Optional[float] = None) -> Optional[float]:
+        """Maximum value over the trailing window."""
+        _, values = self.window(seconds, now)
+        return float(values.max()) if len(values) else None
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """Newest ``(timestamp, value)`` sample."""
+        if not len(self):
+            return None
+        row = self._data[(self.count - 1) % self.capacity]
+        return float(row["t"]), float(row["v"])
+
+    def flush(self) -> None:
+        """Write memory-mapped pages back to disk."""
+        if self.path is not None:
+            self._data.flush()
+            self._meta.flush()
+
+
+class SensorHistory:
+    """Per-channel ring buffers, optionally persisted under ``directory``."""
+
+    def __init__(self, capacity: int = 4096, directory: Optional[Path] = None) -> None:
+        self.capacity = capacity
+        self.directory = directory
+        self._channels: Dict[str, RingBuffer] = {}
+        if directory is not None and directory.exists():
+            for path in sorted(directory.glob("*.ring.npy")):
+                name = unquote(path.name[: -len(".ring.npy")])
+                self._channels[name] = RingBuffer(capacity, path)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._channels
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._channels)
+
+    def channel(self, name: str) -> RingBuffer:
+        """Return the buffer for ``name``, creating it on first use."""
+        buf = self._channels.get(name)
+        if buf is None:
+            path = None
+            if self.directory is not None:
+                path = self.directory / f"{quote(name, safe='')}.ring.npy"
+            buf = self._channels[name] = RingBuffer(self.capacity, path)
+        return buf
+
+    def append(self, t: float, readings: Mapping[str, object]) -> None:
+        """Record every numeric reading in ``readings`` at time ``t``."""
+        for name, value in readings.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self.channel(name).append(t, float(value))
+
+    def extend(self, name: str, ts, vs) -> None:
+        """Bulk-append samples to one channel."""
+        self.channel(name).extend(ts, vs)
+
+    def flush(self) -> None:
+        for buf in self._channels.values():
+            buf.flush()
@@ -1,14 +1,69 @@
-"""NessHash voice agent expanded into a scheduling engine."""
+"""NessHash voice agent expanded into a scheduling engine.
+
+Run as ``python -m ai.terra_voice_agent notes.txt`` to bulk-import one note per line.
+"""
 
 from __future__ import annotations
 
+import argparse
+import asyncio
+import contextlib
+import itertools
+import sys
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .calendar_backends import CalendarBackend, EventResult, ICSCalendarBackend
+from .date_extraction import DateExtractor, normalize
+from .event_queue import ErrorCallback, EventWriteQueue
+
+if TYPE_CHECKING:
+    from ics import Event
+
+# Per-process extractor used by pool workers in ``schedule_many``
+_worker_extractor: Optional[DateExtractor] = None
+
+
+def _note_fields(note: str, extractor: DateExtractor) -> Tuple[str, datetime]:
+    """Return ``(description, begin)`` for ``note`` or raise ``ValueError``."""
+    note = normalize(note)
+    result = extractor.extract(note)
+    if not result:
+        raise ValueError("Unable to parse date from note")
+    phrase, dt = result
+    description = " ".join(note.replace(phrase, "").split()) or "Voice note"
+    return description, dt
+
+
+def _parse_in_worker(note: str) -> Tuple[Optional[str], object]:
+    """Pool entry point: ``(description, begin)`` or ``(None, error message)``."""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = DateExtractor()
+    try:
+        return _note_fields(note, _worker_extractor)
+    except ValueError as exc:
+        return None, str(exc)
+
+
+@dataclass
+class BulkScheduleResult:
+    """Summary of a :meth:`TerraVoiceAgent.schedule_many` run."""
 
-from dateparser.search import search_dates
-from ics import Event
+    events: List[Event] = field(default_factory=list)
+    # (input index, note, reason) for notes that could not be parsed
+    unparsed: List[Tuple[int, str, str]] = field(default_factory=list)
+    # per-event persistence outcomes, empty when writes were queued in background
+    persisted: List[EventResult] = field(default_factory=list)
+    elapsed: float = 0.0
 
-from .calendar_backends import CalendarBackend, ICSCalendarBackend
+    @property
+    def notes_per_second(self) -> float:
+        total = len(self.events) + len(self.unparsed)
+        return total / self.elapsed if self.elapsed else 0.0
 
 
 class TerraVoiceAgent:
@@ -18,6 +73,11 @@ class TerraVoiceAgent:
         self,
         backend: Optional[CalendarBackend] = None,
         calendar_path: Optional[Path] = None,
+        background: bool = False,
+        max_pending: int = 1000,
+        concurrency: int = 1,
+        on_error: Optional[ErrorCallback] = None,
+        date_extractor: Optional[DateExtractor] = None,
     ) -> None:
         """Initialize the agent with a calendar backend.
 
@@ -28,6 +88,17 @@ class TerraVoiceAgent:
             ``calendar_path``.
         calendar_path:
             Location of the `.ics` file when using the default backend.
+        background:
+            Persist events on worker threads so scheduling returns immediately.
+        max_pending:
+            Queue capacity in background mode; scheduling blocks when it is full.
+        concurrency:
+            Number of background writer threads.
+        on_error:
+            Called with ``(event, exception)`` for events that fail to persist in
+            background mode.
+        date_extractor:
+            Shared :class:`DateExtractor`; a private one is created if omitted.
         """
 
         if backend is not None:
@@ -35,22 +106,163 @@ class TerraVoiceAgent:
         else:
             path = calendar_path or Path("data/schedule.ics")
             self.backend = ICSCalendarBackend(path)
+        self.date_extractor = date_extractor or DateExtractor()
+        self.writer: Optional[EventWriteQueue] = None
+        if background:
+            self.writer = EventWriteQueue(
+                self.backend, max_pending=max_pending, concurrency=concurrency, on_error=on_error
+            )
+
+    def parse_note(self, note: str) -> Event:
+        """Parse a natural-language note into an event without persisting it."""
+        from ics import Event  # deferred: the heaviest import on the CLI path
+
+        description, dt = _note_fields(note, self.date_extractor)
+        return Event(name=description, begin=dt)
 
     def schedule_from_note(self, note: str) -> Event:
-        """Parse a natural-language note and append it to the calendar."""
-        result = search_dates(note, settings={"PREFER_DATES_FROM": "future"})
-        if not result:
-            raise ValueError("Unable to parse date from note")
-        phrase, dt = result[0]
-        description = note.replace(phrase, "").strip() or "Voice note"
-        event = Event(name=description, begin=dt)
-        self.backend.add_event(event)
+        """Parse a natural-language note and append it to the calendar.
+
+        In background mode the event is queued and returned before it is persisted.
+        """
+        event = self.parse_note(note)
+        if self.writer is not None:
+            self.writer.submit(event)
+        else:
+            self.backend.add_event(event)
         return event
 
+    async def aschedule_from_note(self, note: str) -> Event:
+        """Async variant of :meth:`schedule_from_note` that never blocks the event loop."""
+        event = await asyncio.to_thread(self.parse_note, note)
+        if self.writer is not None:
+            await self.writer.submit_async(event)
+        else:
+            await asyncio.to_thread(self.backend.add_event, event)
+        return event
+
+    def schedule_many(
+        self,
+        notes: Sequence[str],
+        processes: Optional[int] = None,
+        chunksize: int = 64,
+    ) -> BulkScheduleResult:
+        """Parse many notes in a process pool and persist them in one batched write.
+
+        Events keep the input order; notes without a recognizable date are collected
+        in ``unparsed`` instead of aborting the run. ``processes=1`` parses inline,
+        which is cheaper for small inputs.
+        """
+        from ics import Event
+
+        started = time.perf_counter()
+        result = BulkScheduleResult()
+        with contextlib.ExitStack() as stack:
+            if processes == 1 or len(notes) <= chunksize:
+                parsed: Iterable = map(self._parse_inline, notes)
+            else:
+                from concurrent.futures import ProcessPoolExecutor
+
+                pool = stack.enter_context(ProcessPoolExecutor(max_workers=processes))
+                parsed = pool.map(_parse_in_worker, notes, chunksize=chunksize)
+            for index, (note, (description, outcome)) in enumerate(zip(notes, parsed)):
+                if description is None:
+                    result.unparsed.append((index, note, str(outcome)))
+                else:
+                    result.events.append(Event(name=description, begin=outcome))
+
+        if self.writer is not None:
+            for event in result.events:
+                self.writer.submit(event)
+        elif result.events:
+            result.persisted = self.backend.add_events(result.events)
+        result.elapsed = time.perf_counter() - started
+        return result
+
+    def _parse_inline(self, note: str) -> Tuple[Optional[str], object]:
+        try:
+            return _note_fields(note, self.date_extractor)
+        except ValueError as exc:
+            return None, str(exc)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """Wait for queued background writes; returns ``False`` on timeout."""
+        return self.writer.flush(timeout) if self.writer is not None else True
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """Drain queued background writes and stop the writer threads."""
+        return self.writer.close(timeout) if self.writer is not None else True
+
     def inhale(self, data: str) -> Event:
         """Alias for schedule_from_note to fit agent metaphor."""
         return self.schedule_from_note(data)
 
+    def events_between(self, start: datetime, end: datetime) -> List[Event]:
+        """Events overlapping ``[start, end)`` according to the backend's index."""
+        self.flush()
+        return self.backend.events_between(start, end)
+
+    def free_busy(self, start: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Merged busy periods within ``[start, end)``."""
+        self.flush()
+        return self.backend.free_busy(start, end)
+
+    def conflicts_with(self, note_or_event: Union[str, Event]) -> List[Event]:
+        """Stored events overlapping an event or a not-yet-scheduled note."""
+        self.flush()
+        event = note_or_event
+        if isinstance(event, str):
+            event = self.parse_note(event)
+        return self.backend.conflicts_with(event)
+
     def exhale(self) -> str:
         """Return the serialized calendar representation from the backend."""
+        self.flush()
         return self.backend.serialize()
+
+    def iter_exhale(
+        self, start: Optional[datetime] = None, end: Optional[datetime] = None
+    ) -> Iterator[str]:
+        """Stream the serialized calendar in chunks, optionally limited to a range."""
+        self.flush()
+        return self.backend.iter_serialize(start, end)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Stream notes (one per line) from files or stdin into the calendar."""
+    parser = argparse.ArgumentParser(description="Bulk-schedule voice notes")
+    parser.add_argument("inputs", nargs="*", type=Path, help="note files; stdin if omitted")
+    parser.add_argument("--calendar", type=Path, default=Path("data/schedule.ics"))
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--chunksize", type=int, default=64)
+    parser.add_argument("--batch", type=int, default=5000, help="notes per bulk write")
+    args = parser.parse_args(argv)
+
+    agent = TerraVoiceAgent(calendar_path=args.calendar)
+    offset = scheduled = failed = 0
+    started = time.perf_counter()
+    with contextlib.ExitStack() as stack:
+        streams = [stack.enter_context(p.open()) for p in args.inputs] or [sys.stdin]
+        lines = (line.rstrip("\n") for stream in streams for line in stream)
+        notes = (line for line in lines if line.strip())
+        while batch := list(itertools.islice(notes, args.batch)):
+            result = agent.schedule_many(
+                batch, processes=args.processes, chunksize=args.chunksize
+            )
+            scheduled += sum(r.ok for r in result.persisted)
+            failed += sum(not r.ok for r in result.persisted)
+            for index, note, reason in result.unparsed:
+                print(f"unparsed\t{offset + index + 1}\t{note}\t{reason}", file=sys.stderr)
+            offset += len(batch)
+    elapsed = time.perf_counter() - started
+    rate = offset / elapsed if elapsed else 0.0
+    print(
+        f"{offset} notes, {scheduled} scheduled, {offset - scheduled - failed} unparsed, "
+        f"{failed} failed to persist in {elapsed:.2f}s ({rate:.0f} notes/s)",
+        file=sys.stderr,
+    )
+    return 0 if failed == 0 else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,15 +2,39 @@
 
 from __future__ import annotations
 
-def predict(current_temp: float) -> float:
+from typing import Union
+
+import numpy as np
+
+from . import instrumentation
+from .model_runtime import ModelRuntime
+
+# Shared runtime; BreathService loads and warms a model into it at startup
+runtime = ModelRuntime(name="warmth")
+instrumentation.register(
+    "ness_model_predict_seconds",
+    "Model inference latency per batch",
+    runtime.latency,
+    model="warmth",
+)
+
+
+def predict(current_temp: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
     """Heuristic temperature delta predictor.
 
+    When a model is loaded into :data:`runtime` it is used instead of the heuristic.
+
     Args:
-        current_temp: Latest temperature reading from the sensor cache.
+        current_temp: Latest temperature reading from the sensor cache, or an
+            array of readings (one per zone) for vectorized prediction.
 
     Returns:
-        Desired change in temperature. Positive values indicate heating,
-        negative values indicate cooling.
+        Desired change in temperature, with the same shape as the input.
+        Positive values indicate heating, negative values indicate cooling.
     """
-    # TODO: Replace with neural network inference
+    if runtime.model is not None:
+        result = runtime.predict(np.reshape(np.asarray(current_temp, dtype="f8"), (-1, 1)))
+        return result if np.ndim(current_temp) else float(result[0])
+    if np.ndim(current_temp):
+        return np.zeros(np.shape(current_temp))
     return 0.0
@@ -0,0 +1,86 @@
+"""Columnar state for multi-zone climate control.
+
+Rather than one :class:`ClimateBrain` per zone, readings for every zone are kept in
+one NumPy column per channel, indexed by a stable zone slot. Predictors then run
+once over whole columns and produce a structured array of directives for all zones.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Mapping, Sequence
+
+import numpy as np
+
+DIRECTIVE_FIELDS = ("temperature_delta", "humidity_delta")
+
+
+class ZoneState:
+    """Latest reading per zone and channel, stored as float64 columns (NaN = unknown)."""
+
+    def __init__(
+        self, zone_ids: Iterable[str] = (), channels: Sequence[str] = ("temp", "humidity")
+    ) -> None:
+        self.zone_ids: List[str] = []
+        self.slots: Dict[str, int] = {}
+        self._capacity = 16
+        self.columns: Dict[str, np.ndarray] = {
+            name: np.full(self._capacity, np.nan) for name in channels
+        }
+        for zone_id in zone_ids:
+            self.slot(zone_id)
+
+    def __len__(self) -> int:
+        return len(self.zone_ids)
+
+    def slot(self, zone_id: str) -> int:
+        """Return the column index for ``zone_id``, registering it if new."""
+        idx = self.slots.get(zone_id)
+        if idx is None:
+            idx = self.slots[zone_id] = len(self.zone_ids)
+            self.zone_ids.append(zone_id)
+            if idx >= self._capacity:
+                self._grow(max(2 * self._capacity, idx + 1))
+        return idx
+
+    def _grow(self, capacity: int) -> None:
+        for name, column in self.columns.items():
+            grown = np.full(capacity, np.nan)
+            grown[: self._capacity] = column
+            self.columns[name] = grown
+        self._capacity = capacity
+
+    def _column(self, channel: str) -> np.ndarray:
+        if channel not in self.columns:
+            self.columns[channel] = np.full(self._capacity, np.nan)
+        return self.columns[channel]
+
+    def column(self, channel: str) -> np.ndarray:
+        """View of ``channel`` for the registered zones."""
+        return self._column(channel)[: len(self)]
+
+    def update(self, zone_id: str, readings: Mapping[str, object]) -> None:
+        """Store every numeric reading for one zone."""
+        idx = self.slot(zone_id)
+        for name, value in readings.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                self._column(name)[idx] = value
+
+    def update_many(self, zone_ids: Sequence[str], channel: str, values) -> None:
+        """Vectorized update of one channel for many zones."""
+        idx = np.fromiter((self.slot(z) for z in zone_ids), dtype=np.intp, count=len(zone_ids))
+        self.assign(idx, channel, values)
+
+    def assign(self, slots: np.ndarray, channel: str, values) -> None:
+        """Write ``values`` into ``channel`` at slot indices; later duplicates win."""
+        self._column(channel)[slots] = np.asarray(values, dtype="f8")
+
+
+def directive_array(zone_ids: Sequence[str], **columns: np.ndarray) -> np.ndarray:
+    """Pack per-zone directive columns into a structured array keyed by ``zone``."""
+    ids = np.asarray(zone_ids, dtype=str)
+    dtype = [("zone", ids.dtype)] + [(name, "f8") for name in DIRECTIVE_FIELDS]
+    out = np.zeros(len(ids), dtype=dtype)
+    out["zone"] = ids
+    for name, values in columns.items():
+        out[name] = values
+    return out
@@ -0,0 +1,134 @@
+"""Versioned overlay configuration shared through Redis.
+
+When several overlay workers or pods run side by side, each keeps an in-memory copy
+of the configuration for request-time reads. Updates are written to a Redis hash
+together with a monotonically increasing version and broadcast on a pub/sub channel
+in the same scripted call, so every subscribed worker applies them within one
+message hop. Workers ignore messages older than the version they already hold and
+reload from the hash after reconnecting, so missed broadcasts are recovered.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+import redis.asyncio as redis
+
+logger = logging.getLogger(__name__)
+
+# Seed the hash only if no worker has published yet; return the stored state.
+_SEED = """
+if redis.call('HSETNX', KEYS[1], 'data', ARGV[1]) == 1 then
+  redis.call('HSET', KEYS[1], 'version', 1)
+end
+return redis.call('HMGET', KEYS[1], 'version', 'data')
+"""
+
+# Bump the version, store the payload and broadcast both atomically.
+_PUBLISH = """
+local version = redis.call('HINCRBY', KEYS[1], 'version', 1)
+redis.call('HSET', KEYS[1], 'data', ARGV[1])
+redis.call('PUBLISH', ARGV[2], cjson.encode({version = version, data = ARGV[1]}))
+return version
+"""
+
+UpdateCallback = Callable[[int, Dict[str, Any]], Awaitable[None] | None]
+
+
+class RedisConfigStore:
+    """Persist configuration in Redis and fan updates out over pub/sub."""
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        key: str = "overlay:config",
+        channel: str = "overlay:config:updates",
+    ) -> None:
+        self.client = client
+        self.key = key
+        self.channel = channel
+        self.version = 0
+        self._seed = client.register_script(_SEED)
+        self._publish = client.register_script(_PUBLISH)
+        self._listener: Optional[asyncio.Task] = None
+
+    async def bootstrap(self, default: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """Return the shared config, seeding Redis with ``default`` if it is empty."""
+        version, data = await self._seed(keys=[self.key], args=[json.dumps(default)])
+        self.version = int(version)
+        return self.version, json.loads(data)
+
+    async def publish(
+        self, data: Dict[str, Any], on_update: Optional[UpdateCallback] = None
+    ) -> int:
+        """Store ``data`` as the new shared config and return its version.
+
+        Args:
+            data: The new configuration.
+            on_update: Applied to ``data`` locally unless the listener already
+                applied a newer version while the publish was in flight.
+        """
+        version = int(
+            await self._publish(keys=[self.key], args=[json.dumps(data), self.channel])
+        )
+        if on_update is not None:
+            await self._apply(version, data, on_update)
+        else:
+            self.version = max(self.version, version)
+        return version
+
+    async def reload(self) -> Optional[Tuple[int, Dict[str, Any]]]:
+        """Fetch the stored config, returning ``None`` if nothing was published."""
+        version, data = await self.client.hmget(self.key, ["version", "data"])
+        if version is None or data is None:
+            return None
+        return int(version), json.loads(data)
+
+    def start(self, on_update: UpdateCallback) -> None:
+        """Subscribe in the background and invoke ``on_update`` for newer versions."""
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen(on_update))
+
+    async def aclose(self) -> None:
+        """Stop the background subscription."""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+
+    async def _apply(self, version: int, data: Dict[str, Any], on_update: UpdateCallback) -> None:
+        if version <= self.version:
+            return
+        self.version = version
+        result = on_update(version, data)
+        if asyncio.iscoroutine(result):
+            await result
+
+    async def _listen(self, on_update: UpdateCallback) -> None:
+        while True:
+            pubsub = self.client.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                # catch up on anything published while we were not subscribed
+                state = await self.reload()
+                if state is not None:
+                    await self._apply(*state, on_update)
+                async for message in pubsub.listen():
+                    if message.get("type") != "message":
+                        continue
+                    payload = json.loads(message["data"])
+                    version, data = int(payload["version"]), json.loads(payload["data"])
+                    await self._apply(version, data, on_update)
+            except asyncio.CancelledError:
+                raise
+            except (redis.RedisError, OSError) as exc:
+                logger.warning("Config subscription lost, retrying: %s", exc)
+                await asyncio.sleep(1.0)
+            finally:
+                await pubsub.aclose()
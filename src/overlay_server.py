@@ -4,21 +4,46 @@ The previous in-memory limiter was unsuitable for distributed deployments; this
 backs counters with Redis so multiple instances share the same throttle state. We also
 adopt FastAPI's lifespan hooks instead of deprecated ``on_event`` handlers to persist
 configuration and close connections gracefully.
+
+Importing this module has no side effects, so short-lived workers and tools start
+fast. The config file is read when the app starts (:func:`init_config`). Signal
+handlers are installed by :func:`run`. Redis cluster and sentinel support, and the
+AI stack behind ``/breath`` and ``/calendar.ics``, are imported on first use.
 """
 
+import hashlib
+import json
+import logging
 import os
 import signal
-import time
+import threading
 from contextlib import asynccontextmanager
+from datetime import datetime
 from pathlib import Path
-from typing import Optional
+from types import ModuleType
+from typing import TYPE_CHECKING, List, Literal, Optional, Tuple, Union
 
 import redis.asyncio as redis  # async Redis client for distributed rate limiting
-from redis.asyncio.cluster import RedisCluster
-from redis.asyncio.sentinel import Sentinel
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+
+from ai import instrumentation
+from config_store import RedisConfigStore
+from rate_limiting import (
+    HYBRID_STRATEGIES,
+    HybridRateLimiter,
+    RateLimitStrategy,
+    RedisRateLimiter,
+)
+
+if TYPE_CHECKING:
+    from ai.breath_service import BreathService
+    from ai.divine_climate_brain import SensorPacket
+    from ai.sensor_batch import SensorBatch
+
+    BreathPackets = Union[List[SensorPacket], SensorBatch]
 
 # Determine config and Redis settings, allowing tests to override via env vars
 CONFIG_PATH = Path(os.getenv("OVERLAY_CONFIG_PATH", "config/overlay.json"))
@@ -26,14 +51,44 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 REDIS_CLUSTER_NODES = os.getenv("REDIS_CLUSTER_NODES")
 REDIS_SENTINELS = os.getenv("REDIS_SENTINELS")
 REDIS_SENTINEL_SERVICE = os.getenv("REDIS_SENTINEL_SERVICE", "mymaster")
+# "redis" shares config across workers/pods through a versioned Redis hash
+CONFIG_BACKEND = os.getenv("OVERLAY_CONFIG_BACKEND", "file")
+CALENDAR_PATH = Path(os.getenv("OVERLAY_CALENDAR_PATH", "data/schedule.ics"))
+
+logger = logging.getLogger(__name__)
+
+_REQUESTS = {
+    outcome: instrumentation.counter(
+        "ness_http_requests_total", "Overlay requests by middleware outcome", outcome=outcome
+    )
+    for outcome in ("served", "not_modified", "rate_limited", "unmetered")
+}
+_RATE_LIMIT = instrumentation.stage("rate_limit")
+_HANDLER = instrumentation.stage("http_handler")
 
 
 class OverlayConfig(BaseModel):
     """Serializable overlay configuration persisted on shutdown."""
 
     port: int = 8000
+    workers: int = 1
     rate_limit_per_minute: int = 60
+    rate_limit_strategy: RateLimitStrategy = "fixed_window"
+    # "hybrid" admits requests from in-process counters synced to Redis in batches
+    rate_limit_tier: Literal["redis", "hybrid"] = "redis"
+    hybrid_flush_interval_ms: int = 50
+    hybrid_flush_max_requests: int = 100
+    hybrid_error_budget: float = 0.1
     greeting: str = "Ness overlay online"
+    # Cache-Control max-age for /overlay; 0 makes clients revalidate with If-None-Match
+    overlay_max_age: int = 0
+    # answer matching If-None-Match on /overlay before spending a rate-limit check
+    conditional_bypass_rate_limit: bool = True
+    # /breath/batch is limited per packet rather than per request
+    breath_packets_per_minute: int = 60000
+    breath_batch_max_packets: int = 10000
+    # bodies larger than this are refused before they are read in full
+    breath_batch_max_bytes: int = 8 << 20
 
 
 def load_config() -> OverlayConfig:
@@ -46,19 +101,90 @@ def load_config() -> OverlayConfig:
     return cfg
 
 
-config = load_config()
+# defaults until init_config() loads CONFIG_PATH at startup; updated in place so
+# references taken at import time stay valid
+config = OverlayConfig()
+_config_loaded = False
 
-# Redis client will be created during startup in the lifespan context
+# Redis client and limiter will be created during startup in the lifespan context
 redis_client: redis.Redis | None = None
+limiter: RedisRateLimiter | HybridRateLimiter | None = None
+config_store: RedisConfigStore | None = None
+# created on the first /breath/batch request so the AI stack is only loaded when used
+breath_service: Optional["BreathService"] = None
+# batches are ingested on worker threads; the brain takes one at a time
+_breath_lock = threading.Lock()
+# routes that call the limiter themselves, charging one unit per packet
+PACKET_METERED_PATHS = {"/breath/batch"}
+# never rate limited, so scrapes keep working while clients are being throttled
+UNMETERED_PATHS = {"/metrics"}
+# bumped on every applied update; shared across workers when CONFIG_BACKEND is redis
+config_version = 0
+
+
+def _replace_config(updated: OverlayConfig) -> None:
+    for name in OverlayConfig.model_fields:
+        setattr(config, name, getattr(updated, name))
+
+
+def init_config() -> OverlayConfig:
+    """Load ``CONFIG_PATH`` into :data:`config` on first call (creating it if missing)."""
+    global _config_loaded
+    if not _config_loaded:
+        _replace_config(load_config())
+        _config_loaded = True
+    return config
+
+
+def apply_config(version: int, data: dict) -> None:
+    """Replace the in-memory config in place with ``data`` at ``version``."""
+    global config_version
+    _replace_config(OverlayConfig.model_validate(data))
+    config_version = version
+
+
+# Pre-rendered /overlay body and its ETag, keyed by the config version they reflect
+_overlay_cache: Tuple[int, bytes, str] | None = None
+
+
+def render_overlay() -> Tuple[bytes, str]:
+    """Return the serialized /overlay body and ETag, rebuilding only on config changes."""
+    global _overlay_cache
+    if _overlay_cache is None or _overlay_cache[0] != config_version:
+        body = json.dumps({"message": config.greeting}).encode()
+        # content hash keeps ETags identical across workers serving the same config
+        etag = '"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+        _overlay_cache = (config_version, body, etag)
+    return _overlay_cache[1], _overlay_cache[2]
+
+
+def _cache_headers(etag: str) -> dict:
+    if config.overlay_max_age > 0:
+        cache_control = f"public, max-age={config.overlay_max_age}"
+    else:
+        cache_control = "no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def _not_modified(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
 
 
 def create_redis_client() -> redis.Redis:
     """Instantiate a Redis client with optional cluster/sentinel awareness."""
 
     if REDIS_CLUSTER_NODES:
+        from redis.asyncio.cluster import RedisCluster
+
         cluster_url = "redis://" + ",".join(REDIS_CLUSTER_NODES.split(","))
         return RedisCluster.from_url(cluster_url, decode_responses=True)
     if REDIS_SENTINELS:
+        from redis.asyncio.sentinel import Sentinel
+
         nodes = [
             (host.split(":")[0], int(host.split(":")[1]))
             for host in REDIS_SENTINELS.split(",")
@@ -68,17 +194,50 @@ def create_redis_client() -> redis.Redis:
     return redis.from_url(REDIS_URL, decode_responses=True)
 
 
+def _strategy_conflict(candidate: OverlayConfig) -> Optional[str]:
+    """Explain why ``candidate`` asks for a strategy its limiter tier cannot enforce."""
+    tier, strategy = candidate.rate_limit_tier, candidate.rate_limit_strategy
+    if tier == "hybrid" and strategy not in HYBRID_STRATEGIES:
+        return (
+                f"rate_limit_strategy {candidate.rate_limit_strategy!r} is not supported by "
+                f"the hybrid tier; use one of {', '.join(HYBRID_STRATEGIES)}"
+            )
+    return None
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Manage Redis connection and persist config on shutdown."""
 
-    global redis_client
+    global redis_client, limiter, config_store
+    init_config()
     redis_client = create_redis_client()
+    if CONFIG_BACKEND == "redis":
+        config_store = RedisConfigStore(redis_client)
+        apply_config(*await config_store.bootstrap(config.model_dump()))
+        config_store.start(apply_config)
+    if config.rate_limit_tier == "hybrid":
+        problem = _strategy_conflict(config)
+        if problem:
+            raise ValueError(problem)
+        limiter = HybridRateLimiter(
+            redis_client,
+            flush_interval_ms=config.hybrid_flush_interval_ms,
+            flush_max_requests=config.hybrid_flush_max_requests,
+            error_budget=config.hybrid_error_budget,
+        )
+        await limiter.start()
+    else:
+        limiter = RedisRateLimiter(redis_client)
     try:
         yield
     finally:
         # ensure config is stored before tearing down Redis connection
         save_config()
+        if config_store is not None:
+            await config_store.aclose()
+        if isinstance(limiter, HybridRateLimiter):
+            await limiter.aclose()
         if redis_client is not None:
             await redis_client.close()
 
@@ -88,47 +247,200 @@ app = FastAPI(title="NessHash Overlay", lifespan=lifespan)
 
 @app.middleware("http")
 async def rate_limiter(request: Request, call_next):
-    """Per-IP, per-minute rate limiting using Redis."""
+    """Per-IP rate limiting using a single scripted Redis call per request."""
+
+    assert limiter is not None  # limiter set during lifespan startup
+    path = request.url.path
+    if path in PACKET_METERED_PATHS or path in UNMETERED_PATHS:
+        _REQUESTS["unmetered"].inc()
+        return await call_next(request)
+    if config.conditional_bypass_rate_limit and request.method == "GET" and path == "/overlay":
+        _, etag = render_overlay()
+        if _not_modified(request, etag):
+            _REQUESTS["not_modified"].inc()
+            return Response(status_code=304, headers=_cache_headers(etag))
 
-    assert redis_client is not None  # redis_client set during lifespan startup
     ip = request.client.host
-    window = int(time.time() // 60)
-    key = f"rl:{ip}:{window}"
-
-    # Increment the counter and set expiration for the current window
-    count = await redis_client.incr(key)
-    if count == 1:
-        await redis_client.expire(key, 60)  # expire after one minute
-
-    if count > config.rate_limit_per_minute:
-        return JSONResponse(status_code=429, content={"detail": "Too many requests"})
-
-    return await call_next(request)
+    with _RATE_LIMIT.time():
+        result = await limiter.hit(
+            ip,
+            config.rate_limit_per_minute,
+            window_seconds=60,
+            strategy=config.rate_limit_strategy,
+        )
+    if not result.allowed:
+        _REQUESTS["rate_limited"].inc()
+        return JSONResponse(
+            status_code=429, content={"detail": "Too many requests"}, headers=result.headers()
+        )
+
+    _REQUESTS["served"].inc()
+    with _HANDLER.time():
+        response = await call_next(request)
+    response.headers.update(result.headers())
+    return response
 
 
 class ConfigUpdate(BaseModel):
     """Schema for dynamic config updates via API."""
 
     rate_limit_per_minute: Optional[int] = None
+    rate_limit_strategy: Optional[RateLimitStrategy] = None
     greeting: Optional[str] = None
+    breath_packets_per_minute: Optional[int] = None
 
 
 @app.get("/overlay")
-async def get_overlay():
-    """Return overlay greeting."""
-    return {"message": config.greeting}
+async def get_overlay(request: Request):
+    """Return overlay greeting from the pre-rendered cache, honouring If-None-Match."""
+    body, etag = render_overlay()
+    headers = _cache_headers(etag)
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Expose hot-path counters and latency histograms for Prometheus."""
+    return PlainTextResponse(
+        instrumentation.REGISTRY.render(), media_type="text/plain; version=0.0.4"
+    )
 
 
 @app.post("/config")
 async def update_config(update: ConfigUpdate):
-    """Allow runtime tweaks; persisted on shutdown."""
-    if update.rate_limit_per_minute is not None:
-        config.rate_limit_per_minute = update.rate_limit_per_minute
-    if update.greeting is not None:
-        config.greeting = update.greeting
+    """Allow runtime tweaks; broadcast to other workers in redis mode, persisted on shutdown."""
+    updated = config.model_copy(update=update.model_dump(exclude_none=True))
+    problem = _strategy_conflict(updated)
+    if problem:
+        return JSONResponse(status_code=422, content={"detail": problem})
+    data = updated.model_dump()
+    if config_store is not None:
+        # skipped if the listener applied a newer version during the publish
+        await config_store.publish(data, apply_config)
+    else:
+        apply_config(config_version + 1, data)
     return config
 
 
+@app.get("/calendar.ics")
+async def export_calendar(start: Optional[datetime] = None, end: Optional[datetime] = None):
+    """Stream the voice agent's calendar (optionally a time range) with bounded memory."""
+    # imported lazily so the overlay does not load ics unless calendars are served
+    from ai.calendar_backends import ICSCalendarBackend
+
+    # a fresh backend per request picks up events appended by other processes; its
+    # index comes from the on-disk sidecar, so only new journal bytes are scanned
+    backend = ICSCalendarBackend(CALENDAR_PATH)
+    return StreamingResponse(backend.iter_serialize(start, end), media_type="text/calendar")
+
+
+def _breath_stack() -> Tuple["BreathService", ModuleType]:
+    """Return the shared ``BreathService`` and the wire codec module, importing lazily."""
+    global breath_service
+    from ai import breath_codec
+    from ai.breath_service import BreathService
+
+    if breath_service is None:
+        breath_service = BreathService()
+    return breath_service, breath_codec
+
+
+async def _read_capped(request: Request, limit: int) -> Optional[bytes]:
+    """Read the request body, or return ``None`` as soon as it exceeds ``limit`` bytes."""
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > limit:
+        return None
+    chunks, size = [], 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+    return b"".join(chunks)
+
+
+def _ingest_breath(service: "BreathService", packets: "BreathPackets") -> int:
+    """Feed one decoded batch to the brain and predict once; runs on a worker thread."""
+    with _breath_lock:
+        accepted = service.receive_packets(packets)
+        service.process()  # one prediction per batch, not per packet
+    return accepted
+
+
+def _decode_breath(
+    codec: ModuleType, media_type: str, body: bytes
+) -> Optional["BreathPackets"]:
+    if media_type == codec.BINARY_MEDIA_TYPE:
+        return codec.decode_binary(body)
+    if media_type in codec.NDJSON_MEDIA_TYPES:
+        return codec.decode_ndjson(body)
+    if media_type in ("application/msgpack", "application/x-msgpack"):
+        import msgpack  # optional; only needed by gateways that send msgpack
+
+        return codec.decode_objects(msgpack.unpackb(body))
+    return None
+
+
+@app.post("/breath/batch")
+async def ingest_breath_batch(request: Request):
+    """Ingest many breath packets (NDJSON, binary or msgpack) in one request.
+
+    The rate limit is charged one unit per packet. A client already out of budget,
+    or a body over ``breath_batch_max_bytes``, is refused before the body is read.
+    Decoding, ingestion and prediction run on a worker thread, off the event loop.
+    """
+    assert limiter is not None
+    key = f"{request.client.host}:breath"
+    limit = config.breath_packets_per_minute
+    # admission: charge the first packet up front so an exhausted client costs nothing
+    result = await limiter.hit(
+        key, limit, window_seconds=60, strategy=config.rate_limit_strategy, cost=1
+    )
+    if not result.allowed:
+        return JSONResponse(
+            status_code=429, content={"detail": "Too many packets"}, headers=result.headers()
+        )
+    body = await _read_capped(request, config.breath_batch_max_bytes)
+    if body is None:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"At most {config.breath_batch_max_bytes} bytes per batch"},
+        )
+    service, codec = _breath_stack()
+    media_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    try:
+        packets = await run_in_threadpool(_decode_breath, codec, media_type, body)
+    except ImportError:
+        packets = None
+    except ValueError as exc:
+        return JSONResponse(status_code=422, content={"detail": str(exc)})
+    if packets is None:
+        return JSONResponse(
+            status_code=415, content={"detail": f"Unsupported content type {media_type!r}"}
+        )
+    if len(packets) > config.breath_batch_max_packets:
+        return JSONResponse(
+            status_code=413,
+            content={"detail": f"At most {config.breath_batch_max_packets} packets per batch"},
+        )
+    if len(packets) > 1:
+        result = await limiter.hit(
+            key,
+            limit,
+            window_seconds=60,
+            strategy=config.rate_limit_strategy,
+            cost=len(packets) - 1,
+        )
+        if not result.allowed:
+            return JSONResponse(
+                status_code=429, content={"detail": "Too many packets"}, headers=result.headers()
+            )
+    accepted = await run_in_threadpool(_ingest_breath, service, packets)
+    return JSONResponse({"accepted": accepted}, headers=result.headers())
+
+
 def save_config() -> None:
     """Persist current config to disk."""
     CONFIG_PATH.write_text(config.model_dump_json(indent=2))
@@ -140,15 +452,29 @@ def _signal_handler(*_: object) -> None:
     raise SystemExit(0)
 
 
-for sig in (signal.SIGINT, signal.SIGTERM):
-    signal.signal(sig, _signal_handler)
+def install_signal_handlers() -> None:
+    """Persist config on SIGINT/SIGTERM; must be called from the main thread."""
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(sig, _signal_handler)
 
 
 def run() -> None:
-    """Run the overlay server using uvicorn."""
+    """Run the overlay server using uvicorn, forking ``config.workers`` processes."""
     import uvicorn
 
-    uvicorn.run(app, host="0.0.0.0", port=config.port)
+    init_config()
+    install_signal_handlers()
+    if config.workers > 1:
+        if CONFIG_BACKEND != "redis":
+            logger.warning(
+                "Running %d workers with file-backed config; set OVERLAY_CONFIG_BACKEND=redis "
+                "so /config updates reach every worker",
+                config.workers,
+            )
+        # uvicorn needs an import string to spawn worker processes
+        uvicorn.run("overlay_server:app", host="0.0.0.0", port=config.port, workers=config.workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=config.port)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,415 @@
+"""Redis-backed rate limiting strategies for the overlay server.
+
+Each strategy is a Lua script executed server-side, so a request costs exactly one
+round trip and counter updates and expirations are applied atomically. Scripts read
+the clock with ``TIME`` so every worker shares Redis' notion of "now" (requires
+Redis >= 5 for effect replication of non-deterministic commands). Keys embed the
+client identity as a hash tag (``rl:{ip}:...``) so multi-key layouts stay on one
+cluster slot.
+
+Scripts take a ``cost`` so one call can account for many units of work, such as
+every packet in a bulk upload. Every script replies with
+``[allowed, remaining, reset_ms, retry_after_ms]``, from which
+:class:`RateLimitResult` derives the ``X-RateLimit-*`` and ``Retry-After`` headers
+without further Redis calls.
+
+:class:`HybridRateLimiter` is an optional tier in front of Redis that admits
+requests from in-process counters and synchronizes them in pipelined batches, so the
+request path never waits on Redis.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import math
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Literal, Optional, Tuple
+
+import redis.asyncio as redis
+
+RateLimitStrategy = Literal["fixed_window", "sliding_window", "sliding_log", "token_bucket"]
+
+# Fixed window: the first hit starts a window that expires after ``window_ms``.
+_FIXED_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local count = redis.call('INCRBY', KEYS[1], cost)
+if count == cost then
+  redis.call('PEXPIRE', KEYS[1], window)
+end
+local ttl = redis.call('PTTL', KEYS[1])
+if ttl < 0 then
+  redis.call('PEXPIRE', KEYS[1], window)
+  ttl = window
+end
+if count > limit then
+  -- a denied call consumes nothing, so a large batch cannot burn the rest of the window
+  count = redis.call('DECRBY', KEYS[1], cost)
+  return {0, limit - count, ttl, ttl}
+end
+return {1, limit - count, ttl, 0}
+"""
+
+# Sliding counter: weights the previous window's count by how much of it still
+# overlaps the trailing window, smoothing out the fixed-window boundary burst.
+_SLIDING_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local idx = math.floor(now / window)
+local state = redis.call('HMGET', KEYS[1], 'idx', 'cur', 'prev')
+local cur = tonumber(state[2]) or 0
+local prev = tonumber(state[3]) or 0
+local stored = tonumber(state[1]) or idx
+if idx == stored + 1 then
+  prev = cur
+  cur = 0
+elseif idx > stored + 1 then
+  prev = 0
+  cur = 0
+end
+local into = now - idx * window
+local reset = window - into
+local estimate = prev * (window - into) / window + cur
+if estimate + cost > limit then
+  local retry = reset
+  if prev > 0 and cur + cost <= limit then
+    -- time until the previous window's weight decays enough to admit this cost
+    local needed = window * (1 - (limit - cur - cost) / prev)
+    retry = math.max(1, math.ceil(needed - into))
+  end
+  redis.call('HSET', KEYS[1], 'idx', idx, 'cur', cur, 'prev', prev)
+  redis.call('PEXPIRE', KEYS[1], window * 2)
+  return {0, 0, reset, retry}
+end
+cur = cur + cost
+redis.call('HSET', KEYS[1], 'idx', idx, 'cur', cur, 'prev', prev)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.floor(limit - estimate - cost), reset, 0}
+"""
+
+# Sliding log: exact trailing-window count using one sorted-set entry per unit of cost.
+_SLIDING_LOG = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+local reset = window
+if oldest[2] then
+  reset = math.max(1, tonumber(oldest[2]) + window - now)
+end
+if count + cost > limit then
+  return {0, limit - count, reset, reset}
+end
+for i = 1, cost do
+  redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+return {1, limit - count - cost, reset, 0}
+"""
+
+# Token bucket: ``limit`` tokens refilled continuously over ``window_ms``.
+_TOKEN_BUCKET = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local rate = limit / window
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or limit
+local ts = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry = 0
+if tokens >= cost then
+  tokens = tokens - cost
+  allowed = 1
+elseif cost > limit then
+  retry = window  -- can never fit; report a full refill
+else
+  retry = math.ceil((cost - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(window))
+local reset = math.ceil((limit - tokens) / rate)
+return {allowed, math.floor(tokens), reset, retry}
+"""
+
+_SCRIPTS: Dict[str, str] = {
+    "fixed_window": _FIXED_WINDOW,
+    "sliding_window": _SLIDING_WINDOW,
+    "sliding_log": _SLIDING_LOG,
+    "token_bucket": _TOKEN_BUCKET,
+}
+
+
+@dataclass(frozen=True)
+class RateLimitResult:
+    """Outcome of a single rate-limit check."""
+
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_ms: int
+    retry_after_ms: int = 0
+
+    def headers(self) -> Dict[str, str]:
+        """Return standard rate-limit headers derived from this result."""
+        headers = {
+            "X-RateLimit-Limit": str(self.limit),
+            "X-RateLimit-Remaining": str(max(0, self.remaining)),
+            "X-RateLimit-Reset": str(math.ceil(self.reset_ms / 1000)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after_ms / 1000)))
+        return headers
+
+
+class RedisRateLimiter:
+    """Evaluate rate-limit scripts against Redis in a single round trip."""
+
+    def __init__(self, client: redis.Redis, prefix: str = "rl") -> None:
+        self.prefix = prefix
+        # register_script caches the SHA locally and uses EVALSHA, falling back to
+        # loading the script only when the server does not know it yet
+        self._scripts = {name: client.register_script(src) for name, src in _SCRIPTS.items()}
+
+    def key(self, identity: str, strategy: RateLimitStrategy) -> str:
+        """Build the Redis key for ``identity`` under ``strategy``."""
+        return f"{self.prefix}:{{{identity}}}:{strategy}"
+
+    async def hit(
+        self,
+        identity: str,
+        limit: int,
+        window_seconds: float = 60,
+        strategy: RateLimitStrategy = "fixed_window",
+        cost: int = 1,
+    ) -> RateLimitResult:
+        """Record ``cost`` units (one request by default) and report whether they fit.
+
+        A denied call records nothing, so a batch over the remaining budget can be
+        retried smaller.
+        """
+        script = self._scripts[strategy]
+        window_ms = int(window_seconds * 1000)
+        args = [limit, window_ms, cost]
+        if strategy == "sliding_log":
+            args.append(uuid.uuid4().hex)  # unique sorted-set member prefix per request
+        allowed, remaining, reset_ms, retry_ms = await script(
+            keys=[self.key(identity, strategy)], args=args
+        )
+        return RateLimitResult(
+            allowed=bool(int(allowed)),
+            limit=limit,
+            remaining=int(remaining),
+            reset_ms=int(reset_ms),
+            retry_after_ms=int(retry_ms),
+        )
+
+
+class CircuitBreaker:
+    """Trip after consecutive failures and allow a trial call after a cool-down."""
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 5.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Return ``True`` when a call to the protected resource may be attempted."""
+        return self.state != "open"
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self.opened_at = None
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            self.opened_at = time.monotonic()
+
+
+@dataclass
+class _LocalWindow:
+    """Per-identity counters for the current window."""
+
+    window: int
+    synced: int = 0  # global count last reported by Redis
+    pending: int = 0  # local hits not yet flushed
+    touched: bool = False  # seen since the last flush, so worth refreshing
+
+
+# strategies the hybrid tier actually enforces
+HYBRID_STRATEGIES = ("fixed_window",)
+
+
+class HybridRateLimiter:
+    """Approximate fixed-window limiter that answers locally and syncs to Redis in batches.
+
+    Hits are counted in-process and admitted against ``synced + pending``; deltas are
+    flushed in one pipelined round trip every ``flush_interval_ms`` or once
+    ``flush_max_requests`` unflushed hits accumulate, and the replies refresh the
+    global counts. ``error_budget`` is the fraction of the limit a single identity may
+    consume locally before a flush is forced, bounding over-admission across workers.
+    While the circuit breaker is open, Redis is skipped and limits are enforced from
+    local counts alone. Deltas still unsynced when a window rolls over are kept and
+    flushed to that window's key, so Redis sees every admitted hit.
+    """
+
+    def __init__(
+        self,
+        client: redis.Redis,
+        prefix: str = "rl",
+        flush_interval_ms: int = 50,
+        flush_max_requests: int = 100,
+        error_budget: float = 0.1,
+        sync_timeout: float = 0.25,
+        breaker: Optional[CircuitBreaker] = None,
+    ) -> None:
+        self.client = client
+        self.prefix = prefix
+        self.flush_interval = flush_interval_ms / 1000
+        self.flush_max_requests = flush_max_requests
+        self.error_budget = error_budget
+        self.sync_timeout = sync_timeout
+        self.breaker = breaker or CircuitBreaker()
+        self._windows: Dict[str, _LocalWindow] = {}
+        # (identity, window, delta) left unsynced by windows that have rolled over
+        self._retired: List[Tuple[str, int, int]] = []
+        self._unflushed = 0
+        self._window_seconds: float = 60
+        self._flush_task: Optional[asyncio.Task] = None
+        self._loop_task: Optional[asyncio.Task] = None
+
+    def key(self, identity: str, window: int) -> str:
+        """Build the Redis key for ``identity`` in fixed window ``window``."""
+        return f"{self.prefix}:{{{identity}}}:hybrid:{window}"
+
+    async def start(self) -> None:
+        """Start the periodic background flusher."""
+        if self._loop_task is None:
+            self._loop_task = asyncio.create_task(self._flush_loop())
+
+    async def aclose(self) -> None:
+        """Stop the background flusher and push any remaining deltas."""
+        if self._loop_task is not None:
+            self._loop_task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._loop_task
+            self._loop_task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _schedule_flush(self) -> None:
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self.flush())
+
+    async def hit(
+        self,
+        identity: str,
+        limit: int,
+        window_seconds: float = 60,
+        strategy: RateLimitStrategy = "fixed_window",
+        cost: int = 1,
+    ) -> RateLimitResult:
+        """Record ``cost`` units locally.
+
+        Only fixed windows are implemented; ``strategy`` is accepted for API parity
+        and callers should refuse to configure any other (see :data:`HYBRID_STRATEGIES`).
+        """
+        self._window_seconds = window_seconds
+        now = time.time()
+        window = int(now // window_seconds)
+        reset_ms = int(((window + 1) * window_seconds - now) * 1000)
+        state = self._windows.get(identity)
+        if state is None or state.window != window:
+            if state is not None:
+                self._retire(identity, state)
+            state = self._windows[identity] = _LocalWindow(window)
+
+        used = state.synced + state.pending
+        if used + cost > limit:
+            return RateLimitResult(False, limit, limit - used, reset_ms, reset_ms)
+
+        state.touched = True
+        state.pending += cost
+        self._unflushed += cost
+        allowance = max(1, int(limit * self.error_budget))
+        if self._unflushed >= self.flush_max_requests or state.pending >= allowance:
+            self._schedule_flush()
+        return RateLimitResult(True, limit, limit - used - cost, reset_ms)
+
+    def _retire(self, identity: str, state: _LocalWindow) -> None:
+        """Keep a rolled-over window's unsynced delta for the next flush."""
+        if state.pending:
+            self._retired.append((identity, state.window, state.pending))
+
+    def _count_unflushed(self) -> None:
+        pending = sum(s.pending for s in self._windows.values())
+        self._unflushed = pending + sum(delta for _, _, delta in self._retired)
+
+    async def flush(self) -> None:
+        """Push pending deltas to Redis in one pipeline and refresh global counts."""
+        current = int(time.time() // self._window_seconds)
+        # windows that have rolled over only have their leftover delta to report
+        for identity in [i for i, s in self._windows.items() if s.window < current]:
+            self._retire(identity, self._windows.pop(identity))
+        # identities admitted since the last flush send their delta (possibly zero) and
+        # read back the global count that other workers have contributed to
+        batch = [(i, s, s.pending) for i, s in self._windows.items() if s.touched]
+        if not (batch or self._retired) or not self.breaker.allow():
+            return
+
+        ttl_ms = int(self._window_seconds * 2000)
+        retired, self._retired = self._retired, []
+        for _, state, delta in batch:
+            state.pending -= delta
+        self._count_unflushed()
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for identity, state, delta in batch:
+                key = self.key(identity, state.window)
+                pipe.incrby(key, delta)
+                pipe.pexpire(key, ttl_ms)
+            for identity, window, delta in retired:
+                key = self.key(identity, window)
+                pipe.incrby(key, delta)
+                pipe.pexpire(key, ttl_ms)
+            replies = await asyncio.wait_for(pipe.execute(), timeout=self.sync_timeout)
+        except (redis.RedisError, OSError, asyncio.TimeoutError):
+            # keep the deltas so they are replayed once Redis is reachable again
+            for _, state, delta in batch:
+                state.pending += delta
+            self._retired[:0] = retired
+            self._count_unflushed()
+            self.breaker.record_failure()
+            return
+        self.breaker.record_success()
+        for (_, state, _), total in zip(batch, replies[::2]):
+            state.synced = int(total)
+            state.touched = state.pending > 0
@@ -0,0 +1,87 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from ai.actuator_dispatcher import ActuatorDispatcher
+from fake_mqtt_broker import FakeMQTTBroker
+from ai.zone_state import directive_array
+
+
+def test_publishes_latest_directive_per_topic():
+    with FakeMQTTBroker() as broker:
+        dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, qos=1)
+        for i in range(500):
+            dispatcher.dispatch({"temperature_delta": float(i)}, topic=f"zone/{i % 5}")
+        asyncio.run(dispatcher.dispatch_async({"humidity_delta": 0.1}))
+        dispatcher.dispatch_zones(directive_array(["a", "b"], temperature_delta=[1.0, -1.0]))
+        assert dispatcher.close(timeout=5)
+
+    latest = {topic: json.loads(payload) for topic, payload, _ in broker.messages}
+    assert latest["zone/3"] == {"temperature_delta": 498.0}
+    assert latest["terraform/commands"] == {"humidity_delta": 0.1}
+    assert latest["terraform/commands/b"]["temperature_delta"] == -1.0
+    assert {qos for _, _, qos in broker.messages} == {1}
+    assert dispatcher.published == len(broker.messages)
+    assert dispatcher.published + dispatcher.coalesced == 503
+
+
+def test_offline_directives_coalesce_and_drop_stale_topics():
+    broker = FakeMQTTBroker()  # bound but not yet answering CONNECT
+    dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, qos=0, max_pending=2)
+    try:
+        for i in range(10):
+            for zone in ("a", "b", "c"):
+                dispatcher.dispatch({"v": i}, topic=zone)
+        assert dispatcher.pending == 2
+        broker.start()
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.close()
+        broker.close()
+
+    assert sorted((t, json.loads(p)["v"]) for t, p, _ in broker.messages) == [("b", 9), ("c", 9)]
+    assert dispatcher.dropped > 0
+    assert dispatcher.published == 2
+
+
+def test_emergency_lane_preempts_routine_backlog():
+    broker = FakeMQTTBroker()  # routine backlog builds up until the broker answers
+    dispatcher = ActuatorDispatcher.connect(
+        "127.0.0.1", broker.port, qos=1, max_inflight=1, max_pending=10_000
+    )
+    try:
+        for i in range(2000):
+            dispatcher.dispatch({"temperature_delta": 0.1}, topic=f"zone/{i}")
+        dispatcher.dispatch({"isolate": 1.0}, topic="zone/7/isolate", priority="emergency")
+        broker.start()
+        assert dispatcher.flush(timeout=30)
+    finally:
+        dispatcher.close()
+        broker.close()
+
+    topics = [topic for topic, _, _ in broker.messages]
+    assert topics[0] == "zone/7/isolate" and topics[1:3] == ["zone/0", "zone/1"]
+    emergency, routine = dispatcher.queue_latency["emergency"], dispatcher.queue_latency["routine"]
+    assert emergency.count == 1 and routine.count == 2000
+    assert emergency.quantile(0.99) <= routine.quantile(0.99)
+
+
+def test_expired_directives_are_not_sent():
+    broker = FakeMQTTBroker()
+    dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, qos=1)
+    try:
+        dispatcher.dispatch({"temperature_delta": 1.0}, topic="zone/a", deadline=0.01)
+        dispatcher.dispatch({"temperature_delta": 2.0}, topic="zone/b", priority="high")
+        time.sleep(0.05)
+        broker.start()
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.close()
+        broker.close()
+    assert [topic for topic, _, _ in broker.messages] == ["zone/b"]
+    assert dispatcher.expired == 1
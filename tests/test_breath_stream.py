@@ -0,0 +1,129 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import fakeredis.aioredis
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.breath_service import BreathService
+from ai.breath_stream import BreathStreamConsumer, encode_packet
+
+
+def test_consumers_split_stream_and_ack_after_tick():
+    async def scenario():
+        server = fakeredis.FakeServer()
+        producer = fakeredis.aioredis.FakeRedis(server=server)
+        services = [BreathService(), BreathService()]
+        consumers = [
+            BreathStreamConsumer(
+                service,
+                fakeredis.aioredis.FakeRedis(server=server),
+                consumer=f"worker-{i}",
+                batch_size=50,
+                block_ms=10,
+                tick_interval=0.02,
+                max_batches=2,
+            )
+            for i, service in enumerate(services)
+        ]
+        for consumer in consumers:
+            await consumer.ensure_group()
+            consumer.start()
+        pipe = producer.pipeline()
+        for i in range(1000):
+            pipe.xadd("breath:packets", encode_packet({"temp": 20 + i % 5}, timestamp=1000.0 + i))
+        pipe.xadd("breath:packets", {"temp": "21", "ts": "not-a-time"})
+        pipe.xadd("breath:packets", encode_packet({"temp": 30.0}, zone="greenhouse"))
+        await pipe.execute()
+
+        for _ in range(200):
+            if sum(c.acked for c in consumers) == 1002:
+                break
+            await asyncio.sleep(0.02)
+        for consumer in consumers:
+            await consumer.aclose()
+
+        assert sum(c.received for c in consumers) == 1001
+        assert sum(c.invalid for c in consumers) == 1
+        assert all(c.ticks > 0 for c in consumers if c.received)
+        pending = await producer.xpending("breath:packets", "breath-service")
+        assert pending["pending"] == 0
+        history = sum(len(s.brain.history.channel("temp")) for s in services)
+        assert history == 1000
+        assert any("greenhouse" in s.brain.zones.slots for s in services)
+
+    asyncio.run(scenario())
+
+
+def test_restarted_consumer_rereads_unacked_entries():
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        service = BreathService()
+        first = BreathStreamConsumer(service, client, consumer="edge-1")
+        await first.ensure_group()
+        for i in range(10):
+            await client.xadd("breath:packets", encode_packet({"temp": float(i)}))
+        # read but crash before any tick acknowledges the entries
+        await client.xreadgroup("breath-service", "edge-1", {"breath:packets": ">"})
+
+        second = BreathStreamConsumer(service, client, consumer="edge-1", tick_interval=0.01)
+        second.start()
+        for _ in range(100):
+            if second.acked == 10:
+                break
+            await asyncio.sleep(0.01)
+        await second.aclose()
+        assert second.received == 10
+        assert service.brain.cache["temp"] == 9.0
+
+    asyncio.run(scenario())
+
+
+def test_stages_survive_errors_and_deleted_claims():
+    import redis.asyncio as redis
+
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        service = BreathService()
+        consumer = BreathStreamConsumer(
+            service, client, consumer="edge-1", block_ms=10, tick_interval=0.01, claim_idle_ms=50
+        )
+        await consumer.ensure_group()
+        for i in range(5):
+            await client.xadd("breath:packets", encode_packet({"temp": float(i)}))
+        failures = {"read": 1, "ingest": 1}
+        read, receive, claim = client.xreadgroup, service.receive_packets, client.xautoclaim
+
+        async def flaky_read(*args, **kwargs):
+            if failures["read"]:
+                failures["read"] -= 1
+                raise redis.TimeoutError("read timed out")
+            return await read(*args, **kwargs)
+
+        def flaky_receive(packets):
+            if failures["ingest"] and packets:
+                failures["ingest"] -= 1
+                raise RuntimeError("brain hiccup")
+            return receive(packets)
+
+        async def claim_with_deleted(*args, **kwargs):
+            start, entries, *rest = await claim(*args, **kwargs)
+            return [start, [(b"1-1", None), *entries], *rest]  # an entry deleted while pending
+
+        client.xreadgroup, client.xautoclaim = flaky_read, claim_with_deleted
+        service.receive_packets = flaky_receive
+        consumer.start()
+        for _ in range(200):
+            pending = await client.xpending("breath:packets", "breath-service")
+            if consumer.received >= 5 and pending["pending"] == 0:
+                break
+            await asyncio.sleep(0.01)
+        await consumer.aclose()
+
+        assert not any(failures.values())
+        assert consumer.received >= 5  # the failed batch was reclaimed and ingested
+        assert service.brain.cache["temp"] == 4.0
+        assert (await client.xpending("breath:packets", "breath-service"))["pending"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.breath_service import BreathService
+from ai.breath_trace import (
+    TraceRecorder,
+    read_trace,
+    replay,
+    simulate_fleet,
+    sweep,
+    write_trace,
+)
+from ai.divine_climate_brain import SensorPacket
+
+
+def test_recorder_round_trip_and_truncated_tail(tmp_path):
+    path = tmp_path / "live.brt"
+    service = BreathService(recorder=TraceRecorder(path, chunk_packets=2))
+    service.receive_breath({"temp": 21.0, "humidity": 0.4})
+    service.receive_packets([SensorPacket(data={"temp": 22.0}, timestamp=5.0, zone="den")])
+    service.receive_breath({"temp": 23.0})
+    service.recorder.close()
+
+    rows = [row for batch in read_trace(path) for row in batch.rows()]
+    assert [r[2]["temp"] for r in rows] == [21.0, 22.0, 23.0]
+    assert rows[1][:2] == (5.0, "den")
+    assert rows[0][0] is not None  # live packets are stamped on arrival
+
+    with path.open("ab") as fh:
+        fh.write(b"\xff\x00\x00\x00BRB1")  # a chunk cut short by a crash
+    assert sum(len(b) for b in read_trace(path)) == 3
+
+
+def test_simulated_fleet_is_deterministic_and_plausible():
+    fleet = simulate_fleet(50, duration=20, zones=5, seed=3)
+    again = simulate_fleet(50, duration=20, zones=5, seed=3)
+    assert np.array_equal(fleet.records, again.records)
+    assert 0.95 * 1000 < len(fleet) <= 1000  # a few dropouts
+    assert np.all(np.diff(fleet.column("ts")) >= 0)
+    assert 15 < fleet.column("temp").mean() < 27
+    assert np.all((fleet.column("humidity") > 0) & (fleet.column("humidity") < 1))
+    assert set(fleet.zones) == {f"zone-{z}" for z in range(5)}
+
+
+def test_replay_reports_latency_and_saturation(tmp_path):
+    path = tmp_path / "fleet.brt"
+    write_trace(path, [{"temp": 20.0 + i % 3, "ts": i * 0.1} for i in range(20)])
+    batches = list(read_trace(path))
+
+    timed = replay(BreathService(), batches, speed=10)
+    assert timed.packets == 20
+    assert timed.seconds >= 0.18  # 1.9 s of trace at 10x
+    assert timed.offered_per_sec is not None and not timed.saturated
+
+    flat_out = replay(BreathService(), batches, speed=None, process_every=5)
+    assert flat_out.saturated and flat_out.achieved_per_sec > 0
+    assert 0 <= flat_out.p50_ms <= flat_out.p99_ms <= flat_out.max_ms
+
+    result = sweep(BreathService, batches, speeds=(10, None))
+    assert len(result["runs"]) == 2
+    assert result["saturation_per_sec"] == result["runs"][-1]["achieved_per_sec"]
@@ -61,3 +61,270 @@ def test_google_backend_refresh(monkeypatch, tmp_path):
     assert services[0].calls == 1
     assert services[1].calls == 1
     assert backend._creds.refresh_count == 1
+
+
+def test_google_add_events_retries_batch_transport_errors(monkeypatch, tmp_path):
+    creds_file = tmp_path / "creds.json"
+    creds_file.write_text("{}")
+    executed = []
+
+    class DummyBatch:
+        def __init__(self, callback):
+            self.callback = callback
+            self.ids = []
+
+        def add(self, request, request_id):
+            self.ids.append(request_id)
+
+        def execute(self):
+            executed.append(len(self.ids))
+            if len(executed) == 1:
+                self.callback(self.ids[0], {}, None)  # answered before the socket dropped
+                raise ConnectionResetError("connection reset by peer")
+            for request_id in self.ids:
+                self.callback(request_id, {}, None)
+
+    class DummyService:
+        def events(self):
+            return self
+
+        def insert(self, calendarId, body):
+            return body
+
+        def new_batch_http_request(self, callback):
+            return DummyBatch(callback)
+
+    import google.oauth2.service_account as sa
+    import googleapiclient.discovery as discovery
+
+    monkeypatch.setattr(sa.Credentials, "from_service_account_file", lambda *a, **k: object())
+    monkeypatch.setattr(discovery, "build", lambda *args, **kwargs: DummyService())
+
+    backend = cb.GoogleCalendarBackend(creds_file, "cal")
+    monkeypatch.setattr(cb.time, "sleep", lambda seconds: None)
+    events = [Event(name=f"Event {i}", begin=datetime(2030, 1, 1, 9)) for i in range(3)]
+    results = backend.add_events(events)
+
+    assert all(r.ok for r in results)
+    assert executed == [3, 2]  # only the unanswered entries are resent
+
+
+def test_ics_journal_mode(tmp_path):
+    path = tmp_path / "schedule.ics"
+    backend = cb.ICSCalendarBackend(path, journal=True, fsync_every=2)
+    names = [f"Ritual {i}" for i in range(5)]
+    for i, name in enumerate(names):
+        backend.add_event(Event(name=name, begin=datetime(2030, 1, i + 1, 9)))
+    backend.close()
+    assert not path.exists()
+    assert backend.journal_path.read_text().count("BEGIN:VEVENT") == 5
+
+    reopened = cb.ICSCalendarBackend(path, journal=True)
+    assert reopened._calendar is None  # nothing parsed until first read
+    assert sorted(e.name for e in reopened.calendar.events) == names
+
+    reopened.compact()
+    assert not reopened.journal_path.exists()
+    assert sorted(e.name for e in cb.ICSCalendarBackend(path).calendar.events) == names
+
+
+def test_ics_journal_recovers_from_torn_append(tmp_path):
+    path = tmp_path / "schedule.ics"
+    backend = cb.ICSCalendarBackend(path, journal=True)
+    backend.add_event(Event(name="Dawn", begin=datetime(2030, 1, 1, 9)))
+    backend.close()
+    with backend.journal_path.open("a") as fh:
+        fh.write("BEGIN:VEVENT\r\nDTSTART:2030010")  # crash mid-append
+
+    fresh = cb.ICSCalendarBackend(path, journal=True, compact_every=3)
+    fresh.add_event(Event(name="Dusk", begin=datetime(2030, 1, 2, 9)))
+    assert fresh._journaled == 2  # counted from the file, not just this process
+    fresh.close()
+    reopened = cb.ICSCalendarBackend(path, journal=True)
+    assert sorted(e.name for e in reopened.calendar.events) == ["Dawn", "Dusk"]
+    window = reopened.events_between(datetime(2030, 1, 1), datetime(2030, 1, 3))
+    assert [e.name for e in window] == ["Dawn", "Dusk"]
+
+
+def test_graph_add_events_batches(monkeypatch):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import msal
+
+    class DummyApp:
+        def __init__(self, *args, **kwargs):
+            self.acquired = 0
+
+        def acquire_token_silent(self, scopes, account=None):
+            return None
+
+        def acquire_token_for_client(self, scopes):
+            self.acquired += 1
+            return {"access_token": "token", "expires_in": 3600}
+
+    batches = []
+    throttled = set()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            batches.append(len(payload["requests"]))
+            responses = []
+            for req in payload["requests"]:
+                # throttle the first attempt of event 7 to exercise per-entry retry
+                if req["id"] == "7" and "7" not in throttled:
+                    throttled.add("7")
+                    past = "Wed, 21 Oct 2015 07:28:00 GMT"  # Retry-After may be an HTTP-date
+                    responses.append({"id": "7", "status": 429, "headers": {"Retry-After": past}})
+                elif req["id"] == "12" and "12" not in throttled:
+                    throttled.add("12")  # a reply missing from the batch is retried too
+                else:
+                    responses.append({"id": req["id"], "status": 201, "body": {}})
+            body = json.dumps({"responses": responses}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", DummyApp)
+    try:
+        backend = cb.MicrosoftGraphBackend(
+            "tenant", "client", "secret", graph_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        events = [Event(name=f"Event {i}", begin=datetime(2030, 1, 1, 9)) for i in range(45)]
+        results = backend.add_events(events)
+    finally:
+        server.shutdown()
+
+    assert [r.event for r in results] == events
+    assert all(r.ok for r in results)
+    assert batches == [20, 20, 5, 2]
+    assert backend._app.acquired == 1
+
+
+def test_graph_add_events_recovers_from_bad_batch_replies(monkeypatch):
+    import json
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    import msal
+
+    class DummyApp:
+        def __init__(self, *args, **kwargs):
+            self.acquired = 0
+
+        def acquire_token_silent(self, scopes, account=None):
+            return None
+
+        def acquire_token_for_client(self, scopes):
+            self.acquired += 1
+            return {"access_token": f"token-{self.acquired}", "expires_in": 3600}
+
+    tokens = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            tokens.append(self.headers["Authorization"])
+            if len(tokens) == 1:
+                reply = {"error": "not a batch response"}  # 2xx without "responses"
+            elif len(tokens) == 2:  # the token expires between entries of one batch
+                reply = {"responses": [{"id": r["id"], "status": 401} for r in payload["requests"]]}
+            else:
+                reply = {"responses": [{"id": r["id"], "status": 201} for r in payload["requests"]]}
+            body = json.dumps(reply).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(msal, "ConfidentialClientApplication", DummyApp)
+    monkeypatch.setattr(cb.time, "sleep", lambda seconds: None)
+    try:
+        backend = cb.MicrosoftGraphBackend(
+            "tenant", "client", "secret", graph_url=f"http://127.0.0.1:{server.server_port}"
+        )
+        events = [Event(name=f"Event {i}", begin=datetime(2030, 1, 1, 9)) for i in range(3)]
+        results = backend.add_events(events)
+    finally:
+        server.shutdown()
+
+    assert all(r.ok for r in results)
+    assert tokens == ["Bearer token-1", "Bearer token-1", "Bearer token-2"]
+
+
+def test_ics_range_queries(tmp_path):
+    from datetime import timedelta, timezone
+
+    path = tmp_path / "schedule.ics"
+    backend = cb.ICSCalendarBackend(path, journal=True)
+    day = datetime(2030, 1, 1, tzinfo=timezone.utc)
+    backend.add_events(
+        [
+            Event(name="Dawn", begin=day + timedelta(hours=6), duration=timedelta(hours=1)),
+            Event(name="Council", begin=day + timedelta(hours=9), duration=timedelta(hours=2)),
+            Event(name="Review", begin=day + timedelta(hours=10), duration=timedelta(hours=2)),
+            Event(name="Dusk", begin=day + timedelta(hours=18), duration=timedelta(hours=1)),
+        ]
+    )
+    backend.compact()
+    backend.add_event(Event(name="Late", begin=day + timedelta(hours=22)))
+    backend.close()
+
+    for _ in range(2):  # second pass reuses the sidecar written by the first
+        fresh = cb.ICSCalendarBackend(path, journal=True)
+        window = fresh.events_between(day + timedelta(hours=8), day + timedelta(hours=19))
+        assert [e.name for e in window] == ["Council", "Review", "Dusk"]
+        assert fresh._calendar is None  # answered without parsing the whole calendar
+        assert fresh.index_path.exists()
+
+    busy = fresh.free_busy(day, day + timedelta(hours=12))
+    assert busy == [
+        (day + timedelta(hours=6), day + timedelta(hours=7)),
+        (day + timedelta(hours=9), day + timedelta(hours=12)),
+    ]
+    probe = Event(name="Probe", begin=day + timedelta(hours=10, minutes=30))
+    assert sorted(e.name for e in fresh.conflicts_with(probe)) == ["Council", "Review"]
+    late = fresh.events_between(day + timedelta(hours=22), day + timedelta(days=1))
+    assert [e.name for e in late] == ["Late"]
+
+
+def test_interval_index_matches_brute_force_with_long_events():
+    import random
+
+    from ai.interval_index import IntervalIndex
+
+    rng = random.Random(7)
+    index = IntervalIndex(block_size=8)  # small blocks exercise splitting
+    spans = []
+    for i in range(2000):
+        start = rng.uniform(0, 1e6)
+        length = rng.choice([0.0, rng.uniform(0, 7200), rng.uniform(0, 3e7)])
+        index.add(start, start + length, i)
+        spans.append((start, start + length, i))
+    assert len(index) == 2000
+    assert index._max_span <= index.long_span  # long events do not stretch the look-back
+
+    for _ in range(200):
+        lo = rng.uniform(-1e5, 1.1e6)
+        hi = lo if rng.random() < 0.2 else lo + rng.uniform(0, 5e4)
+        expected = sorted(
+            (s, e, i)
+            for s, e, i in spans
+            if (s <= hi if lo == hi else s < hi) and (e > lo or (s == e and s >= lo))
+        )
+        assert index.overlapping(lo, hi) == expected
@@ -0,0 +1,154 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.divine_climate_brain import ClimateBrain, SensorPacket
+
+
+def test_multi_zone_prediction():
+    brain = ClimateBrain()
+    for i in range(100):
+        brain.ingest_sensor_data(SensorPacket(data={"temp": 15.0 + i}, zone=f"zone-{i}"))
+    brain.zones.update_many(["zone-3", "zone-200"], "temp", [30.0, 12.0])
+
+    directives = brain.predict_zones()
+    assert len(directives) == 101
+    assert list(directives["zone"][:2]) == ["zone-0", "zone-1"]
+    assert directives["zone"][-1] == "zone-200"
+    assert brain.zones.column("temp")[3] == 30.0
+    assert np.all(directives["temperature_delta"] == 0.0)
+    # zone packets do not disturb the implicit single-zone cache
+    assert brain.cache == {}
+
+
+def test_sensor_batch_ingest_is_zero_copy():
+    from ai.sensor_batch import SensorBatch
+
+    packets = [{"temp": 20.0 + i, "ts": 100.0 + i} for i in range(5)]
+    packets += [{"temp": 30.0, "humidity": 40.0, "zone": "attic"}, {"humidity": 55.0}]
+    wire = bytearray(SensorBatch.from_packets(packets).tobytes())
+    batch = SensorBatch.from_buffer(wire)
+    assert np.shares_memory(batch.records, np.frombuffer(wire, dtype="u1"))
+    assert batch.column("temp")[0] == 20.0
+
+    brain = ClimateBrain()
+    assert brain.ingest_many(batch) == 7
+    _, temps = brain.history.channel("temp").window(1e9, now=200.0)
+    assert list(temps) == [20.0, 21.0, 22.0, 23.0, 24.0]
+    assert brain.cache == {"temp": 24.0, "humidity": 55.0}
+    slot = brain.zones.slots["attic"]
+    assert brain.zones.column("humidity")[slot] == 40.0
+    rows = list(batch.rows())
+    assert rows[5] == (None, "attic", {"temp": 30.0, "humidity": 40.0})
+
+    try:
+        SensorBatch.from_buffer(wire[:-3])
+    except ValueError as exc:
+        assert "truncated" in str(exc)
+    else:
+        raise AssertionError("truncated batch accepted")
+
+
+def test_streaming_detector_flags_outliers_stuck_sensors_and_drift():
+    from ai.anomaly_detector import AnomalyDetector, P2Quantile
+
+    rng = np.random.default_rng(7)
+    sketch = P2Quantile(0.5)
+    samples = rng.normal(20.0, 1.0, 5000)
+    for x in samples:
+        sketch.add(float(x))
+    assert abs(sketch.value - np.median(samples)) < 0.1
+
+    brain = ClimateBrain(detector=AnomalyDetector(stuck_after=20))
+    for i, x in enumerate(samples[:200]):
+        brain.ingest_sensor_data(SensorPacket(data={"temp": float(x)}, timestamp=float(i)))
+    stats = brain.detector.channel("temp")
+    assert stats.n == 200 and abs(stats.mean - samples[:200].mean()) < 1e-9
+    assert abs(stats.std - samples[:200].std(ddof=1)) < 1e-9
+    assert brain.detector.drain() == []
+
+    brain.ingest_sensor_data(SensorPacket(data={"temp": 45.0}, timestamp=200.0))
+    for i in range(25):
+        brain.ingest_sensor_data(SensorPacket(data={"temp": 19.5}, timestamp=201.0 + i))
+    kinds = [(a.kind, a.value) for a in brain.detector.drain()]
+    assert kinds[0] == ("outlier", 45.0)
+    assert ("stuck", 19.5) in kinds
+
+
+def test_batch_detector_matches_streaming_moments():
+    from ai.anomaly_detector import AnomalyDetector
+    from ai.sensor_batch import SensorBatch
+
+    values = np.r_[np.random.default_rng(1).normal(50.0, 2.0, 300), [90.0], [48.0] * 70]
+    packets = [{"humidity": float(v), "ts": float(i)} for i, v in enumerate(values)]
+    packets += [
+        {"humidity": float(v), "zone": "attic", "ts": 400.0 + i} for i, v in enumerate(values[:100])
+    ]
+    streamed = ClimateBrain(detector=AnomalyDetector())
+    for p in packets:
+        packet = SensorPacket({"humidity": p["humidity"]}, p["ts"], p.get("zone"))
+        streamed.ingest_sensor_data(packet)
+
+    bulk = ClimateBrain(detector=AnomalyDetector())
+    half = len(values) // 2
+    bulk.ingest_many(SensorBatch.from_packets(packets[:half]))
+    bulk.ingest_many(SensorBatch.from_packets(packets[half:]))
+    for key in (("humidity", None), ("humidity", "attic")):
+        a, b = streamed.detector.channel(*key), bulk.detector.channel(*key)
+        assert a.n == b.n and abs(a.mean - b.mean) < 1e-9 and abs(a.m2 - b.m2) < 1e-6
+        # outliers are clipped against pre-batch statistics, so the EWMA differs slightly
+        assert abs(a.ewma - b.ewma) < 0.01 and a.run == b.run
+    flagged = {(a.kind, a.value) for a in bulk.detector.drain()}
+    assert {("outlier", 90.0), ("stuck", 48.0)} <= flagged
+
+
+def test_detector_skips_non_finite_readings():
+    from ai.anomaly_detector import AnomalyDetector
+
+    detector = AnomalyDetector(min_samples=10)
+    values = np.r_[np.linspace(20.0, 21.0, 50), [np.nan, np.inf, -np.inf]]
+    for i, value in enumerate(values):
+        detector.observe("temp", float(value), float(i))
+    detector.observe_many("temp", np.arange(4.0), np.array([20.5, np.nan, np.inf, 20.6]))
+    stats = detector.channel("temp")
+    assert detector.skipped == 5 and stats.n == 52
+    assert all(np.isfinite([stats.mean, stats.m2, stats.ewma, stats.center, stats.scale]))
+
+
+def test_bulk_sketches_stay_within_budget_while_zones_warm_up():
+    from ai.anomaly_detector import MIN_SKETCHED, AnomalyDetector
+
+    detector = AnomalyDetector(sketch_sample=32)
+    zones = [f"z{i}" for i in range(100)]
+    index = np.arange(5000) % 100
+    values = 20.0 + np.random.default_rng(3).normal(0.0, 1.0, 5000)
+    batches = 0
+    while any(detector.channel("temp", z).sketched < MIN_SKETCHED for z in zones):
+        before = sum(detector.channel("temp", z).sketched for z in zones)
+        detector.observe_zones("temp", zones, index, np.arange(5000.0), values)
+        assert sum(detector.channel("temp", z).sketched for z in zones) - before <= 32
+        batches += 1
+    # the rotation spreads the budget evenly, so every zone warms in the same pass
+    assert batches <= MIN_SKETCHED * len(zones) // 32 + 1
+
+
+def test_breath_service_escalates_anomalies_before_predicting():
+    from ai.anomaly_detector import AnomalyDetector
+    from ai.breath_service import BreathService
+
+    service = BreathService(detector=AnomalyDetector())
+    sent = []
+    service.dispatcher.dispatch = lambda payload, topic=None, priority="routine": sent.append(
+        (topic, priority, payload)
+    )
+    for i in range(120):
+        service.receive_breath({"temp": 21.0 + 0.1 * (i % 5)})
+    service.receive_breath({"temp": 80.0})
+    service.process()
+    (topic, priority, payload), routine = sent
+    assert priority == "emergency" and topic.endswith("/anomaly")
+    assert payload["anomaly"] == "outlier" and payload["value"] == 80.0
+    assert routine[1] == "routine"
@@ -0,0 +1,131 @@
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+sys.path.append(str(Path(__file__).resolve().parents[1] / "benchmarks"))
+
+from ai.actuator_dispatcher import ActuatorDispatcher
+from ai.command_journal import CommandJournal
+from fake_mqtt_broker import FakeMQTTBroker
+
+
+def test_journal_survives_restart_and_compacts(tmp_path):
+    journal = CommandJournal(tmp_path, segment_bytes=4096)
+    for i in range(300):
+        journal.append(f"zone/{i % 3}", json.dumps({"v": i}).encode())
+    journal.close()
+
+    reopened = CommandJournal(tmp_path, segment_bytes=4096)
+    assert len(reopened) == 300
+    segments, commands = reopened.take()
+    assert len(segments) > 1
+    assert [(c.topic, json.loads(c.payload)["v"]) for c in commands] == [
+        ("zone/0", 297),
+        ("zone/1", 298),
+        ("zone/2", 299),
+    ]
+    reopened.release(segments)
+    assert len(reopened) == 0
+    reopened.close()
+    assert len(list(tmp_path.glob("*.seg"))) == 1  # just the fresh active segment
+
+
+def test_retention_compacts_then_drops(tmp_path):
+    journal = CommandJournal(tmp_path, segment_bytes=1024, max_bytes=2048, fsync_interval=0)
+    for i in range(500):
+        journal.append(f"zone/{i}", b"{}", timestamp=0.0 if i < 10 else None)
+    assert journal.dropped > 0
+    journal.max_age = 60
+    _, commands = journal.take()
+    assert commands and all(c.timestamp > 0 for c in commands)
+    journal.close()
+
+
+def test_dispatcher_replays_offline_directives_in_order(tmp_path):
+    broker = FakeMQTTBroker()  # not serving yet: the link is down
+    journal = CommandJournal(tmp_path)
+    dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, journal=journal)
+    try:
+        start = time.perf_counter()
+        for i in range(1000):
+            dispatcher.dispatch({"v": i}, topic=f"zone/{i % 4}")
+        per_call = (time.perf_counter() - start) / 1000
+        assert len(journal) == 1000
+        assert per_call < 1e-3
+
+        broker.start()
+        assert dispatcher.flush(timeout=5)
+        dispatcher.dispatch({"v": "live"}, topic="zone/0")
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.close()
+        broker.close()
+
+    received = [(t, json.loads(p)["v"]) for t, p, _ in broker.messages]
+    assert received == [
+        ("zone/0", 996),
+        ("zone/1", 997),
+        ("zone/2", 998),
+        ("zone/3", 999),
+        ("zone/0", "live"),
+    ]
+    assert len(list(tmp_path.glob("*.seg"))) == 1
+
+
+def test_replayed_segments_released_only_after_acknowledgement(tmp_path):
+    broker = FakeMQTTBroker()
+    journal = CommandJournal(tmp_path, segment_bytes=4096)
+    dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, journal=journal)
+    inflight_at_release = []
+    release = journal.release
+
+    def checked_release(segments):
+        inflight_at_release.append(dispatcher._inflight)
+        release(segments)
+
+    journal.release = checked_release
+    try:
+        for i in range(200):
+            dispatcher.dispatch({"v": i}, topic=f"zone/{i}")
+        broker.start()
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.close()
+        broker.close()
+
+    assert len(broker.messages) == 200
+    assert inflight_at_release and set(inflight_at_release) == {0}
+
+
+def test_replay_sends_emergencies_first_and_drops_expired(tmp_path):
+    broker = FakeMQTTBroker()
+    journal = CommandJournal(tmp_path)
+    dispatcher = ActuatorDispatcher.connect("127.0.0.1", broker.port, journal=journal)
+    try:
+        for i in range(200):
+            dispatcher.dispatch({"v": i}, topic=f"zone/{i}", deadline=0.01)
+        dispatcher.dispatch({"v": "hold"}, topic="zone/7", priority="high")
+        dispatcher.dispatch({"v": "isolate"}, topic="zone/0", priority="emergency")
+        time.sleep(0.05)  # the routine deadlines pass during the outage
+        broker.start()
+        assert dispatcher.flush(timeout=5)
+    finally:
+        dispatcher.close()
+        broker.close()
+
+    received = [(t, json.loads(p)["v"]) for t, p, _ in broker.messages]
+    assert received == [("zone/0", "isolate"), ("zone/7", "hold")]
+    assert dispatcher.expired == 200
+
+
+def test_journal_persists_priority_and_deadline(tmp_path):
+    journal = CommandJournal(tmp_path, fsync_interval=0)
+    journal.append("zone/0", b"{}", priority="emergency", deadline=123.5)
+    journal.append("zone/1", b"{}")
+    journal.close()
+
+    _, commands = CommandJournal(tmp_path, fsync_interval=0).take()
+    assert [(c.priority, c.deadline) for c in commands] == [("emergency", 123.5), ("routine", None)]
+    assert commands[0].expired() and not commands[1].expired()
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import fakeredis.aioredis
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from config_store import RedisConfigStore
+
+
+def test_updates_propagate_between_workers():
+    server = fakeredis.FakeServer()
+
+    async def scenario():
+        a = RedisConfigStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        b = RedisConfigStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        assert await a.bootstrap({"greeting": "hi"}) == (1, {"greeting": "hi"})
+        # a second worker adopts the already seeded config instead of its own default
+        assert await b.bootstrap({"greeting": "other"}) == (1, {"greeting": "hi"})
+
+        received = asyncio.Queue()
+        b.start(lambda version, data: received.put_nowait((version, data)))
+        await asyncio.sleep(0.05)  # let the subscription settle
+        assert await a.publish({"greeting": "blessed"}) == 2
+        assert await asyncio.wait_for(received.get(), 1) == (2, {"greeting": "blessed"})
+        await b.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_publish_does_not_roll_back_a_newer_version():
+    server = fakeredis.FakeServer()
+
+    async def scenario():
+        a = RedisConfigStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        b = RedisConfigStore(fakeredis.aioredis.FakeRedis(server=server, decode_responses=True))
+        await a.bootstrap({"greeting": "hi"})
+        applied = []
+        script = a._publish
+
+        async def racing_publish(**kwargs):
+            version = await script(**kwargs)
+            # another worker publishes and a's listener applies it before publish returns
+            newer = await b.publish({"greeting": "newer"})
+            await a._apply(newer, {"greeting": "newer"}, lambda *args: applied.append(args))
+            return version
+
+        a._publish = racing_publish
+        assert await a.publish({"greeting": "stale"}, lambda *args: applied.append(args)) == 2
+        assert applied == [(3, {"greeting": "newer"})]
+        assert a.version == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,56 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[1]
+# slow CI runners can scale every budget, e.g. IMPORT_BUDGET_SCALE=2
+SCALE = float(os.getenv("IMPORT_BUDGET_SCALE", "1"))
+
+# module: (directory it is imported from, budget in seconds, modules it must not load)
+ENTRY_POINTS = {
+    "overlay_server": ("src", 1.5, ("ics", "numpy", "dateparser", "ai.breath_service")),
+    "ai.calendar_backends": ("src", 0.25, ("ics", "dateparser")),
+    "ai.terra_voice_agent": ("src", 0.3, ("ics", "dateparser")),
+    "ai.breath_service": ("src", 0.5, ("ics", "redis", "paho")),
+}
+
+
+def _import(module, cwd, env=None):
+    """Import ``module`` in a fresh interpreter; return (cumulative seconds, loaded modules)."""
+    code = f"import sys, json, {module}; print(json.dumps(sorted(sys.modules)))"
+    cmd = [sys.executable, "-X", "importtime", "-c", code]
+    proc = subprocess.run(cmd, cwd=cwd, env=env, capture_output=True, text=True, check=True)
+    cumulative = None
+    for line in proc.stderr.splitlines():
+        if line.startswith("import time:"):
+            _, cum, name = line.split("|")
+            if name.strip() == module:
+                cumulative = int(cum) / 1e6
+    return cumulative, set(json.loads(proc.stdout))
+
+
+@pytest.mark.parametrize("module", sorted(ENTRY_POINTS))
+def test_import_budget(module, tmp_path):
+    directory, budget, forbidden = ENTRY_POINTS[module]
+    env = {**os.environ, "OVERLAY_CONFIG_PATH": str(tmp_path / "overlay.json")}
+    _import(module, ROOT / directory, env)  # first run writes bytecode caches
+    seconds, loaded = _import(module, ROOT / directory, env)
+    assert not loaded & set(forbidden), f"{module} eagerly imports {loaded & set(forbidden)}"
+    assert seconds is not None and seconds <= budget * SCALE, f"{module}: {seconds:.3f}s"
+
+
+def test_overlay_import_has_no_side_effects(tmp_path):
+    config_path = tmp_path / "overlay.json"
+    code = (
+        "import signal\n"
+        "before = signal.getsignal(signal.SIGTERM)\n"
+        "import overlay_server\n"
+        "assert signal.getsignal(signal.SIGTERM) == before\n"
+    )
+    env = {**os.environ, "OVERLAY_CONFIG_PATH": str(config_path)}
+    subprocess.run([sys.executable, "-c", code], cwd=ROOT / "src", env=env, check=True)
+    assert not config_path.exists()
@@ -0,0 +1,53 @@
+import logging
+import sys
+import threading
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.instrumentation import Counter, LatencyHistogram, LogSampler, Registry
+
+
+def test_counter_is_exact_across_threads():
+    counter = Counter()
+
+    def work():
+        for _ in range(10_000):
+            counter.inc()
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert counter.value == 80_000
+
+
+def test_sampled_timer_and_render():
+    registry = Registry()
+    hist = registry.histogram("work_seconds", "Work", bounds=(0.5,), sample_every=4, kind="a")
+    for _ in range(8):
+        with hist.time():
+            pass
+    assert hist.count == 2  # one call in four reads the clock
+    registry.counter("jobs_total", "Jobs", result="ok").inc(3)
+    assert registry.counter("jobs_total", "Jobs", result="ok").value == 3
+
+    lines = registry.render().splitlines()
+    assert "# TYPE jobs_total counter" in lines
+    assert 'jobs_total{result="ok"} 3' in lines
+    assert 'work_seconds_bucket{kind="a",le="0.5"} 2' in lines
+    assert 'work_seconds_bucket{kind="a",le="+Inf"} 2' in lines
+    assert 'work_seconds_count{kind="a"} 2' in lines
+
+    shared = LatencyHistogram()
+    assert registry.register("shared_seconds", "Shared", shared) is shared
+
+
+def test_log_sampler_is_opt_in():
+    logger = logging.getLogger("test_instrumentation.sampler")
+    logger.setLevel(logging.INFO)
+    sampler = LogSampler(logger, every=3)
+    assert not any(sampler() for _ in range(10))
+    logger.setLevel(logging.DEBUG)
+    assert [sampler() for _ in range(6)] == [False, False, True, False, False, True]
@@ -0,0 +1,67 @@
+import sys
+import threading
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai import warmth_predictor
+from ai.breath_service import BreathService
+from ai.model_runtime import ModelRegistry, ModelRuntime
+
+
+def _linear(weight: float, bias: float = 0.0):
+    return [(np.array([[weight]]), np.array([bias]))]
+
+
+def test_registry_memory_maps_weights(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    rng = np.random.default_rng(0)
+    layers = [(rng.normal(size=(1, 8)), rng.normal(size=8)), (rng.normal(size=(8, 1)), np.zeros(1))]
+    registry.save("warmth", "0001", layers, activation="tanh", input_mean=20.0, input_scale=5.0)
+
+    model = registry.load("warmth")
+    assert model.version == "0001"
+    assert isinstance(model.layers[0][0], np.memmap)
+
+    x = np.linspace(10, 30, 32)
+    expected = np.tanh((x[:, None] - 20.0) / 5.0 @ layers[0][0] + layers[0][1]) @ layers[1][0]
+    assert np.allclose(model.predict(x), expected[:, 0])
+
+
+def test_hot_swap_during_predictions(tmp_path):
+    registry = ModelRegistry(tmp_path)
+    registry.save("warmth", "0001", _linear(0.0, 1.0))
+    runtime = ModelRuntime(registry=registry)
+    runtime.load()
+
+    seen = set()
+    stop = threading.Event()
+
+    def worker():
+        while not stop.is_set():
+            seen.add(float(runtime.predict(np.ones((4, 1)))[0]))
+
+    thread = threading.Thread(target=worker)
+    thread.start()
+    registry.save("warmth", "0002", _linear(0.0, 2.0))
+    assert runtime.reload()
+    assert not runtime.reload()
+    stop.set()
+    thread.join()
+
+    assert runtime.version == "0002"
+    assert seen <= {1.0, 2.0}
+    assert runtime.latency.snapshot()["count"] == runtime.latency.count > 0
+
+
+def test_breath_service_loads_warmth_model(tmp_path, monkeypatch):
+    monkeypatch.setattr(warmth_predictor, "runtime", ModelRuntime())
+    ModelRegistry(tmp_path).save("warmth", "0001", _linear(-0.5, 10.0))
+
+    service = BreathService(model_dir=tmp_path)
+    service.receive_breath({"temp": 24.0})
+    assert service.brain.predict()["temperature_delta"] == -2.0
+    # warmup ran before the first real prediction was recorded
+    assert warmth_predictor.runtime.latency.count == 1
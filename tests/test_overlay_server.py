@@ -1,9 +1,11 @@
 import asyncio
 import json
+import math
 import sys
 from pathlib import Path
 
 import fakeredis.aioredis
+import pytest
 from fastapi.testclient import TestClient
 
 sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
@@ -30,6 +32,49 @@ def test_rate_limiting(tmp_path, monkeypatch):
         assert client.get("/overlay").status_code == 429
 
 
+@pytest.mark.parametrize(
+    "strategy", ["fixed_window", "sliding_window", "sliding_log", "token_bucket"]
+)
+def test_rate_limit_strategies(tmp_path, monkeypatch, strategy):
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        client.post("/config", json={"rate_limit_per_minute": 2, "rate_limit_strategy": strategy})
+        asyncio.run(redis_client.flushdb())
+        first = client.get("/overlay")
+        assert first.status_code == 200
+        assert first.headers["X-RateLimit-Limit"] == "2"
+        assert first.headers["X-RateLimit-Remaining"] == "1"
+        assert client.get("/overlay").status_code == 200
+        blocked = client.get("/overlay")
+        assert blocked.status_code == 429
+        assert blocked.headers["X-RateLimit-Remaining"] == "0"
+        assert 1 <= int(blocked.headers["Retry-After"]) <= 60
+
+
+def test_overlay_etag(tmp_path, monkeypatch):
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        client.post("/config", json={"rate_limit_per_minute": 1})
+        asyncio.run(redis_client.flushdb())
+        first = client.get("/overlay")
+        assert first.json() == {"message": "Ness overlay online"}
+        etag = first.headers["ETag"]
+        # conditional polls are answered before the limiter, so they are never throttled
+        for _ in range(3):
+            cached = client.get("/overlay", headers={"If-None-Match": etag})
+            assert cached.status_code == 304
+            assert cached.headers["ETag"] == etag
+        assert client.get("/overlay").status_code == 429
+        asyncio.run(redis_client.flushdb())
+        client.post("/config", json={"greeting": "Renewed"})
+        asyncio.run(redis_client.flushdb())
+        fresh = client.get("/overlay", headers={"If-None-Match": etag})
+        assert fresh.status_code == 200
+        assert fresh.headers["ETag"] != etag
+
+
 def test_config_persistence(tmp_path, monkeypatch):
     redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
     srv = _import_server(tmp_path, monkeypatch, redis_client)
@@ -40,6 +85,48 @@ def test_config_persistence(tmp_path, monkeypatch):
     assert data["greeting"] == "Blessed"
 
 
+def test_redis_config_backend(tmp_path, monkeypatch):
+    monkeypatch.setenv("OVERLAY_CONFIG_BACKEND", "redis")
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        client.post("/config", json={"greeting": "Shared"})
+        stored = asyncio.run(redis_client.hgetall("overlay:config"))
+        assert stored["version"] == "2"
+        assert json.loads(stored["data"])["greeting"] == "Shared"
+        assert srv.config_version == 2
+
+
+def test_calendar_export_streams(tmp_path, monkeypatch):
+    from datetime import datetime, timezone
+
+    from ics import Event
+
+    from ai.calendar_backends import ICSCalendarBackend
+
+    calendar_path = tmp_path / "schedule.ics"
+    monkeypatch.setenv("OVERLAY_CALENDAR_PATH", str(calendar_path))
+    backend = ICSCalendarBackend(calendar_path, journal=True)
+    for day in (1, 2, 3):
+        begin = datetime(2030, 1, day, tzinfo=timezone.utc)
+        backend.add_event(Event(name=f"Rite {day}", begin=begin))
+    backend.close()
+
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        full = client.get("/calendar.ics")
+        assert full.headers["content-type"].startswith("text/calendar")
+        assert full.text.startswith("BEGIN:VCALENDAR") and full.text.endswith("END:VCALENDAR")
+        assert [line for line in full.text.splitlines() if line.startswith("SUMMARY")] == [
+            "SUMMARY:Rite 1",
+            "SUMMARY:Rite 2",
+            "SUMMARY:Rite 3",
+        ]
+        ranged = client.get("/calendar.ics", params={"start": "2030-01-02T00:00:00Z"})
+        assert "Rite 1" not in ranged.text and "Rite 3" in ranged.text
+
+
 def test_create_redis_cluster(tmp_path, monkeypatch):
     monkeypatch.setenv("REDIS_CLUSTER_NODES", "a:1,b:2")
     if "overlay_server" in sys.modules:
@@ -54,7 +141,7 @@ def test_create_redis_cluster(tmp_path, monkeypatch):
             called["url"] = url
             return fakeredis.aioredis.FakeRedis(decode_responses=True)
 
-    monkeypatch.setattr(overlay_server, "RedisCluster", DummyCluster)
+    monkeypatch.setattr("redis.asyncio.cluster.RedisCluster", DummyCluster)
     client = overlay_server.create_redis_client()
     assert called["url"] == "redis://a:1,b:2"
 
@@ -74,6 +161,111 @@ def test_create_redis_sentinel(tmp_path, monkeypatch):
             assert service == "svc"
             return fakeredis.aioredis.FakeRedis(decode_responses=True)
 
-    monkeypatch.setattr(overlay_server, "Sentinel", DummySentinel)
+    monkeypatch.setattr("redis.asyncio.sentinel.Sentinel", DummySentinel)
     client = overlay_server.create_redis_client()
     assert isinstance(client, fakeredis.aioredis.FakeRedis)
+
+
+def test_breath_batch_ingestion(tmp_path, monkeypatch):
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    _, codec = srv._breath_stack()
+
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        client.post("/config", json={"breath_packets_per_minute": 2500})
+        asyncio.run(redis_client.flushdb())
+        lines = "\n".join(
+            json.dumps({"temp": 20.0 + i % 3, "humidity": 0.4, "ts": 1000.0 + i})
+            for i in range(1000)
+        )
+        resp = client.post(
+            "/breath/batch", content=lines, headers={"content-type": "application/x-ndjson"}
+        )
+        assert resp.status_code == 200
+        assert resp.json() == {"accepted": 1000}
+        assert resp.headers["X-RateLimit-Remaining"] == "1500"
+
+        packets = [{"temp": 25.0, "ts": 2000.0 + i, "zone": f"z{i % 4}"} for i in range(1000)]
+        resp = client.post(
+            "/breath/batch",
+            content=codec.encode_binary(packets),
+            headers={"content-type": codec.BINARY_MEDIA_TYPE},
+        )
+        assert resp.json() == {"accepted": 1000}
+        brain = srv.breath_service.brain
+        assert len(brain.history.channel("temp")) == 1000
+        assert sorted(brain.zones.slots) == ["z0", "z1", "z2", "z3"]
+
+        # the remaining budget is 500 packets, so another thousand is refused whole
+        resp = client.post(
+            "/breath/batch", content=lines, headers={"content-type": "application/x-ndjson"}
+        )
+        assert resp.status_code == 429
+        bad = client.post(
+            "/breath/batch",
+            content='{"temp": 1}\n{"temp": "hot"}',
+            headers={"content-type": "application/x-ndjson"},
+        )
+        assert bad.status_code == 422 and "packet 1" in bad.json()["detail"]
+        assert client.post("/breath/batch", content=b"x").status_code == 415
+        for reading in ("NaN", "Infinity"):
+            resp = client.post(
+                "/breath/batch",
+                content='{"temp": %s}' % reading,
+                headers={"content-type": "application/x-ndjson"},
+            )
+            assert resp.status_code == 422 and reading in resp.json()["detail"]
+        # NaN marks an absent channel in the binary layout, but infinities are refused
+        for packets in ([{"temp": 21.0}, {"temp": math.inf}], [{"temp": 21.0, "ts": -math.inf}]):
+            resp = client.post(
+                "/breath/batch",
+                content=codec.encode_binary(packets),
+                headers={"content-type": codec.BINARY_MEDIA_TYPE},
+            )
+            assert resp.status_code == 422 and "must be finite" in resp.json()["detail"]
+        srv.config.breath_batch_max_bytes = 64
+        resp = client.post(
+            "/breath/batch", content=lines, headers={"content-type": "application/x-ndjson"}
+        )
+        assert resp.status_code == 413
+
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    service, _ = srv._breath_stack()
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        client.post("/config", json={"rate_limit_per_minute": 1})
+        asyncio.run(redis_client.flushdb())
+        client.get("/overlay")
+        assert client.get("/overlay").status_code == 429
+        service.receive_breath({"temp": 21.0})
+        # /metrics stays reachable while the client is throttled
+        resp = client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain; version=0.0.4")
+        body = resp.text
+        assert "# TYPE ness_http_requests_total counter" in body
+        rate_limited = next(
+            line
+            for line in body.splitlines()
+            if line.startswith('ness_http_requests_total{outcome="rate_limited"}')
+        )
+        assert float(rate_limited.split()[-1]) >= 1
+        assert "ness_packets_ingested_total " in body
+        assert 'ness_stage_seconds_bucket{stage="ingest",le="+Inf"}' in body
+
+
+def test_hybrid_tier_rejects_unsupported_strategy(tmp_path, monkeypatch):
+    redis_client = fakeredis.aioredis.FakeRedis(decode_responses=True)
+    srv = _import_server(tmp_path, monkeypatch, redis_client)
+    (tmp_path / "config.json").write_text(json.dumps({"rate_limit_tier": "hybrid"}))
+    with TestClient(srv.app, raise_server_exceptions=False) as client:
+        resp = client.post("/config", json={"rate_limit_strategy": "token_bucket"})
+        assert resp.status_code == 422 and "hybrid" in resp.json()["detail"]
+        assert srv.config.rate_limit_strategy == "fixed_window"
+
+    srv.config.rate_limit_strategy = "sliding_log"  # e.g. edited in the file by hand
+    with pytest.raises(ValueError, match="hybrid"):
+        with TestClient(srv.app):
+            pass
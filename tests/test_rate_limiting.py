@@ -0,0 +1,82 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import fakeredis.aioredis
+import redis.asyncio as redis
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from rate_limiting import CircuitBreaker, HybridRateLimiter
+
+
+def test_hybrid_limiter_shares_counts_across_workers():
+    server = fakeredis.FakeServer()
+
+    async def scenario():
+        a = HybridRateLimiter(fakeredis.aioredis.FakeRedis(server=server), error_budget=1.0)
+        b = HybridRateLimiter(fakeredis.aioredis.FakeRedis(server=server), error_budget=1.0)
+        for _ in range(3):
+            assert (await a.hit("1.2.3.4", 4)).allowed
+        await a.flush()
+        assert (await b.hit("1.2.3.4", 4)).allowed
+        await b.flush()
+        denied = await b.hit("1.2.3.4", 4)
+        assert not denied.allowed
+        assert "Retry-After" in denied.headers()
+        # a's stale view admits at most its error budget before the next sync
+        await a.hit("1.2.3.4", 4)
+        await a.flush()
+        assert not (await a.hit("1.2.3.4", 4)).allowed
+
+    asyncio.run(scenario())
+
+
+def test_hybrid_limiter_falls_back_to_local_when_redis_down():
+    class BrokenPipeline:
+        def incrby(self, *args):
+            pass
+
+        def pexpire(self, *args):
+            pass
+
+        async def execute(self):
+            raise redis.ConnectionError("unreachable")
+
+    class BrokenRedis:
+        def pipeline(self, transaction=True):
+            return BrokenPipeline()
+
+    async def scenario():
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+        limiter = HybridRateLimiter(BrokenRedis(), breaker=breaker)
+        assert (await limiter.hit("ip", 2)).allowed
+        await limiter.flush()
+        assert breaker.state == "open"
+        assert (await limiter.hit("ip", 2)).allowed
+        assert not (await limiter.hit("ip", 2)).allowed
+        await limiter.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_hybrid_limiter_flushes_deltas_of_rolled_over_windows(monkeypatch):
+    import rate_limiting
+
+    clock = [59.0]
+    monkeypatch.setattr(rate_limiting.time, "time", lambda: clock[0])
+
+    async def scenario():
+        client = fakeredis.aioredis.FakeRedis()
+        limiter = HybridRateLimiter(client, flush_max_requests=1000, error_budget=1.0)
+        for _ in range(3):
+            await limiter.hit("a", 100)
+            await limiter.hit("b", 100)
+        clock[0] = 61.0  # both windows roll over before any flush
+        await limiter.hit("a", 100)  # replaces a's old window in hit()
+        await limiter.flush()  # drops b's old window in flush()
+        assert int(await client.get(limiter.key("a", 0))) == 3
+        assert int(await client.get(limiter.key("b", 0))) == 3
+        assert int(await client.get(limiter.key("a", 1))) == 1
+
+    asyncio.run(scenario())
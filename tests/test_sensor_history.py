@@ -0,0 +1,49 @@
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / "src"))
+
+from ai.sensor_history import RingBuffer, SensorHistory
+
+
+def _reference(ts, vs, seconds):
+    ts, vs = np.asarray(ts), np.asarray(vs)
+    mask = ts >= ts[-1] - seconds
+    return vs[mask].mean(), np.polyfit(ts[mask], vs[mask], 1)[0], vs[mask].min()
+
+
+def test_ring_buffer_windowed_aggregates_across_wraps():
+    rng = np.random.default_rng(7)
+    buf = RingBuffer(capacity=100)
+    ts = 1.7e9 + np.cumsum(rng.uniform(0.5, 1.5, 1000))
+    vs = 20 + 0.01 * (ts - ts[0]) + rng.normal(0, 0.1, 1000)
+    # mix single appends and bulk extends that straddle lap boundaries
+    for t, v in zip(ts[:37], vs[:37]):
+        buf.append(t, v)
+    for start in range(37, 1000, 64):
+        buf.extend(ts[start : start + 64], vs[start : start + 64])
+
+    assert len(buf) == 100 and buf.count == 1000
+    for seconds in (5, 30, 80):
+        mean, slope, low = _reference(ts, vs, seconds)
+        assert buf.mean(seconds) == pytest.approx(mean)
+        assert buf.slope(seconds) == pytest.approx(slope, rel=1e-6)
+        assert buf.min(seconds) == pytest.approx(low)
+    assert buf.latest() == (ts[-1], vs[-1])
+
+
+def test_sensor_history_memory_mapped_persistence(tmp_path):
+    history = SensorHistory(capacity=16, directory=tmp_path)
+    for i in range(40):
+        history.append(100.0 + i, {"temp": 20.0 + i, "label": "skip", "ok": True})
+    history.flush()
+    assert list(history) == ["temp"]
+
+    reopened = SensorHistory(capacity=16, directory=tmp_path)
+    assert reopened.channel("temp").latest() == (139.0, 59.0)
+    assert reopened.channel("temp").mean(3) == pytest.approx(57.5)
+    reopened.channel("temp").append(140.0, 60.0)
+    assert reopened.channel("temp").slope(10) == pytest.approx(1.0)
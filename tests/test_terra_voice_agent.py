@@ -11,3 +11,99 @@ def test_voice_note_scheduling(tmp_path):
     agent = TerraVoiceAgent(calendar_path=calendar_path)
     agent.schedule_from_note("Convene solar council tomorrow at 09:00")
     assert "Convene solar council" in calendar_path.read_text()
+
+
+def test_background_scheduling(tmp_path):
+    import asyncio
+    import threading
+
+    from ai.calendar_backends import CalendarBackend
+
+    release = threading.Event()
+    stored, failed = [], []
+
+    class SlowBackend(CalendarBackend):
+        def add_event(self, event):
+            release.wait(5)
+            if event.name == "Break the seal":
+                raise RuntimeError("rejected")
+            stored.append(event.name)
+
+        def serialize(self):
+            return "\n".join(stored)
+
+    agent = TerraVoiceAgent(
+        backend=SlowBackend(), background=True, on_error=lambda e, exc: failed.append(e.name)
+    )
+    event = agent.schedule_from_note("Convene solar council tomorrow at 09:00")
+    assert event.name == "Convene solar council"
+    assert stored == []  # returned before the backend finished
+    agent.schedule_from_note("Break the seal tomorrow at 10:00")
+    asyncio.run(agent.aschedule_from_note("Water the grove tomorrow at 11:00"))
+    release.set()
+    assert agent.close(timeout=5)
+    assert stored == ["Convene solar council", "Water the grove"]
+    assert failed == ["Break the seal"]
+
+
+def test_event_queue_survives_failing_error_callback():
+    from ics import Event
+
+    from ai.calendar_backends import CalendarBackend
+    from ai.event_queue import EventWriteQueue
+
+    class RejectingBackend(CalendarBackend):
+        def add_event(self, event):
+            raise RuntimeError("rejected")
+
+        def serialize(self):
+            return ""
+
+    def on_error(event, exc):
+        raise ValueError("callback bug")
+
+    writes = EventWriteQueue(RejectingBackend(), max_pending=1, on_error=on_error)
+    for i in range(3):  # blocking submits only succeed while the worker is alive
+        writes.submit(Event(name=f"Event {i}"), timeout=2)
+    assert writes.flush(timeout=2)
+    assert writes.failed == 3
+    assert writes.close(timeout=2)
+
+
+def test_date_fast_path_and_cache():
+    from datetime import datetime
+
+    from ai.date_extraction import DateExtractor
+
+    now = datetime(2026, 10, 17, 19, 10)  # a Saturday
+    extractor = DateExtractor()
+    cases = {
+        "Convene solar council tomorrow at 09:00": ("tomorrow at 09:00", datetime(2026, 10, 18, 9)),
+        "Meet next Friday 3pm": ("next Friday 3pm", datetime(2026, 10, 23, 15)),
+        "Call at 9am tomorrow": ("at 9am tomorrow", datetime(2026, 10, 18, 9)),
+        "Harvest on 2030-05-01": ("on 2030-05-01", datetime(2030, 5, 1)),
+        "Rest Saturday": ("Saturday", datetime(2026, 10, 24)),
+    }
+    for note, expected in cases.items():
+        assert extractor.extract(note, now=now) == expected
+    assert extractor.stats()["fast_path_hits"] == len(cases)
+    assert extractor.stats()["slow_path_calls"] == 0
+
+    # forms outside the fast path fall back to dateparser once per bucket
+    assert extractor.extract("Bless the seeds in 3 days", now=now) is not None
+    extractor.extract("Bless the seeds in 3 days", now=now)
+    assert extractor.stats()["slow_path_calls"] == 1
+    assert extractor.stats()["cache_hits"] == 1
+
+
+def test_schedule_many(tmp_path):
+    calendar_path = tmp_path / "schedule.ics"
+    agent = TerraVoiceAgent(calendar_path=calendar_path)
+    notes = [f"Tend grove {i} tomorrow at 09:00" for i in range(200)]
+    notes[17] = "No date in this one"
+    result = agent.schedule_many(notes, processes=2, chunksize=16)
+    assert [e.name for e in result.events] == [f"Tend grove {i}" for i in range(200) if i != 17]
+    assert [(i, note) for i, note, _ in result.unparsed] == [(17, "No date in this one")]
+    assert all(r.ok for r in result.persisted)
+    assert result.notes_per_second > 0
+    assert calendar_path.read_text().count("BEGIN:VEVENT") == 199